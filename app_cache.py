@@ -0,0 +1,37 @@
+import os
+import sys
+
+
+def cache_root():
+    """本地缓存根目录：环境变量 AV_CACHE_DIR，否则按平台放在用户缓存目录下"""
+    root = os.environ.get('AV_CACHE_DIR')
+    if not root:
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        elif sys.platform == 'darwin':
+            base = os.path.expanduser('~/Library/Caches')
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        root = os.path.join(base, 'av_tool')
+    return root
+
+
+def data_root():
+    """需要长期保留的本地数据（如剪切会话）：环境变量 AV_DATA_DIR，否则按平台放在用户数据目录下"""
+    root = os.environ.get('AV_DATA_DIR')
+    if not root:
+        if sys.platform == 'win32':
+            base = os.environ.get('APPDATA') or os.path.expanduser('~')
+        elif sys.platform == 'darwin':
+            base = os.path.expanduser('~/Library/Application Support')
+        else:
+            base = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+        root = os.path.join(base, 'av_tool')
+    return root
+
+
+def cache_dir(name):
+    """返回并创建缓存根目录下的子目录"""
+    path = os.path.join(cache_root(), name)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -1,11 +1,103 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
-                           QSlider, QLabel, QFileDialog, QStyle, QMessageBox)
+                           QSlider, QLabel, QFileDialog, QStyle, QMessageBox,
+                           QDialog, QFormLayout, QDoubleSpinBox, QSpinBox, QDialogButtonBox,
+                           QApplication)
 from PyQt6.QtCore import Qt, QTimer, QSize
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtCore import QUrl
 import wave
 import os
-from pydub import AudioSegment
+import threading
+from wav_utils import export_segments
+from pcm_reader import PcmReader
+from waveform import PeakPyramid
+from waveform_view import WaveformView, PeakBuildThread
+from export_queue import ExportTracker, JobCancelled
+from cut_list import CutList
+from session_store import SessionStore
+import vad
+import media_probe
+import tracing
+
+
+class PydubSource:
+    """pydub 退回路径解码出的整段音频，同一次保存的各片段任务共用，只解码一次"""
+
+    def __init__(self, source_file):
+        self.source_file = source_file
+        self._audio = None
+        self._lock = threading.Lock()
+
+    def audio(self):
+        with self._lock:
+            if self._audio is None:
+                from pydub import AudioSegment
+                self._audio = AudioSegment.from_wav(self.source_file)
+            return self._audio
+
+
+def wav_segment_job(source, start, end, file_name):
+    """生成在后台导出队列中执行的单片段导出任务，source 为 PydubSource"""
+    source_file = source.source_file
+
+    def run(report_progress, is_cancelled):
+        def block_written(done, total):
+            # 最后一块写完后不再回报：report_progress 在取消时抛出异常，会删除已写完的片段
+            if done < total:
+                report_progress(done * 100 // total)
+
+        with tracing.span('save_cut_segment', path=source_file, start_ms=start, end_ms=end,
+                          output=file_name) as span:
+            try:
+                # 按帧区间流式复制；PcmReader.open 复用编辑器已打开的同一个映射
+                completed = export_segments(source_file, [(start, end, file_name)], is_cancelled=is_cancelled,
+                                            progress_callback=block_written)
+            except ValueError:
+                # 内存映射读取器不支持的格式（如压缩编码的 WAV）退回 pydub
+                span.set(method='pydub')
+                source.audio()[min(start, end):max(start, end)].export(file_name, format="wav")
+                completed = True
+        if not completed:
+            raise JobCancelled()
+    return run
+
+
+class AutoSegmentDialog(QDialog):
+    """自动分段参数"""
+    def __init__(self, params, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("自动分段")
+        layout = QFormLayout(self)
+        
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setRange(-90.0, 0.0)
+        self.threshold_spin.setSingleStep(1.0)
+        self.threshold_spin.setSuffix(" dBFS")
+        self.threshold_spin.setValue(params['threshold_db'])
+        layout.addRow("能量阈值:", self.threshold_spin)
+        
+        self.ms_spins = {}
+        for key, label in (('min_speech_ms', "最短语音:"),
+                           ('min_silence_ms', "最短静音:"),
+                           ('padding_ms', "前后扩展:")):
+            spin = QSpinBox()
+            spin.setRange(0, 10000)
+            spin.setSingleStep(50)
+            spin.setSuffix(" 毫秒")
+            spin.setValue(params[key])
+            layout.addRow(label, spin)
+            self.ms_spins[key] = spin
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+    
+    def params(self):
+        params = {'threshold_db': self.threshold_spin.value()}
+        for key, spin in self.ms_spins.items():
+            params[key] = spin.value()
+        return params
 
 class AudioEditor(QWidget):
     def __init__(self):
@@ -18,6 +110,9 @@ class AudioEditor(QWidget):
         self.audio_output = QAudioOutput()
         self.player.setAudioOutput(self.audio_output)
         
+        # 后台导出任务
+        self.export_tracker = ExportTracker(parent=self)
+        
         self.setup_ui()
         self.setup_connections()
         
@@ -31,7 +126,20 @@ class AudioEditor(QWidget):
         self.cut_end = None
         
         # 添加剪切点列表
-        self.cut_points = []  # 存储多个剪切区间 [(start1, end1), (start2, end2), ...]
+        self.cut_points = CutList()  # 按起点排序、重叠自动合并的剪切区间
+        
+        # 剪切区间按文件持久保存，重新打开时恢复
+        self.session_store = SessionStore.instance()
+        self.exporting = {}  # 任务编号 -> (源文件, [(start_ms, end_ms), ...])，成功后才从存储中移除
+        
+        # 后台波形构建线程
+        self.peak_thread = None
+        
+        # 当前文件的采样内存映射，波形、分析与导出共用
+        self.pcm = None
+        
+        # 自动分段参数，沿用上一次的设置
+        self.vad_params = dict(vad.DEFAULT_PARAMS)
         
         # 添加实时计时器
         self.timer = QTimer()
@@ -62,6 +170,14 @@ class AudioEditor(QWidget):
             }
         """)
         top_layout.addWidget(self.open_btn)
+        
+        # 后台导出状态
+        self.export_status_label = QLabel("后台导出: 空闲")
+        self.export_status_label.setStyleSheet("font-size: 14px; color: #666; margin-left: 20px;")
+        top_layout.addWidget(self.export_status_label)
+        self.cancel_export_btn = QPushButton("取消导出")
+        self.cancel_export_btn.setEnabled(False)
+        top_layout.addWidget(self.cancel_export_btn)
         top_layout.addStretch()
         
         # 当前文件显示
@@ -79,6 +195,10 @@ class AudioEditor(QWidget):
         progress_slider_container = QVBoxLayout()
         progress_slider_container.setSpacing(8)  # 调整进度条和时间的间距
         
+        # 波形总览
+        self.waveform_view = WaveformView()
+        progress_slider_container.addWidget(self.waveform_view)
+        
         # 进度条
         self.progress_slider = QSlider(Qt.Orientation.Horizontal)
         self.progress_slider.setMinimumHeight(50)
@@ -180,12 +300,14 @@ class AudioEditor(QWidget):
         self.set_end_btn = QPushButton("设置终点")
         self.set_end_new_start_btn = QPushButton("终点同时新建起点")
         self.save_cut_btn = QPushButton("保存片段")
+        self.auto_segment_btn = QPushButton("自动分段")
         
         cut_buttons = [
             self.set_start_btn,
             self.set_end_btn,
             self.set_end_new_start_btn,
-            self.save_cut_btn
+            self.save_cut_btn,
+            self.auto_segment_btn
         ]
         
         for btn in cut_buttons:
@@ -236,11 +358,18 @@ class AudioEditor(QWidget):
         self.set_end_btn.clicked.connect(self.set_cut_end)
         self.set_end_new_start_btn.clicked.connect(self.set_end_and_new_start)
         self.save_cut_btn.clicked.connect(self.save_cut)
+        self.auto_segment_btn.clicked.connect(self.auto_segment)
         
         self.progress_slider.sliderPressed.connect(self.on_slider_pressed)
         self.progress_slider.sliderReleased.connect(self.on_slider_released)
         self.player.positionChanged.connect(self.on_position_changed)
         self.player.durationChanged.connect(self.on_duration_changed)
+        self.waveform_view.seek_requested.connect(self.seek_position)
+        
+        self.cancel_export_btn.clicked.connect(self.export_tracker.cancel_all)
+        self.export_tracker.status_changed.connect(self.on_export_status_changed)
+        self.export_tracker.job_done.connect(self.on_export_job_done)
+        self.export_tracker.all_finished.connect(self.on_exports_finished)
     
     def seek_relative(self, offset_ms):
         """相对当前位置移动指定毫秒数"""
@@ -249,20 +378,71 @@ class AudioEditor(QWidget):
         self.player.setPosition(new_pos)
     
     def open_audio_file(self):
-        file_name, _ = QFileDialog.getOpenFileName(
-            self,
-            "选择音频文件",
-            "",
-            "音频文件 (*.wav)"
-        )
+        with tracing.span('file_dialog', title="选择音频文件"):
+            file_name, _ = QFileDialog.getOpenFileName(
+                self,
+                "选择音频文件",
+                "",
+                "音频文件 (*.wav)"
+            )
         if file_name:
-            self.current_file = file_name
-            self.file_label.setText(f"当前文件: {os.path.basename(file_name)}")
-            self.player.setSource(QUrl.fromLocalFile(file_name))
-            self.audio_output.setVolume(1.0)
-            self.player.play()
-            self.is_playing = True
-            self.play_btn.setText("暂停")
+            with tracing.span('open_file', path=file_name):
+                self.current_file = file_name
+                self.file_label.setText(f"当前文件: {os.path.basename(file_name)}")
+                self.player.setSource(QUrl.fromLocalFile(file_name))
+                self.audio_output.setVolume(1.0)
+                self.player.play()
+                self.is_playing = True
+                self.play_btn.setText("暂停")
+                try:
+                    self.pcm = PcmReader.open(file_name)
+                except (OSError, ValueError) as e:
+                    print(f"无法映射音频采样: {str(e)}")
+                    self.pcm = None
+                # 时长取自 WAV 头或探测缓存，不必等播放器加载完成
+                duration = self.pcm.duration_ms if self.pcm else media_probe.cached_duration_ms(file_name)
+                if duration:
+                    self.on_duration_changed(duration)
+                self.restore_cuts(file_name)
+                self.load_waveform(file_name)
+    
+    def load_waveform(self, file_name):
+        """优先内存映射已有的峰值文件，否则在后台线程中构建"""
+        if self.peak_thread is not None:
+            self.peak_thread.cancel()
+            self.peak_thread.finished.disconnect()
+            self.peak_thread.wait()
+            self.peak_thread = None
+            self.waveform_span.end(cancelled=True)
+        
+        if self.pcm is None:
+            self.waveform_view.clear("波形不可用")
+            return
+        
+        pyramid = PeakPyramid.load(file_name, self.pcm)
+        if pyramid is not None:
+            self.waveform_view.set_pyramid(pyramid)
+            self.update_cut_points_display()
+            return
+        
+        self.waveform_view.clear("正在生成波形...")
+        self.waveform_span = tracing.span('build_waveform', path=file_name)
+        self.peak_thread = PeakBuildThread(file_name, self.pcm)
+        self.peak_thread.progress.connect(
+            lambda value: self.waveform_view.clear(f"正在生成波形... {value}%"))
+        self.peak_thread.finished.connect(self.on_waveform_ready)
+        self.peak_thread.start()
+    
+    def on_waveform_ready(self, pyramid):
+        if self.sender() is not self.peak_thread:
+            return
+        self.waveform_span.end()
+        # finished 在 run() 返回前发出，等线程真正退出后再释放唯一的引用
+        self.peak_thread.wait()
+        self.peak_thread = None
+        self.waveform_view.set_pyramid(pyramid)
+        self.waveform_view.set_position(self.player.position())
+        self.update_cut_points_display()
     
     def toggle_play(self):
         if self.is_playing:
@@ -286,6 +466,7 @@ class AudioEditor(QWidget):
         if not self.progress_slider.isSliderDown():
             self.progress_slider.setValue(position)
         self.update_time_label(position, self.player.duration())
+        self.waveform_view.set_position(position)
     
     def on_duration_changed(self, duration):
         self.progress_slider.setRange(0, duration)
@@ -326,6 +507,35 @@ class AudioEditor(QWidget):
                 self.player.play()
                 self.is_playing = True
     
+    def restore_cuts(self, file_name):
+        """恢复该文件上次未导出的剪切区间"""
+        # 仍在后台导出的区间不放回列表，导出失败时再由 on_export_job_done 放回
+        exporting = set(self.exporting_cuts(file_name))
+        self.cut_points = CutList(cut for cut in self.session_store.load_cuts(file_name) if cut not in exporting)
+        self.cut_start = None
+        self.cut_end = None
+        self.timer.stop()
+        if self.cut_points:
+            self.update_cut_list()
+        else:
+            self.update_cut_info()
+        self.update_cut_points_display()
+    
+    def source_duration_ms(self):
+        return self.pcm.duration_ms if self.pcm else self.player.duration() or None
+    
+    def exporting_cuts(self, file_name):
+        """file_name 已交给后台导出、尚未完成的区间"""
+        return [cut for path, cuts in self.exporting.values() if path == file_name for cut in cuts]
+    
+    def remember_cuts(self):
+        """把当前剪切区间交给会话存储，后台合并写入；正在导出的区间成功前仍算未导出"""
+        if self.current_file:
+            cuts = CutList(self.cut_points)
+            for start, end in self.exporting_cuts(self.current_file):
+                cuts.add(start, end)
+            self.session_store.save_cuts(self.current_file, cuts, 'audio', self.source_duration_ms())
+    
     def set_cut_start(self):
         self.cut_start = self.player.position()
         self.update_cut_info()
@@ -342,7 +552,8 @@ class AudioEditor(QWidget):
         current_pos = self.player.position()
         if self.cut_start is not None:
             self.cut_end = current_pos
-            self.cut_points.append((self.cut_start, self.cut_end))
+            self.cut_points.add(self.cut_start, self.cut_end)
+            self.remember_cuts()
             self.update_cut_list()
         self.cut_start = current_pos
         self.cut_end = None
@@ -350,6 +561,35 @@ class AudioEditor(QWidget):
         self.update_cut_points_display()
         self.timer.start()  # 重新开始实时计时
     
+    def auto_segment(self):
+        """按帧能量检测有声段，用结果替换当前的剪切区间，操作员再逐段修正"""
+        if self.pcm is None:
+            QMessageBox.warning(self, "提示", "请先打开可以内存映射的 WAV 文件")
+            return
+        dialog = AutoSegmentDialog(self.vad_params, self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        self.vad_params = dialog.params()
+        
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            segments = vad.detect_speech(self.pcm, **self.vad_params)
+        finally:
+            QApplication.restoreOverrideCursor()
+        
+        self.cut_points = CutList(segments)
+        self.remember_cuts()
+        self.cut_start = None
+        self.cut_end = None
+        self.timer.stop()
+        self.update_cut_points_display()
+        # 片段可能有上千个，这里只显示汇总，逐段位置看波形
+        if segments:
+            total = sum(end - start for start, end in segments) / 1000
+            self.cut_info_label.setText(f"自动分段: {len(segments)} 段，共 {total:.1f}秒")
+        else:
+            self.cut_info_label.setText("自动分段: 未检测到语音，可降低能量阈值")
+    
     def update_cut_info(self):
         if self.cut_start is not None:
             start_str = self.format_time(self.cut_start)
@@ -363,8 +603,8 @@ class AudioEditor(QWidget):
             self.cut_info_label.setText("剪切时长: 0秒")
     
     def update_cut_points_display(self):
-        # 更新剪切点可视化显示
-        pass  # TODO: 实现剪切点的可视化显示
+        """在波形上绘制剪切区间和当前起点"""
+        self.waveform_view.set_cut_points(self.cut_points, self.cut_start, self.cut_end)
     
     def update_cut_list(self):
         """更新剪切片段列表显示"""
@@ -408,7 +648,7 @@ class AudioEditor(QWidget):
         
         try:
             if self.cut_start is not None and self.cut_end is not None:
-                self.cut_points.append((self.cut_start, self.cut_end))
+                self.cut_points.add(self.cut_start, self.cut_end)
             
             if not self.cut_points:
                 if was_playing:
@@ -417,36 +657,47 @@ class AudioEditor(QWidget):
                 return
             
             # 先选择保存目录
-            save_dir = QFileDialog.getExistingDirectory(self, "选择保存目录")
+            with tracing.span('file_dialog', title="选择保存目录"):
+                save_dir = QFileDialog.getExistingDirectory(self, "选择保存目录")
             if not save_dir:
                 return
             
             # 获取基础文件名
             default_name = os.path.splitext(os.path.basename(self.current_file))[0]
             
-            audio = AudioSegment.from_wav(self.current_file)
-            
+            segments = []
             for i, (start, end) in enumerate(self.cut_points, 1):
                 # 为每个片段请求文件名
-                file_name, _ = QFileDialog.getSaveFileName(
-                    self,
-                    f"保存第 {i} 个片段",
-                    os.path.join(save_dir, f"{default_name}_cut_{i}.wav"),
-                    "WAV文件 (*.wav)"
-                )
+                with tracing.span('file_dialog', title=f"保存第 {i} 个片段"):
+                    file_name, _ = QFileDialog.getSaveFileName(
+                        self,
+                        f"保存第 {i} 个片段",
+                        os.path.join(save_dir, f"{default_name}_cut_{i}.wav"),
+                        "WAV文件 (*.wav)"
+                    )
                 
                 if file_name:
-                    # 提取并保存片段
-                    segment = audio[start:end]
-                    segment.export(file_name, format="wav")
+                    segments.append((start, end, file_name))
             
-            QMessageBox.information(self, "成功", f"已保存 {len(self.cut_points)} 个音频片段")
-            self.cut_points = []
+            # 交给后台队列写出，界面可以继续标记下一个文件；需要退回 pydub 时各片段共用一次解码
+            source = PydubSource(self.current_file)
+            for start, end, file_name in segments:
+                job_id = self.export_tracker.submit(
+                    wav_segment_job(source, start, end, file_name),
+                    os.path.basename(file_name)
+                )
+                self.exporting[job_id] = (self.current_file, [(start, end)])
+            
+            # 已交给导出的区间移出列表，没有选择文件名的区间保留
+            for start, end, _ in segments:
+                self.cut_points.remove(start, end)
+            self.remember_cuts()
             self.cut_start = None
             self.cut_end = None
             self.timer.stop()
             self.update_cut_info()
             self.update_cut_list()
+            self.update_cut_points_display()
             self.real_time_duration_label.setText("实时时长: 0.0秒")
         
         finally:
@@ -455,8 +706,39 @@ class AudioEditor(QWidget):
                 self.player.play()
                 self.is_playing = True
     
+    def on_export_status_changed(self, text):
+        self.export_status_label.setText(text)
+        self.cancel_export_btn.setEnabled(self.export_tracker.pending() > 0)
+    
+    def on_export_job_done(self, job_id, success):
+        """导出成功的区间从会话存储中移除；失败或取消的区间放回剪切列表"""
+        entry = self.exporting.pop(job_id, None)
+        if entry is None:
+            return
+        file_name, cuts = entry
+        if success:
+            self.session_store.mark_exported(file_name, cuts, 'audio')
+        elif file_name == self.current_file:
+            for start, end in cuts:
+                self.cut_points.add(start, end)
+            self.update_cut_list()
+            self.update_cut_points_display()
+    
+    def on_exports_finished(self, errors):
+        if errors:
+            QMessageBox.critical(self, "错误", "部分音频片段保存失败：\n" + "\n".join(errors))
+    
     def closeEvent(self, event):
         """窗口关闭事件"""
         self.player.stop()
+        self.export_tracker.cancel_all()
+        self.session_store.flush()
+        if self.peak_thread is not None:
+            self.peak_thread.cancel()
+            self.peak_thread.finished.disconnect()
+            self.peak_thread.wait()
+            self.peak_thread = None
+            # 波形金字塔不会再送达，build_waveform 区间在这里结束
+            self.waveform_span.end(cancelled=True)
         self.deleteLater()
         event.accept() 
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""无界面批量视频转音频
+
+用法示例:
+    python batch_convert.py /data/videos "/data/more/**/*.mp4" -o /data/wav -j 8
+"""
+import argparse
+import glob
+import os
+import sys
+import struct
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pcm_reader import parse_wav_header
+from video_processor import VideoProcessor, PROFILES, DEFAULT_PROFILE, METHOD_LABELS, probe_duration
+from conversion_cache import ConversionCache
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov')
+
+# 每个工作进程持有一个 VideoProcessor
+_processor = None
+_use_cache = True
+_profile = DEFAULT_PROFILE
+_allow_copy = True
+
+
+def collect_inputs(patterns, recursive=False):
+    """展开目录与通配符，返回去重后的视频文件列表"""
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                candidates = []
+                for root, _, names in os.walk(pattern):
+                    candidates.extend(os.path.join(root, name) for name in names)
+            else:
+                candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=True) or [pattern]
+
+        for path in sorted(candidates):
+            if not os.path.isfile(path) or not path.lower().endswith(VIDEO_EXTENSIONS):
+                continue
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                files.append(path)
+    return files
+
+
+def output_path_for(input_file, output_dir=None, extension='.wav'):
+    """与界面一致：默认输出到源文件旁边的同名音频文件"""
+    base = os.path.splitext(os.path.basename(input_file))[0] + extension
+    if output_dir:
+        return os.path.join(output_dir, base)
+    return os.path.join(os.path.dirname(input_file), base)
+
+
+def is_up_to_date(input_file, output_file):
+    """输出文件存在、非空且不早于输入文件时跳过"""
+    try:
+        out_stat = os.stat(output_file)
+    except OSError:
+        return False
+    return out_stat.st_size > 0 and out_stat.st_mtime >= os.stat(input_file).st_mtime
+
+
+def flac_duration(path):
+    """从 FLAC 的 STREAMINFO 读取时长（秒）"""
+    with open(path, 'rb') as f:
+        header = f.read(42)
+    if len(header) < 42 or header[:4] != b'fLaC':
+        raise ValueError("不是 FLAC 文件")
+    # STREAMINFO 第 10 字节起：20 位采样率、3 位声道、5 位位深、36 位总帧数
+    packed, = struct.unpack('>Q', header[18:26])
+    sample_rate = packed >> 44
+    total_frames = packed & 0xFFFFFFFFF
+    return total_frames / float(sample_rate) if sample_rate else 0.0
+
+
+def audio_duration(path):
+    """读取 WAV/FLAC 头得到时长（秒），其他格式用 ffprobe，失败时返回 0"""
+    try:
+        if path.lower().endswith('.flac'):
+            return flac_duration(path)
+        if path.lower().endswith('.wav'):
+            _, _, _, framerate, _, block_align, _, data_size = parse_wav_header(path)
+            return data_size // block_align / float(framerate)
+    except (OSError, ValueError, ZeroDivisionError, struct.error):
+        return 0.0
+    return probe_duration(path) or 0.0
+
+
+def _init_worker(use_cache, profile, allow_copy):
+    global _use_cache, _profile, _allow_copy
+    _use_cache = use_cache
+    _profile = profile
+    _allow_copy = allow_copy
+
+
+def _convert_one(input_file, output_file):
+    """在工作进程中执行单个转换，返回 (输入, 输出, 处理方式, 音频时长, 错误信息)"""
+    global _processor
+    if _processor is None:
+        _processor = VideoProcessor(cache=ConversionCache() if _use_cache else None,
+                                    profile=_profile, allow_copy=_allow_copy)
+    try:
+        method = _processor.convert_to_wav(input_file, output_file)
+    except Exception as e:
+        return input_file, output_file, None, 0.0, str(e)
+    return input_file, output_file, method, audio_duration(output_file), None
+
+
+def run_batch(inputs, output_dir=None, jobs=None, force=False, use_cache=True, profile=DEFAULT_PROFILE,
+              allow_copy=True):
+    """并行转换，返回统计结果字典"""
+    jobs = jobs or os.cpu_count() or 1
+    extension = PROFILES[profile]['extension']
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    tasks = []
+    skipped = 0
+    outputs = set()
+    for input_file in inputs:
+        output_file = output_path_for(input_file, output_dir, extension)
+        if output_file in outputs:
+            print(f"跳过重名输出: {input_file} -> {output_file}")
+            skipped += 1
+            continue
+        outputs.add(output_file)
+        if not force and is_up_to_date(input_file, output_file):
+            skipped += 1
+            continue
+        tasks.append((input_file, output_file))
+
+    converted = 0
+    failed = 0
+    audio_seconds = 0.0
+    methods = Counter()
+    start = time.perf_counter()
+    if tasks:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)),
+                                 initializer=_init_worker, initargs=(use_cache, profile, allow_copy)) as pool:
+            futures = [pool.submit(_convert_one, *task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), 1):
+                input_file, output_file, method, duration, error = future.result()
+                if error:
+                    failed += 1
+                    print(f"[{done}/{len(tasks)}] 失败 {input_file}: {error}")
+                else:
+                    converted += 1
+                    audio_seconds += duration
+                    methods[method] += 1
+                    print(f"[{done}/{len(tasks)}] ({METHOD_LABELS[method]}) {input_file} -> {output_file}")
+    elapsed = time.perf_counter() - start
+
+    return {
+        'total': len(inputs),
+        'converted': converted,
+        'skipped': skipped,
+        'failed': failed,
+        'elapsed': elapsed,
+        'audio_seconds': audio_seconds,
+        'jobs': jobs,
+        'profile': profile,
+        'methods': dict(methods),
+    }
+
+
+def print_summary(stats):
+    elapsed = stats['elapsed']
+    files_per_sec = stats['converted'] / elapsed if elapsed > 0 else 0.0
+    audio_hours_per_sec = stats['audio_seconds'] / 3600.0 / elapsed if elapsed > 0 else 0.0
+    print("-" * 40)
+    print(f"输入文件: {stats['total']}  转换: {stats['converted']}  "
+          f"跳过: {stats['skipped']}  失败: {stats['failed']}")
+    print(f"输出格式: {stats['profile']} ({PROFILES[stats['profile']]['label']})")
+    if stats['methods']:
+        print("处理方式: " + "  ".join(f"{METHOD_LABELS[method]}: {count}"
+                                   for method, count in sorted(stats['methods'].items())))
+    print(f"进程数: {stats['jobs']}  耗时: {elapsed:.2f}秒")
+    print(f"吞吐: {files_per_sec:.2f} 文件/秒, {audio_hours_per_sec:.4f} 音频小时/秒 "
+          f"(共 {stats['audio_seconds'] / 3600.0:.2f} 小时)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量将视频转换为音频（无界面）",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog="输出格式:\n" + "\n".join(
+                                         f"  {name:<12} {p['label']}" for name, p in PROFILES.items()))
+    parser.add_argument('inputs', nargs='+', help="视频文件、目录或通配符")
+    parser.add_argument('-o', '--output-dir', help="输出目录，默认与源文件同目录")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="并行进程数，默认等于 CPU 核数")
+    parser.add_argument('-r', '--recursive', action='store_true', help="递归扫描目录")
+    parser.add_argument('-f', '--force', action='store_true', help="即使输出已是最新也重新转换")
+    parser.add_argument('--no-cache', action='store_true', help="不使用转换缓存")
+    parser.add_argument('-p', '--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                        help=f"输出格式，默认 {DEFAULT_PROFILE}")
+    parser.add_argument('--no-copy', action='store_true',
+                        help="源音轨已符合输出格式时也完整解码，不直接重新封装")
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.inputs, recursive=args.recursive)
+    if not inputs:
+        print("没有找到视频文件")
+        return 1
+
+    stats = run_batch(inputs, args.output_dir, max(1, args.jobs), args.force,
+                      not args.no_cache, args.profile, not args.no_copy)
+    print_summary(stats)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
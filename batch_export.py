@@ -0,0 +1,152 @@
+"""无界面导出会话存储中尚未导出的剪切片段
+
+编辑器中标记的剪切区间保存在会话存储里（见 session_store.py），本工具按
+条件取出有未导出区间的文件逐个导出，成功导出的区间从存储中移除，失败的
+文件保持未导出。输出文件的序号接在目录中已有的 {源文件名}_cut_{序号}
+之后，不会覆盖之前导出的片段。
+
+用法示例:
+    python batch_export.py --list
+    python batch_export.py -o /data/cuts --kind video --smart -j 4
+    python batch_export.py --min-duration 60 --limit 100
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from session_store import SessionStore
+from wav_utils import export_segments
+from video_cut import export_cuts
+
+EXTENSIONS = {'audio': '.wav', 'video': '.mp4'}
+
+
+def output_files_for(entry, count, output_dir=None, taken=()):
+    """与界面默认文件名一致：{源文件名}_cut_{序号}，默认输出到源文件旁边
+
+    序号从目录中已有文件与 taken（本次运行已分配的路径）的最大序号之后继续，
+    再次运行或界面已导出过片段时不会覆盖已有的文件。
+    """
+    base = os.path.splitext(os.path.basename(entry['path']))[0]
+    directory = output_dir or os.path.dirname(entry['path'])
+    extension = EXTENSIONS[entry['kind']]
+    pattern = re.compile(re.escape(f"{base}_cut_") + r'(\d+)' + re.escape(extension) + '$')
+    names = os.listdir(directory) if os.path.isdir(directory) else []
+    names += [os.path.basename(path) for path in taken if os.path.dirname(path) == directory]
+    last = max((int(match.group(1)) for match in map(pattern.match, names) if match), default=0)
+    return [os.path.join(directory, f"{base}_cut_{i}{extension}") for i in range(last + 1, last + count + 1)]
+
+
+def _export_one(entry, cuts, output_files, strategy):
+    """导出一个文件的全部区间，返回 (条目, 区间, 片段数, 错误信息)"""
+    try:
+        if not os.path.isfile(entry['path']):
+            raise OSError("源文件不存在")
+        segments = [(start, end, output_file) for (start, end), output_file in zip(cuts, output_files)]
+        if entry['kind'] == 'audio':
+            export_segments(entry['path'], segments)
+        else:
+            export_cuts(entry['path'], segments, strategy)
+    except Exception as e:
+        return entry, cuts, 0, str(e)
+    return entry, cuts, len(segments), None
+
+
+def run_export(store, entries, output_dir=None, jobs=1, strategy='auto'):
+    """并行导出，成功的文件记为已导出，返回统计结果字典"""
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    exported = 0
+    failed = 0
+    segments = 0
+    start = time.perf_counter()
+    tasks = [(entry, store.load_cuts(entry['path'])) for entry in entries]
+    tasks = [(entry, cuts) for entry, cuts in tasks if cuts]
+    # 输出文件名在提交前依次分配，同名源文件输出到同一目录时序号也不会重复
+    taken = set()
+    plans = []
+    for entry, cuts in tasks:
+        output_files = output_files_for(entry, len(cuts), output_dir, taken)
+        taken.update(output_files)
+        plans.append((entry, cuts, output_files))
+    if tasks:
+        # 导出由 ffmpeg 子进程或内存映射复制完成，线程即可并行
+        with ThreadPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            futures = [pool.submit(_export_one, entry, cuts, output_files, strategy)
+                       for entry, cuts, output_files in plans]
+            for done, future in enumerate(as_completed(futures), 1):
+                entry, cuts, count, error = future.result()
+                if error:
+                    failed += 1
+                    print(f"[{done}/{len(tasks)}] 失败 {entry['path']}: {error}")
+                    continue
+                exported += 1
+                segments += count
+                # 只移除本次导出的区间，导出期间编辑器新加的区间仍为 pending
+                store.mark_exported(entry['path'], cuts, entry['kind'], entry['duration_ms'])
+                store.flush()
+                print(f"[{done}/{len(tasks)}] {entry['path']} -> {count} 个片段")
+    elapsed = time.perf_counter() - start
+
+    return {
+        'total': len(entries),
+        'exported': exported,
+        'failed': failed,
+        'segments': segments,
+        'elapsed': elapsed,
+        'jobs': jobs,
+    }
+
+
+def print_summary(stats):
+    print("-" * 40)
+    print(f"待导出文件: {stats['total']}  导出: {stats['exported']}  失败: {stats['failed']}")
+    print(f"片段数: {stats['segments']}  线程数: {stats['jobs']}  耗时: {stats['elapsed']:.2f}秒")
+
+
+def print_entries(entries):
+    for entry in entries:
+        duration = f"{entry['duration_ms'] / 1000:.1f}秒" if entry['duration_ms'] else "未知时长"
+        print(f"{entry['kind']:<6} {entry['cut_count']:>4} 个片段  {duration:>10}  {entry['path']}")
+    print(f"共 {len(entries)} 个文件")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导出会话中尚未导出的剪切片段（无界面）")
+    parser.add_argument('-o', '--output-dir', help="输出目录，默认与源文件同目录")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help="并行导出的文件数，默认等于 CPU 核数")
+    parser.add_argument('--kind', choices=sorted(EXTENSIONS), help="只导出音频或视频")
+    parser.add_argument('--min-duration', type=float, help="只导出时长不少于该值（秒）的文件")
+    parser.add_argument('--max-duration', type=float, help="只导出时长不超过该值（秒）的文件")
+    parser.add_argument('--limit', type=int, help="最多导出的文件数，最早修改的优先")
+    parser.add_argument('--smart', action='store_true', help="视频帧精确剪切（只重编码起点、终点所在的部分 GOP）")
+    parser.add_argument('--list', action='store_true', help="只列出待导出的文件，不导出")
+    parser.add_argument('--db', help="会话数据库路径，默认使用编辑器的数据库")
+    args = parser.parse_args(argv)
+
+    store = SessionStore(args.db) if args.db else SessionStore.instance()
+    entries = store.unexported_files(
+        kind=args.kind,
+        min_duration_ms=None if args.min_duration is None else int(args.min_duration * 1000),
+        max_duration_ms=None if args.max_duration is None else int(args.max_duration * 1000),
+        limit=args.limit,
+    )
+    if args.list:
+        print_entries(entries)
+        return 0
+    if not entries:
+        print("没有待导出的剪切片段")
+        return 0
+
+    stats = run_export(store, entries, args.output_dir, max(1, args.jobs), 'smart' if args.smart else 'auto')
+    print_summary(stats)
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""无界面批量音源分离，按预设构建阶段图并运行启用的各阶段模型
+
+用法示例:
+    python batch_separate.py song.wav -p 11 -o /data/stems
+    python batch_separate.py /data/songs/*.wav --stand-in   # 不加载真实模型，验证流程
+"""
+import argparse
+import os
+import sys
+import time
+
+from functools import partial
+
+from model_cache import ModelCache
+from pcm_reader import PcmReader
+from video_processor import VideoProcessor
+import separation
+import separation_graph
+
+
+def prepare_input(input_file, output_dir, sample_rate):
+    """模型需要指定采样率的 WAV；其他格式或采样率先用 ffmpeg 转换"""
+    try:
+        reader = PcmReader.open(input_file)
+        if reader.framerate == sample_rate:
+            return reader.path
+    except (OSError, ValueError):
+        pass
+    base = os.path.splitext(os.path.basename(input_file))[0]
+    converted = os.path.join(output_dir, f"{base}_input.wav")
+    processor = VideoProcessor(profile={'codec': 'pcm_s16le', 'sample_rate': sample_rate, 'channels': 2,
+                                        'format': 'wav', 'extension': '.wav'})
+    processor.convert_to_wav(input_file, converted)
+    return converted
+
+
+def separate_one(input_file, stages, output_dir, stand_in=False, force_cpu=True, batch_size=1,
+                 max_workers=None, cache=None):
+    """运行阶段图，中间音轨在阶段之间按块流过内存，最终音轨流式写到 <阶段>/<文件名>_<音轨>.wav
+
+    模型从 cache（默认为进程共享的 ModelCache）获取，批量处理时只加载一次。
+
+    返回 (run_graph 的阶段报告, {(阶段, 音轨): 路径})
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    source = prepare_input(input_file, output_dir, stages[0].spec['sample_rate'])
+    base = os.path.splitext(os.path.basename(input_file))[0]
+
+    def stem_path(stage, name):
+        return os.path.join(output_dir, stage, f"{base}_{name}.wav")
+
+    cache = cache or ModelCache.instance()
+    paths, report = separation_graph.run_graph(
+        stages, source, stem_path, partial(cache.get, force_cpu=force_cpu, stand_in=stand_in),
+        max_workers=max_workers, batch_size=batch_size)
+    return report, paths or {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按预设批量进行音源分离（无界面）")
+    parser.add_argument('inputs', nargs='+', help="音频或视频文件")
+    parser.add_argument('-p', '--preset', default='11', help="presets 目录下的预设名或 JSON 路径，默认 11")
+    parser.add_argument('-o', '--output-dir', default='separated', help="输出目录，默认 ./separated")
+    parser.add_argument('-b', '--batch-size', type=int, default=1, help="每次前向推理的块数")
+    parser.add_argument('-j', '--workers', type=int,
+                        help="同时做前向推理的阶段数，默认不限制；各阶段按块流水线执行，限制后等待的阶段不占用计算")
+    parser.add_argument('--stand-in', action='store_true', help="使用替身模型，不需要 PyTorch 与检查点")
+    parser.add_argument('--model-cache-mb', type=int,
+                        help="常驻模型的内存预算（MB），默认取环境变量 SEPARATION_MODEL_CACHE_MB 或 4096")
+    args = parser.parse_args(argv)
+
+    if args.model_cache_mb is not None:
+        ModelCache.instance().set_budget(args.model_cache_mb * 1024 ** 2)
+
+    preset = separation.load_preset(args.preset)
+    stages = separation_graph.preset_graph(preset)
+    if not stages:
+        print("预设中没有启用任何模型")
+        return 1
+    for stage in stages:
+        spec = stage.spec
+        mode = "fast" if spec['if_fast'] else "normal"
+        source = f"{stage.source[0]}[{stage.source[1]}]" if stage.source else "混音"
+        print(f"{stage.name}: {spec['name']} ({spec['model_type']}, {mode}, "
+              f"块长 {spec['chunk_size']}, 重叠 {spec['num_overlap']}) <- {source}")
+
+    failed = 0
+    for input_file in args.inputs:
+        base = os.path.splitext(os.path.basename(input_file))[0]
+        start = time.perf_counter()
+        try:
+            report, paths = separate_one(input_file, stages, os.path.join(args.output_dir, base),
+                                         stand_in=args.stand_in, force_cpu=preset.get('force_cpu', True),
+                                         batch_size=max(1, args.batch_size), max_workers=args.workers)
+        except Exception as e:
+            failed += 1
+            print(f"失败 {input_file}: {str(e)}")
+            continue
+        print(f"{input_file}  总耗时 {time.perf_counter() - start:.2f} 秒")
+        for stats in report:
+            stems = ", ".join(sorted(name for stage, name in paths if stage == stats['stage']))
+            # 并发运行时进程内存峰值是同时运行的各阶段的合计
+            shared = f" (与 {', '.join(stats['overlapped'])} 合计)" if stats['overlapped'] else ""
+            print(f"  {stats['stage']:<8} 加载 {stats['load_seconds']:6.2f} 秒  推理 {stats['infer_seconds']:7.2f} 秒 "
+                  f"(等待上游 {stats['wait_seconds']:.2f} 秒)  "
+                  f"内存峰值 {stats['peak_rss'] / 1024 ** 2:8.1f} MB (+{stats['rss_increase'] / 1024 ** 2:.1f}){shared}  "
+                  f"{stems}")
+
+    stats = ModelCache.instance().stats()
+    print(f"模型缓存: 加载 {stats['misses']} 次 (共 {stats['load_seconds']:.2f} 秒), 命中 {stats['hits']} 次, "
+          f"淘汰 {stats['evictions']} 次, 常驻 {stats['models']} 个 / {stats['bytes'] / 1024 ** 2:.0f} MB")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
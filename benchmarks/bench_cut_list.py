@@ -0,0 +1,88 @@
+"""剪切区间表微基准：CutList 与按点击顺序保存的普通列表
+
+普通列表插入为 O(1)，但每次点查找、最近边界与可见范围查询都要遍历全部
+区间；CutList 插入需要移动有序列表，查询为二分。
+
+用法:
+    python benchmarks/bench_cut_list.py --cuts 10000 --queries 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cut_list import CutList
+
+
+def make_cuts(count, seed=0):
+    """在 count * 10 秒的时间轴上随机生成 count 个 1~5 秒的区间，部分重叠、部分反向"""
+    rng = random.Random(seed)
+    length = count * 10000
+    cuts = []
+    for _ in range(count):
+        start = rng.randrange(0, length)
+        end = start + rng.randrange(1000, 5000)
+        cuts.append((end, start) if rng.random() < 0.1 else (start, end))
+    return cuts, length
+
+
+def list_cut_at(cuts, ms):
+    for start, end in cuts:
+        if min(start, end) <= ms < max(start, end):
+            return start, end
+    return None
+
+
+def list_nearest_boundary(cuts, ms):
+    return min((value for cut in cuts for value in cut), key=lambda value: abs(value - ms))
+
+
+def list_between(cuts, start, end):
+    return [cut for cut in cuts if max(cut) >= start and min(cut) <= end]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cuts', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=100000, help="CutList 的查询次数")
+    parser.add_argument('--list-queries', type=int, default=1000, help="普通列表的查询次数（每次遍历全部区间）")
+    args = parser.parse_args()
+
+    cuts, length = make_cuts(args.cuts)
+    rng = random.Random(1)
+    points = [(rng.randrange(0, length),) for _ in range(args.queries)]
+    windows = [(p, p + 60000) for p, in points]
+
+    insert_seconds, cut_list = timed(CutList, cuts)
+    print(f"{args.cuts} 个区间，合并后 {len(cut_list)} 个，插入共 {insert_seconds * 1000:.1f} ms "
+          f"({insert_seconds * 1e6 / args.cuts:.2f} µs/次)")
+
+    def run_all(func, queries):
+        for query in queries:
+            func(*query)
+
+    cases = [
+        ('点查找', cut_list.cut_at, lambda q: list_cut_at(cuts, q), points),
+        ('最近边界', cut_list.nearest_boundary, lambda q: list_nearest_boundary(cuts, q), points),
+        ('可见范围', cut_list.between, lambda s, e: list_between(cuts, s, e), windows),
+    ]
+    print(f"{'查询':<8} {'CutList µs/次':>14} {'列表 µs/次':>12} {'加速':>8}")
+    for name, fast, slow, queries in cases:
+        fast_seconds, _ = timed(run_all, fast, queries)
+        slow_seconds, _ = timed(run_all, slow, queries[:args.list_queries])
+        fast_us = fast_seconds * 1e6 / len(queries)
+        slow_us = slow_seconds * 1e6 / min(len(queries), args.list_queries)
+        print(f"{name:<8} {fast_us:14.2f} {slow_us:12.1f} {slow_us / fast_us:7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""定位延迟基准：长 GOP 原文件与 all-intra 代理
+
+生成一段长 GOP 的合成视频，用 proxy.build_proxy 生成代理，然后在随机位置
+精确定位并解码一帧（与播放器跳转后显示画面的工作量相同），比较两者的耗时。
+每次测量都包含 ffmpeg 的启动时间，另测在开头解码一帧的耗时作为参考。
+
+用法:
+    python benchmarks/bench_seek.py --duration 120 --size 3840x2160 --gop 250
+    python benchmarks/bench_seek.py --input movie.mkv --seeks 50
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversion_cache import ConversionCache
+from video_processor import probe_duration
+import proxy
+
+
+def make_source(path, duration, size, gop, codec):
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=25:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+        '-c:v', codec, '-preset', 'ultrafast', '-g', str(gop),
+        '-c:a', 'aac', '-shortest',
+        '-y', path
+    ], check=True)
+
+
+def decode_at(input_file, seconds):
+    """精确定位到 seconds 并解码一帧，返回耗时（秒）"""
+    start = time.perf_counter()
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-ss', f"{seconds:.3f}", '-i', input_file,
+        '-map', '0:v:0', '-frames:v', '1', '-f', 'null', '-'
+    ], check=True)
+    return time.perf_counter() - start
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"  {name:<8} 平均 {statistics.mean(samples) * 1000:7.1f} ms  中位 {statistics.median(samples) * 1000:7.1f} ms  "
+          f"p95 {p95 * 1000:7.1f} ms  最大 {samples[-1] * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', help="使用已有视频，不生成合成视频")
+    parser.add_argument('--duration', type=int, default=60, help="合成视频时长（秒）")
+    parser.add_argument('--size', default='1920x1080', help="合成视频分辨率")
+    parser.add_argument('--gop', type=int, default=250, help="合成视频的关键帧间隔（帧）")
+    parser.add_argument('--codec', default='libx264', help="合成视频编码器，如 libx265")
+    parser.add_argument('--seeks', type=int, default=30, help="随机定位次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.input
+        if source is None:
+            source = os.path.join(tmp, 'source.mp4')
+            print(f"生成 {args.duration} 秒 {args.size} {args.codec} 视频，GOP {args.gop}")
+            make_source(source, args.duration, args.size, args.gop, args.codec)
+        duration = args.duration
+        if args.input:
+            duration = probe_duration(source) or args.duration
+
+        start = time.perf_counter()
+        proxy_file = proxy.build_proxy(source, cache=ConversionCache(os.path.join(tmp, 'proxies'), 1024 ** 4))
+        print(f"代理生成 {time.perf_counter() - start:.2f} 秒, "
+              f"原文件 {os.path.getsize(source) / 1024 ** 2:.1f} MB, 代理 {os.path.getsize(proxy_file) / 1024 ** 2:.1f} MB")
+
+        rng = random.Random(0)
+        positions = [rng.uniform(0, duration - 1) for _ in range(args.seeks)]
+        print(f"{args.seeks} 次随机定位并解码一帧:")
+        for name, path in (('原文件', source), ('代理', proxy_file)):
+            decode_at(path, 0)  # 预热文件缓存
+            first = statistics.median(decode_at(path, 0) for _ in range(5))
+            samples = [decode_at(path, position) for position in positions]
+            summarize(name, samples)
+            print(f"  {'':<8} 开头一帧 {first * 1000:7.1f} ms（近似为 ffmpeg 启动开销）")
+
+
+if __name__ == '__main__':
+    main()
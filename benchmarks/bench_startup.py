@@ -0,0 +1,164 @@
+"""启动耗时基准：首个窗口显示耗时与各模块导入耗时
+
+每次在新的解释器中用 -X importtime 启动主窗口，取多次运行的中位数。
+结果可写成 JSON，并与之前保存的基线比较，作为回归指标。
+
+用法:
+    python benchmarks/bench_startup.py --runs 5 --json startup.json
+    python benchmarks/bench_startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行：从导入到主窗口第一次进入事件循环
+FIRST_WINDOW_SNIPPET = r"""
+import time
+t0 = time.perf_counter()
+import sys
+sys.path.insert(0, {repo!r})
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
+import main
+app = QApplication(sys.argv)
+window = main.MainWindow()
+window.show()
+def done():
+    print('FIRST_WINDOW', time.perf_counter() - t0, flush=True)
+    app.quit()
+QTimer.singleShot(0, done)
+app.exec()
+"""
+
+# 点击按钮后才导入的模块，单独测量其冷启动导入耗时
+LAZY_MODULES = ('audio_editor', 'video_editor', 'pydub', 'numpy')
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出，返回 {模块: (自身微秒, 累计微秒, 嵌套深度)}
+
+    模块名前每多两个空格表示多一层嵌套，顶层导入的深度为 0。
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, field = line[len('import time:'):].split('|')
+            name = field.strip()
+            depth = (len(field) - len(field.lstrip()) - 1) // 2
+            modules[name] = (int(self_us), int(cumulative_us), depth)
+        except ValueError:
+            continue
+    return modules
+
+
+def run_child(code, env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env, cwd=REPO_DIR
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return result, wall
+
+
+def measure_first_window(env):
+    result, wall = run_child(FIRST_WINDOW_SNIPPET.format(repo=REPO_DIR), env)
+    first_window = None
+    for line in result.stdout.splitlines():
+        if line.startswith('FIRST_WINDOW'):
+            first_window = float(line.split()[1])
+    return first_window, wall, parse_importtime(result.stderr)
+
+
+def measure_lazy_import(module, env):
+    code = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import {module}"
+    try:
+        result, _ = run_child(code, env)
+    except RuntimeError as e:
+        print(f"导入 {module} 失败: {str(e).strip().splitlines()[-1]}")
+        return None
+    modules = parse_importtime(result.stderr)
+    return modules.get(module, (0, 0, 0))[1] / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="显示累计导入耗时最高的模块数")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    parser.add_argument('--baseline', help="与之前保存的 JSON 结果比较")
+    parser.add_argument('--offscreen', action='store_true', help="使用 offscreen 平台，无显示器时使用")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offscreen:
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    first_windows, walls, imports = [], [], []
+    for _ in range(args.runs):
+        first_window, wall, modules = measure_first_window(env)
+        first_windows.append(first_window)
+        walls.append(wall)
+        imports.append(modules)
+
+    # 只统计顶层导入（深度为 0）的模块，取中位数；嵌套模块已计入上层的累计耗时
+    names = set().union(*imports)
+    module_costs = {}
+    for name in names:
+        values = [m[name][1] / 1e6 for m in imports if name in m and m[name][2] == 0]
+        if values:
+            module_costs[name] = statistics.median(values)
+
+    # 窗口未能显示的运行没有首个窗口时间
+    reported = [value for value in first_windows if value is not None]
+    if len(reported) < len(first_windows):
+        print(f"{len(first_windows) - len(reported)} 次运行没有报告首个窗口时间")
+    if not reported:
+        print("所有运行都没有报告首个窗口时间")
+        return 1
+
+    results = {
+        'python': sys.version.split()[0],
+        'runs': len(reported),
+        'time_to_first_window': statistics.median(reported),
+        'process_wall_time': statistics.median(walls),
+        'startup_imports': dict(sorted(module_costs.items(), key=lambda item: -item[1])),
+        'lazy_imports': {module: measure_lazy_import(module, env) for module in LAZY_MODULES},
+    }
+
+    print(f"首个窗口: {results['time_to_first_window'] * 1000:.1f} 毫秒 "
+          f"(进程总耗时 {results['process_wall_time'] * 1000:.1f} 毫秒, {args.runs} 次中位数)")
+    print("启动时导入耗时 (累计):")
+    for name, seconds in list(results['startup_imports'].items())[:args.top]:
+        print(f"  {name:<40} {seconds * 1000:8.1f} 毫秒")
+    print("延迟导入耗时 (首次点击时):")
+    for name, seconds in results['lazy_imports'].items():
+        if seconds is None:
+            print(f"  {name:<40} {'失败':>8}")
+        else:
+            print(f"  {name:<40} {seconds * 1000:8.1f} 毫秒")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        ratio = results['time_to_first_window'] / baseline['time_to_first_window']
+        print(f"与基线相比: {ratio:.2f}x ({baseline['time_to_first_window'] * 1000:.1f} -> "
+              f"{results['time_to_first_window'] * 1000:.1f} 毫秒)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
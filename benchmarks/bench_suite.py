@@ -0,0 +1,223 @@
+"""转换与多片段导出的基准套件
+
+用 ffmpeg 的 lavfi 源（正弦音、粉红噪声、testsrc2 测试图）在本地生成
+不同时长、不同声道布局的测试媒体，无界面地计时：
+
+    convert    VideoProcessor.convert_to_wav（不使用转换缓存）
+    audio_cut  AudioEditor.save_cut 使用的 wav_utils.export_segments
+    video_cut  VideoEditor.save_cut 使用的 video_cut.export_cuts（auto 策略）
+
+每个用例在独立的子进程中运行，分别记录 Python 进程与 ffmpeg 子进程的
+内存峰值。结果写成 JSON，可与保存的基线比较，超出阈值时返回非零。
+
+用法:
+    python benchmarks/bench_suite.py --lengths 30 300 --json bench.json
+    python benchmarks/bench_suite.py --baseline bench.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from app_cache import cache_dir
+
+SIGNALS = {
+    'tone': 'sine=frequency=440:sample_rate=44100',
+    'noise': 'anoisesrc=color=pink:sample_rate=44100:amplitude=0.3',
+}
+LAYOUTS = ('mono', 'stereo', '5.1')
+DEFAULT_LENGTHS = (30, 300)
+
+
+def media_path(media_dir, kind, signal, layout, length):
+    extension = '.mp4' if kind == 'video' else '.wav'
+    return os.path.join(media_dir, f"{kind}_{signal}_{layout.replace('.', '_')}_{length}s{extension}")
+
+
+def make_media(path, kind, signal, layout, length):
+    """生成测试媒体，已存在时复用"""
+    if os.path.exists(path):
+        return path
+    audio = f"{SIGNALS[signal]}:duration={length},aformat=channel_layouts={layout}"
+    command = ['ffmpeg', '-nostdin', '-v', 'error']
+    if kind == 'video':
+        command += ['-f', 'lavfi', '-i', f'testsrc2=size=320x240:rate=25:duration={length}',
+                    '-f', 'lavfi', '-i', audio,
+                    '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50',
+                    '-c:a', 'aac', '-shortest']
+    else:
+        command += ['-f', 'lavfi', '-i', audio, '-c:a', 'pcm_s16le']
+    tmp_path = path + '.tmp' + os.path.splitext(path)[1]
+    subprocess.run(command + ['-y', tmp_path], check=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def make_cuts(length, count, seed=42):
+    """固定随机种子的 count 个片段（毫秒），长度 1~5 秒"""
+    rng = random.Random(seed)
+    cuts = []
+    for _ in range(count):
+        duration = rng.randrange(1000, min(5000, length * 1000 // 2))
+        start = rng.randrange(0, length * 1000 - duration)
+        cuts.append((start, start + duration))
+    return cuts
+
+
+def build_cases(media_dir, lengths, cuts, only=None):
+    """返回 [(用例名, 用例参数), ...]，只为名称包含 only 的用例生成所需的测试媒体"""
+    specs = []  # (用例名, 用例参数, 输入媒体的 (类型, 信号, 声道布局, 长度))
+    for length in lengths:
+        for layout in LAYOUTS:
+            for signal in SIGNALS:
+                specs.append((f"convert/{signal}/{layout}/{length}s", {'op': 'convert'},
+                              ('video', signal, layout, length)))
+                specs.append((f"audio_cut/{signal}/{layout}/{length}s",
+                              {'op': 'audio_cut', 'cuts': make_cuts(length, cuts)},
+                              ('audio', signal, layout, length)))
+            specs.append((f"video_cut/{layout}/{length}s", {'op': 'video_cut', 'cuts': make_cuts(length, cuts)},
+                          ('video', 'tone', layout, length)))
+
+    cases = []
+    for name, case, media in specs:
+        if only and only not in name:
+            continue
+        case['input'] = make_media(media_path(media_dir, *media), *media)
+        cases.append((name, case))
+    return cases
+
+
+def run_case(case, work_dir):
+    """在当前进程中执行一个用例，返回耗时（秒）"""
+    start = time.perf_counter()
+    if case['op'] == 'convert':
+        from video_processor import VideoProcessor
+        VideoProcessor().convert_to_wav(case['input'], os.path.join(work_dir, 'out.wav'))
+    elif case['op'] == 'audio_cut':
+        from wav_utils import export_segments
+        export_segments(case['input'], [(start_ms, end_ms, os.path.join(work_dir, f"cut_{i}.wav"))
+                                        for i, (start_ms, end_ms) in enumerate(case['cuts'])])
+    elif case['op'] == 'video_cut':
+        from video_cut import export_cuts
+        export_cuts(case['input'], [(start_ms, end_ms, os.path.join(work_dir, f"cut_{i}.mp4"))
+                                    for i, (start_ms, end_ms) in enumerate(case['cuts'])])
+    else:
+        raise ValueError(f"未知的用例: {case['op']}")
+    return time.perf_counter() - start
+
+
+def peak_rss_bytes(who):
+    """resource.getrusage 的 ru_maxrss 转为字节；Windows 上没有 resource 模块时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    value = resource.getrusage(who).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return value if sys.platform == 'darwin' else value * 1024
+
+
+def child_main(case_json):
+    """子进程入口：执行一个用例并以 JSON 输出耗时与内存峰值"""
+    import resource
+    case = json.loads(case_json)
+    with tempfile.TemporaryDirectory() as work_dir:
+        seconds = run_case(case, work_dir)
+    print(json.dumps({
+        'seconds': seconds,
+        'peak_rss': peak_rss_bytes(resource.RUSAGE_SELF),
+        'child_peak_rss': peak_rss_bytes(resource.RUSAGE_CHILDREN),
+    }))
+
+
+def measure(case, runs):
+    """在新的解释器中运行用例 runs 次，取耗时最小的一次"""
+    best = None
+    for _ in range(runs):
+        if sys.platform == 'win32':
+            # 没有 resource 模块，只在当前进程计时
+            with tempfile.TemporaryDirectory() as work_dir:
+                result = {'seconds': run_case(case, work_dir), 'peak_rss': None, 'child_peak_rss': None}
+        else:
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(case)],
+                                    check=True, capture_output=True, text=True, cwd=REPO_DIR).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def format_mb(value):
+    return f"{value / 1024 ** 2:7.1f}" if value is not None else "    n/a"
+
+
+def compare(results, baseline, threshold):
+    """逐个用例比较耗时，返回变慢超过阈值的用例名列表"""
+    regressions = []
+    print(f"\n与基线相比 (阈值 +{threshold * 100:.0f}%):")
+    for name, result in results['cases'].items():
+        old = baseline.get('cases', {}).get(name)
+        if old is None:
+            print(f"  {name:<32} 基线中没有")
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <- 变慢"
+            regressions.append(name)
+        print(f"  {name:<32} {old['seconds']:8.3f} -> {result['seconds']:8.3f} 秒  {ratio:5.2f}x{flag}")
+    return regressions
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        child_main(sys.argv[2])
+        return 0
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lengths', type=int, nargs='+', default=list(DEFAULT_LENGTHS), help="媒体时长（秒）")
+    parser.add_argument('--cuts', type=int, default=20, help="每个导出用例的片段数")
+    parser.add_argument('--runs', type=int, default=1, help="每个用例运行次数，取最快一次")
+    parser.add_argument('--only', help="只运行名称包含该字符串的用例，如 convert 或 stereo")
+    parser.add_argument('--media-dir', help="测试媒体目录，默认在本地缓存目录中并重复使用")
+    parser.add_argument('--json', help="把结果写入 JSON 文件")
+    parser.add_argument('--baseline', help="与之前保存的 JSON 结果比较")
+    parser.add_argument('--threshold', type=float, default=0.15, help="判定变慢的相对阈值")
+    args = parser.parse_args()
+
+    media_dir = args.media_dir or cache_dir('bench_media')
+    os.makedirs(media_dir, exist_ok=True)
+    print(f"测试媒体: {media_dir}")
+    cases = build_cases(media_dir, args.lengths, args.cuts, args.only)
+
+    results = {'python': sys.version.split()[0], 'platform': sys.platform, 'cuts': args.cuts, 'cases': {}}
+    print(f"{'用例':<32} {'耗时(秒)':>9} {'Python MB':>9} {'ffmpeg MB':>9}")
+    for name, case in cases:
+        result = measure(case, args.runs)
+        results['cases'][name] = result
+        print(f"{name:<32} {result['seconds']:9.3f} {format_mb(result['peak_rss']):>9} "
+              f"{format_mb(result['child_peak_rss']):>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 个用例变慢")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""测试时增强基准：不使用 TTA、逐个版本推理的 TTA、拼批一次推理的 TTA
+
+默认使用一个有真实计算量的 NumPy 替身模型（按帧投影后做掩码），不需要
+PyTorch；--preset 指定预设时加载其人声模型（需要 PyTorch 与检查点）。
+
+用法:
+    python benchmarks/bench_tta.py --duration 60 --batch-size 2
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import separation
+
+
+class DenseStandIn:
+    """把每个声道切成 frame 长的帧，经两层全连接得到掩码，输出 (掩码 * 输入, 余量)"""
+
+    def __init__(self, frame=1024, hidden=1024, seed=0):
+        rng = np.random.default_rng(seed)
+        self.frame = frame
+        self.w1 = (rng.standard_normal((frame, hidden)) / np.sqrt(frame)).astype(np.float32)
+        self.w2 = (rng.standard_normal((hidden, frame)) / np.sqrt(hidden)).astype(np.float32)
+        self.instruments = ['vocals', 'other']
+
+    def __call__(self, batch):
+        count, channels, samples = batch.shape
+        usable = samples // self.frame * self.frame
+        frames = batch[:, :, :usable].reshape(-1, self.frame)
+        mask = 1.0 / (1.0 + np.exp(-np.tanh(frames @ self.w1) @ self.w2))
+        vocals = np.zeros_like(batch)
+        vocals[:, :, :usable] = (mask * frames).reshape(count, channels, usable)
+        return np.stack([vocals, batch - vocals], axis=1)
+
+
+def run(model, audio, spec, batch_size):
+    start = time.perf_counter()
+    stems = separation.separate_array(model, audio, **separation.stage_options(spec, batch_size))
+    return time.perf_counter() - start, stems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', type=int, default=60, help="合成音频时长（秒）")
+    parser.add_argument('--batch-size', type=int, default=1, help="不含增强时每次推理的块数")
+    parser.add_argument('--preset', help="使用该预设的人声模型代替替身模型")
+    args = parser.parse_args()
+
+    if args.preset:
+        spec = separation.preset_stages(separation.load_preset(args.preset))[0]
+        model = separation.load_model(spec)
+    else:
+        spec = {'chunk_size': separation.DEFAULT_CHUNK_SIZE, 'num_overlap': separation.FAST_NUM_OVERLAP}
+        model = DenseStandIn()
+
+    rng = np.random.default_rng(1)
+    audio = (rng.standard_normal((args.duration * separation.DEFAULT_SAMPLE_RATE, 2)) * 0.1).astype(np.float32)
+
+    modes = [
+        ('无 TTA', model),
+        ('逐个 TTA', separation.TTAModel(model, batched=False)),
+        ('拼批 TTA', separation.TTAModel(model, batched=True)),
+    ]
+    print(f"{args.duration} 秒立体声, 块长 {spec['chunk_size']}, 重叠 {spec['num_overlap']}, "
+          f"batch {args.batch_size}")
+    results = {}
+    for name, runner in modes:
+        elapsed, stems = run(runner, audio, spec, args.batch_size)
+        results[name] = stems
+        print(f"  {name:<8} {elapsed:7.2f} 秒  ({args.duration / elapsed:6.1f}x 实时)")
+
+    diff = max(np.abs(results['逐个 TTA'][name] - results['拼批 TTA'][name]).max()
+               for name in model.instruments)
+    print(f"拼批与逐个 TTA 的最大差异: {diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
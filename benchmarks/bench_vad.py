@@ -0,0 +1,84 @@
+"""自动分段基准：在合成的长 WAV 上计时 vad.detect_speech
+
+用法:
+    python benchmarks/bench_vad.py --duration 3600 --channels 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pcm_reader import PcmReader
+import vad
+
+
+def make_synthetic_speech(path, duration, channels, framerate, seed=0):
+    """底噪上随机插入 0.5~5 秒的"语音"（高斯噪声），间隔 0.3~2 秒，返回真实区间（毫秒）"""
+    rng = np.random.default_rng(seed)
+    nframes = duration * framerate
+    spans = []
+    position = 0
+    while True:
+        start = position + int(rng.uniform(0.3, 2.0) * framerate)
+        end = start + int(rng.uniform(0.5, 5.0) * framerate)
+        if end > nframes:
+            break
+        spans.append((start, end))
+        position = end
+
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(framerate)
+        # 按分钟生成写入，避免一次占用整段音频的内存
+        block = 60 * framerate
+        for offset in range(0, nframes, block):
+            count = min(block, nframes - offset)
+            samples = rng.standard_normal((count, channels)) * 30
+            for start, end in spans:
+                lo, hi = max(start, offset), min(end, offset + count)
+                if lo < hi:
+                    samples[lo - offset:hi - offset] *= 130
+            wav.writeframes(samples.astype(np.int16).tobytes())
+    return [(start * 1000 // framerate, end * 1000 // framerate) for start, end in spans]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', type=int, default=3600, help="合成音频时长（秒）")
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--rate', type=int, default=44100)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'speech.wav')
+        print(f"生成 {args.duration} 秒合成音频 ({args.rate} Hz, {args.channels} 声道)...")
+        truth = make_synthetic_speech(source, args.duration, args.channels, args.rate)
+        reader = PcmReader.open(source)
+
+        # 第一次运行把文件读进页缓存，不计时
+        vad.detect_speech(reader)
+        times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            segments = vad.detect_speech(reader, padding_ms=0, min_silence_ms=200)
+            times.append(time.perf_counter() - start)
+
+        best = min(times)
+        print(f"检测耗时: 最好 {best:.3f} 秒, 平均 {sum(times) / len(times):.3f} 秒 "
+              f"({args.duration / best:.0f}x 实时)")
+        errors = [abs(a[0] - b[0]) + abs(a[1] - b[1]) for a, b in zip(truth, segments)]
+        print(f"真实片段 {len(truth)} 个, 检测到 {len(segments)} 个, "
+              f"边界平均误差 {np.mean(errors) / 2 if errors else 0:.1f} 毫秒")
+        del reader
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""视频多片段导出基准：旧的逐段 (-i 在 -ss 之前) 循环 vs video_cut 各策略
+
+用法:
+    python benchmarks/bench_video_cut.py --duration 1800 --cuts 200
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from video_cut import export_cuts
+
+
+def make_synthetic_video(path, duration):
+    """用 lavfi 测试源生成带音轨的长视频（2 秒一个关键帧）"""
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-f', 'lavfi', '-i', f'testsrc2=size=320x240:rate=25:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=44100:duration={duration}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '50',
+        '-c:a', 'aac', '-shortest',
+        '-y', path
+    ], check=True)
+
+
+def legacy_export(input_file, cuts):
+    """原 VideoEditor.save_cut 的做法：每段一次调用，输出端定位"""
+    for start, end, output_file in cuts:
+        subprocess.run([
+            'ffmpeg', '-i', input_file,
+            '-ss', str(start / 1000.0),
+            '-t', str((end - start) / 1000.0),
+            '-c', 'copy',
+            '-y', output_file
+        ], check=True, capture_output=True)
+
+
+def make_cuts(duration_ms, count, out_dir, tag, contiguous):
+    if contiguous:
+        step = duration_ms // (count + 1)
+        bounds = [step * i for i in range(count + 1)]
+        spans = list(zip(bounds, bounds[1:]))
+    else:
+        rng = random.Random(42)
+        spans = []
+        for _ in range(count):
+            start = rng.randrange(0, duration_ms - 10000)
+            spans.append((start, start + rng.randrange(2000, 10000)))
+    return [(start, end, os.path.join(out_dir, f"{tag}_{i}.mp4"))
+            for i, (start, end) in enumerate(spans)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', type=int, default=1800, help="合成视频时长（秒）")
+    parser.add_argument('--cuts', type=int, default=200, help="片段数量")
+    parser.add_argument('--skip-legacy', action='store_true', help="不运行旧的逐段循环")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.mp4')
+        print(f"生成 {args.duration} 秒合成视频...")
+        make_synthetic_video(source, args.duration)
+        duration_ms = args.duration * 1000
+
+        for layout, contiguous in (('随机片段', False), ('首尾相接', True)):
+            print(f"\n{layout}, {args.cuts} 段:")
+            runs = []
+            if not args.skip_legacy:
+                runs.append(('legacy', lambda c: legacy_export(source, c)))
+            for strategy in ('seek', 'multi', 'segment', 'auto'):
+                if strategy == 'segment' and not contiguous:
+                    continue
+                runs.append((strategy, lambda c, s=strategy: export_cuts(source, c, s)))
+            for name, run in runs:
+                cuts = make_cuts(duration_ms, args.cuts, tmp, name, contiguous)
+                elapsed = timed(run, cuts)
+                print(f"  {name:<8} {elapsed:8.2f} 秒  ({elapsed / args.cuts * 1000:.1f} 毫秒/段)")
+                for _, _, output_file in cuts:
+                    if os.path.exists(output_file):
+                        os.remove(output_file)
+
+
+if __name__ == '__main__':
+    main()
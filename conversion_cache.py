@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import threading
+
+from app_cache import cache_dir
+
+# 指纹采样：文件头、中间、尾部各读取这么多字节
+SAMPLE_BYTES = 256 * 1024
+# 默认缓存上限，可用环境变量 AV_CONVERSION_CACHE_MB 覆盖
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3
+
+# Linux 上 FICLONE ioctl 的请求号，用于写时复制克隆
+FICLONE = 0x40049409
+
+
+def fingerprint(input_file, params):
+    """快速内容指纹：文件大小 + 头/中/尾三段采样 + 转换参数
+
+    不依赖路径和修改时间，同一视频复制到别处仍然命中。
+    """
+    size = os.path.getsize(input_file)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(size).encode())
+    with open(input_file, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - SAMPLE_BYTES // 2), max(0, size - SAMPLE_BYTES)}):
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_BYTES))
+    for name in sorted(params):
+        digest.update(f"{name}={params[name]};".encode())
+    return digest.hexdigest()
+
+
+def _reflink(src, dst):
+    """尝试写时复制克隆（btrfs/XFS 等），不支持时抛出 OSError"""
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def clone_file(src, dst):
+    """先尝试写时复制，不支持时普通复制，把 src 原子地放到 dst
+
+    不使用硬链接：缓存条目与用户的输出文件共用一个 inode 时，用户就地
+    修改输出会悄悄改坏缓存条目，淘汰时也会把共用的字节算作缓存占用。
+    """
+    tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        try:
+            _reflink(src, tmp)
+        except (OSError, ImportError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class ConversionCache:
+    """视频转音频结果的磁盘缓存，按内容指纹 + 转换参数寻址，超出上限按 LRU 淘汰
+
+    条目的修改时间记录最近一次使用时间，淘汰时先删最久未用的。
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or cache_dir('conversions')
+        os.makedirs(self.directory, exist_ok=True)
+        if max_bytes is None:
+            try:
+                max_bytes = int(os.environ['AV_CONVERSION_CACHE_MB']) * 1024 ** 2
+            except (KeyError, ValueError):
+                max_bytes = DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+
+    def key(self, input_file, params):
+        return fingerprint(input_file, params)
+
+    def entry_path(self, key, extension='.wav'):
+        return os.path.join(self.directory, key + extension)
+
+    def fetch(self, key, output_file, extension='.wav'):
+        """命中时把缓存条目放到 output_file 并返回 True"""
+        entry = self.entry_path(key, extension)
+        if not os.path.exists(entry):
+            return False
+        try:
+            clone_file(entry, output_file)
+            os.utime(entry)
+        except OSError:
+            return False
+        return True
+
+    def store(self, key, output_file, extension='.wav'):
+        """把刚转换好的文件加入缓存，然后按上限淘汰"""
+        try:
+            clone_file(output_file, self.entry_path(key, extension))
+        except OSError as e:
+            print(f"写入转换缓存失败: {str(e)}")
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
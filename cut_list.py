@@ -0,0 +1,102 @@
+"""两个编辑器共用的剪切区间表
+
+区间为半开区间 [start_ms, end_ms)，按起点排序且互不重叠，起点与终点分别
+保存在两个有序列表中，查找都用二分完成。插入时起点大于终点的区间自动交换，
+与已有区间重叠的部分合并为一个；首尾恰好相接的区间不合并，仍是两个片段。
+
+定位区间（点查找、最近边界、可见范围）为 O(log n)。插入与删除没有达到
+对数复杂度：先二分定位，再在列表中移动其后的元素，仍是 O(n)。编辑器中的
+区间数通常在几千以内，这部分移动是一次内存块复制，代价远小于逐个遍历
+区间，因此没有换成平衡树之类的结构。
+"""
+import bisect
+
+
+class CutList:
+    """按起点排序、互不重叠的剪切区间集合"""
+
+    def __init__(self, cuts=()):
+        self._starts = []
+        self._ends = []
+        for start, end in cuts:
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(list(zip(self._starts, self._ends)))
+
+    def __getitem__(self, index):
+        return self._starts[index], self._ends[index]
+
+    def __repr__(self):
+        return f"CutList({list(self)!r})"
+
+    def add(self, start, end):
+        """插入区间并与重叠的已有区间合并，返回合并后的区间；长度为 0 时忽略并返回 None"""
+        if end < start:
+            start, end = end, start
+        if end == start:
+            return None
+        # 与 [start, end) 重叠的已有区间：终点大于 start 且起点小于 end
+        lo = bisect.bisect_right(self._ends, start)
+        hi = bisect.bisect_left(self._starts, end)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+        return start, end
+
+    def remove(self, start, end):
+        """删除与 (start, end) 完全相同的区间，不存在时返回 False"""
+        if end < start:
+            start, end = end, start
+        index = bisect.bisect_left(self._starts, start)
+        if index < len(self._starts) and self._starts[index] == start and self._ends[index] == end:
+            del self._starts[index]
+            del self._ends[index]
+            return True
+        return False
+
+    def remove_at(self, ms):
+        """删除包含 ms 的区间并返回它，没有时返回 None"""
+        index = self._index_at(ms)
+        if index is None:
+            return None
+        return self._starts.pop(index), self._ends.pop(index)
+
+    def clear(self):
+        self._starts.clear()
+        self._ends.clear()
+
+    def _index_at(self, ms):
+        index = bisect.bisect_right(self._starts, ms) - 1
+        if index >= 0 and ms < self._ends[index]:
+            return index
+        return None
+
+    def cut_at(self, ms):
+        """包含 ms 的区间，没有时返回 None"""
+        index = self._index_at(ms)
+        return None if index is None else (self._starts[index], self._ends[index])
+
+    def nearest_boundary(self, ms):
+        """离 ms 最近的区间起点或终点，区间表为空时返回 None"""
+        best = None
+        for boundaries in (self._starts, self._ends):
+            index = bisect.bisect_left(boundaries, ms)
+            for candidate in boundaries[max(0, index - 1):index + 1]:
+                if best is None or abs(candidate - ms) < abs(best - ms):
+                    best = candidate
+        return best
+
+    def between(self, start, end):
+        """与 [start, end] 有交集的区间，用于只绘制可见范围内的片段"""
+        lo = bisect.bisect_left(self._ends, start)
+        hi = bisect.bisect_right(self._starts, end)
+        return list(zip(self._starts[lo:hi], self._ends[lo:hi]))
+
+    def total_ms(self):
+        return sum(self._ends) - sum(self._starts)
@@ -0,0 +1,185 @@
+import itertools
+import os
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class JobCancelled(Exception):
+    """导出任务被取消"""
+
+
+def default_max_workers():
+    """并发上限：环境变量 EXPORT_WORKERS，默认取 CPU 核数的一半（至少 2）"""
+    try:
+        return max(1, int(os.environ.get('EXPORT_WORKERS', '')))
+    except ValueError:
+        return max(2, (os.cpu_count() or 2) // 2)
+
+
+class ExportJob(QRunnable):
+    """在线程池中执行的单个导出任务
+
+    func(report_progress, is_cancelled) 执行实际导出，report_progress(percent)
+    回报进度，is_cancelled() 为 True 时应尽快返回。
+    """
+
+    def __init__(self, queue, job_id, func, owner):
+        super().__init__()
+        self.queue = queue
+        self.job_id = job_id
+        self.func = func
+        self.owner = owner
+        self.cancel_event = threading.Event()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report_progress(self, percent):
+        if self.is_cancelled():
+            raise JobCancelled()
+        self.queue.job_progress.emit(self.job_id, int(percent))
+
+    def run(self):
+        success, message = True, ""
+        try:
+            if self.is_cancelled():
+                raise JobCancelled()
+            self.queue.job_started.emit(self.job_id)
+            # 任务已经写完时即使随后收到取消也算成功，不丢弃完整的输出
+            self.func(self.report_progress, self.is_cancelled)
+        except JobCancelled:
+            success, message = False, "已取消"
+        except Exception as e:
+            if self.is_cancelled():
+                # 取消时被终止的 ffmpeg 等以异常返回
+                success, message = False, "已取消"
+            else:
+                print(f"导出失败: {str(e)}")
+                success, message = False, str(e)
+        # 先移出队列再通知，收到完成信号时 pending_count 已不含本任务
+        self.queue._remove(self.job_id)
+        self.queue.job_finished.emit(self.job_id, success, message)
+
+
+class ExportQueue(QObject):
+    """后台导出队列，多个片段按并发上限同时写出
+
+    信号在工作线程中发出，连接到界面对象时由 Qt 自动排队到界面线程。
+    """
+    job_started = pyqtSignal(str)
+    job_progress = pyqtSignal(str, int)
+    job_finished = pyqtSignal(str, bool, str)
+
+    _instance = None
+
+    def __init__(self, max_workers=None):
+        super().__init__()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_workers or default_max_workers())
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def instance(cls):
+        """两个编辑器共用同一个队列"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def set_max_workers(self, count):
+        self.pool.setMaxThreadCount(max(1, int(count)))
+
+    def max_workers(self):
+        return self.pool.maxThreadCount()
+
+    def submit(self, func, owner=None):
+        """提交任务，返回任务编号"""
+        job_id = f"job-{next(self._ids)}"
+        job = ExportJob(self, job_id, func, owner)
+        job.setAutoDelete(False)
+        with self._lock:
+            self._jobs[job_id] = job
+        self.pool.start(job)
+        return job_id
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+
+    def cancel_owner(self, owner):
+        """取消某个编辑器提交的全部任务"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner is owner]
+        for job in jobs:
+            job.cancel_event.set()
+
+    def pending_count(self, owner=None):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if owner is None or job.owner is owner)
+
+    def _remove(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+class ExportTracker(QObject):
+    """跟踪一个编辑器提交的任务，汇总成状态文字供界面显示"""
+    status_changed = pyqtSignal(str)
+    job_done = pyqtSignal(str, bool)  # 任务编号, 是否成功（取消也算失败）
+    all_finished = pyqtSignal(list)  # 失败信息列表
+
+    def __init__(self, queue=None, parent=None):
+        super().__init__(parent)
+        self.queue = queue or ExportQueue.instance()
+        self.jobs = {}
+        self.progress = {}
+        self.errors = []
+        self.done = 0
+        self.queue.job_progress.connect(self.on_job_progress)
+        self.queue.job_finished.connect(self.on_job_finished)
+
+    def submit(self, func, label):
+        job_id = self.queue.submit(func, owner=self)
+        self.jobs[job_id] = label
+        self.progress[job_id] = 0
+        self.update_status()
+        return job_id
+
+    def cancel_all(self):
+        self.queue.cancel_owner(self)
+
+    def pending(self):
+        return len(self.jobs)
+
+    def on_job_progress(self, job_id, percent):
+        if job_id in self.jobs:
+            self.progress[job_id] = percent
+            self.update_status()
+
+    def on_job_finished(self, job_id, success, message):
+        label = self.jobs.pop(job_id, None)
+        if label is None:
+            return
+        self.progress.pop(job_id, None)
+        self.done += 1
+        if not success and message != "已取消":
+            self.errors.append(f"{label}: {message}")
+        self.job_done.emit(job_id, success)
+        self.update_status()
+        if not self.jobs:
+            errors, self.errors = self.errors, []
+            self.done = 0
+            self.all_finished.emit(errors)
+
+    def update_status(self):
+        if not self.jobs:
+            self.status_changed.emit("后台导出: 空闲")
+            return
+        total = self.done + len(self.jobs)
+        running = sum(self.progress.values()) / (100.0 * total)
+        percent = int((self.done / total + running) * 100)
+        self.status_changed.emit(f"后台导出: {self.done}/{total} ({percent}%)")
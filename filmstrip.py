@@ -0,0 +1,144 @@
+"""视频缩略图条：一次 ffmpeg 调用按等间隔抽取缩略图，按文件内容指纹缓存在磁盘上
+
+解码器只解关键帧（-skip_frame nokey），fps 滤镜把稀疏的关键帧对齐到等间隔
+的时间点，再缩放并补边到统一尺寸，以 RGB24 原始数据从管道逐张读出，调用方
+可以边读边显示。完整的结果以 .npy 保存，之后打开同一文件时直接内存映射。
+"""
+import os
+import subprocess
+
+import numpy as np
+
+import tracing
+from app_cache import cache_dir
+from conversion_cache import ConversionCache
+
+THUMB_WIDTH = 160
+THUMB_HEIGHT = 90
+DEFAULT_COUNT = 60
+# 默认缓存上限，可用环境变量 AV_THUMBNAIL_CACHE_MB 覆盖
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+
+def filmstrip_cache():
+    try:
+        max_bytes = int(os.environ['AV_THUMBNAIL_CACHE_MB']) * 1024 ** 2
+    except (KeyError, ValueError):
+        max_bytes = DEFAULT_MAX_BYTES
+    return ConversionCache(cache_dir('thumbnails'), max_bytes)
+
+
+def cache_params(count):
+    return {'count': count, 'width': THUMB_WIDTH, 'height': THUMB_HEIGHT, 'sampling': 'nokey'}
+
+
+class Filmstrip:
+    """count 个时间点上的缩略图，frames 为 (张数, 高, 宽, 3) 的 uint8 数组
+
+    第 i 张对应 i * interval 毫秒附近的关键帧；生成过程中 frames 只有前若干张。
+    """
+
+    def __init__(self, frames, duration_ms, count):
+        self.frames = frames
+        self.duration_ms = duration_ms
+        self.count = count
+
+    @property
+    def interval(self):
+        return self.duration_ms / max(1, self.count)
+
+    def time_at(self, index):
+        return int(index * self.interval)
+
+    def nearest(self, ms, available=None):
+        """离 ms 最近的已有缩略图序号，没有缩略图时返回 None"""
+        available = len(self.frames) if available is None else available
+        if available <= 0:
+            return None
+        return max(0, min(int(round(ms / self.interval)), available - 1))
+
+
+def build_command(input_file, duration_ms, count):
+    scale = (f"scale={THUMB_WIDTH}:{THUMB_HEIGHT}:force_original_aspect_ratio=decrease,"
+             f"pad={THUMB_WIDTH}:{THUMB_HEIGHT}:(ow-iw)/2:(oh-ih)/2")
+    return [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-skip_frame', 'nokey',  # 只解码关键帧
+        '-i', input_file,
+        '-map', '0:v:0', '-an',
+        '-vf', f"fps={count * 1000}/{max(1, int(duration_ms))},{scale}",
+        '-frames:v', str(count),
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+        'pipe:1'
+    ]
+
+
+def load_filmstrip(input_file, duration_ms, count=DEFAULT_COUNT, cache=None):
+    """读取缓存中的缩略图条，没有时返回 None"""
+    cache = cache or filmstrip_cache()
+    path = cache.entry_path(cache.key(input_file, cache_params(count)), '.npy')
+    try:
+        frames = np.load(path, mmap_mode='r')
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return Filmstrip(frames, duration_ms, count)
+
+
+def extract_filmstrip(input_file, duration_ms, count=DEFAULT_COUNT, cache=None,
+                      on_thumbnail=None, is_cancelled=None):
+    """抽取缩略图条并写入缓存，已缓存时直接返回
+
+    每读到一张调用 on_thumbnail(序号, (高, 宽, 3) 数组)。is_cancelled() 为 True
+    时终止 ffmpeg 并返回 None，不写缓存。视频比 count 个间隔短时返回的张数可能更少。
+    """
+    cache = cache or filmstrip_cache()
+    strip = load_filmstrip(input_file, duration_ms, count, cache)
+    if strip is not None:
+        if on_thumbnail:
+            for index, frame in enumerate(strip.frames):
+                on_thumbnail(index, frame)
+        return strip
+
+    frame_bytes = THUMB_WIDTH * THUMB_HEIGHT * 3
+    frames = np.zeros((count, THUMB_HEIGHT, THUMB_WIDTH, 3), dtype=np.uint8)
+    received = 0
+    command = build_command(input_file, duration_ms, count)
+    with tracing.span('extract_filmstrip', path=input_file, count=count) as span, tracing.run_span(command):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            while received < count:
+                if is_cancelled and is_cancelled():
+                    process.terminate()
+                    span.set(cancelled=True)
+                    return None
+                data = process.stdout.read(frame_bytes)
+                if len(data) < frame_bytes:
+                    break
+                frames[received] = np.frombuffer(data, dtype=np.uint8).reshape(THUMB_HEIGHT, THUMB_WIDTH, 3)
+                if on_thumbnail:
+                    on_thumbnail(received, frames[received])
+                received += 1
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            process.stdout.close()
+        span.set(thumbnails=received)
+    if received == 0:
+        return None
+
+    frames = frames[:received]
+    path = cache.entry_path(cache.key(input_file, cache_params(count)), '.npy')
+    # 以 .tmp 结尾，淘汰时跳过未写完的文件；np.save 对文件对象不会追加扩展名
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, 'wb') as f:
+            np.save(f, frames)
+        os.replace(temp_file, path)
+        cache.evict()
+    except OSError as e:
+        print(f"写入缩略图缓存失败: {str(e)}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    return Filmstrip(frames, duration_ms, count)
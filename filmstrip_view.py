@@ -0,0 +1,115 @@
+from PyQt6.QtWidgets import QWidget, QLabel
+from PyQt6.QtCore import Qt, QThread, QRectF, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QImage, QPixmap
+
+from filmstrip import extract_filmstrip, DEFAULT_COUNT
+
+
+def frame_to_pixmap(frame):
+    """(高, 宽, 3) 的 RGB 数组转为 QPixmap"""
+    height, width, _ = frame.shape
+    data = bytes(frame)
+    return QPixmap.fromImage(QImage(data, width, height, width * 3, QImage.Format.Format_RGB888).copy())
+
+
+class FilmstripThread(QThread):
+    """后台抽取缩略图，每得到一张就交回界面线程"""
+    thumbnail = pyqtSignal(int, object)
+    finished = pyqtSignal(object)
+
+    def __init__(self, source_file, duration_ms, count=DEFAULT_COUNT):
+        super().__init__()
+        self.source_file = source_file
+        self.duration_ms = duration_ms
+        self.count = count
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            strip = extract_filmstrip(
+                self.source_file, self.duration_ms, self.count,
+                on_thumbnail=lambda index, frame: self.thumbnail.emit(index, frame.copy()),
+                is_cancelled=lambda: self._cancel_requested
+            )
+        except (OSError, ValueError) as e:
+            print(f"缩略图生成失败: {str(e)}")
+            strip = None
+        self.finished.emit(strip)
+
+
+class FilmstripView(QWidget):
+    """进度条上方的缩略图条，第 i 格显示第 i 个时间点的缩略图，未到达的格子留空"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(54)
+        self.pixmaps = []
+        self.duration = 0
+
+    def start(self, duration_ms, count=DEFAULT_COUNT):
+        self.duration = duration_ms
+        self.pixmaps = [None] * count
+        self.update()
+
+    def clear(self):
+        self.pixmaps = []
+        self.duration = 0
+        self.update()
+
+    def set_thumbnail(self, index, frame):
+        if 0 <= index < len(self.pixmaps):
+            self.pixmaps[index] = frame_to_pixmap(frame)
+            self.update()
+
+    def thumbnail_at(self, ms):
+        """离 ms 最近的已到达缩略图及其时间，没有时返回 (None, None)"""
+        if not self.pixmaps or self.duration <= 0:
+            return None, None
+        interval = self.duration / len(self.pixmaps)
+        index = max(0, min(int(round(ms / interval)), len(self.pixmaps) - 1))
+        # 缩略图按时间顺序到达，向前找最近的一张
+        while index >= 0 and self.pixmaps[index] is None:
+            index -= 1
+        if index < 0:
+            return None, None
+        return self.pixmaps[index], int(index * interval)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#212121"))
+        if not self.pixmaps:
+            return
+        slot = self.width() / len(self.pixmaps)
+        height = self.height()
+        for index, pixmap in enumerate(self.pixmaps):
+            if pixmap is None:
+                continue
+            # 从缩略图中央裁出与格子比例相同的部分，避免拉伸
+            crop_width = min(pixmap.width(), pixmap.height() * slot / height)
+            source = QRectF((pixmap.width() - crop_width) / 2, 0, crop_width, pixmap.height())
+            painter.drawPixmap(QRectF(index * slot, 0, slot, height), pixmap, source)
+
+
+class ThumbnailPopup(QLabel):
+    """鼠标悬停在进度条上时显示的缩略图与时间"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.WindowType.ToolTip)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setStyleSheet("background-color: #212121; color: white; border: 1px solid #999999; padding: 2px;")
+
+    def show_thumbnail(self, pixmap, text, global_pos):
+        # 时间写在缩略图底部
+        pixmap = pixmap.copy()
+        painter = QPainter(pixmap)
+        painter.fillRect(QRectF(0, pixmap.height() - 16, pixmap.width(), 16), QColor(0, 0, 0, 160))
+        painter.setPen(QColor("white"))
+        painter.drawText(QRectF(0, pixmap.height() - 16, pixmap.width(), 16), Qt.AlignmentFlag.AlignCenter, text)
+        painter.end()
+        self.setPixmap(pixmap)
+        self.adjustSize()
+        self.move(global_pos.x() - self.width() // 2, global_pos.y() - self.height() - 8)
+        self.show()
@@ -1,35 +1,43 @@
 import sys
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton, QFileDialog, QLabel, QGroupBox, QProgressDialog, QMessageBox
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QFileDialog, QLabel, QGroupBox, QProgressDialog, QMessageBox, QComboBox
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from video_processor import VideoProcessor
-from audio_editor import AudioEditor
-from video_editor import VideoEditor
+from video_processor import VideoProcessor, ConversionCancelled, PROFILES, DEFAULT_PROFILE, METHOD_LABELS
+from conversion_cache import ConversionCache
+import tracing
+
+# AudioEditor / VideoEditor 及其依赖的 QtMultimedia、pydub、numpy 较重，
+# 在第一次点击对应按钮时才导入
 
 class VideoConverterThread(QThread):
     progress = pyqtSignal(int)
     finished = pyqtSignal(str)
     
-    def __init__(self, video_file, video_processor):
+    def __init__(self, video_file, output_file, video_processor):
         super().__init__()
         self.video_file = video_file
+        self.output_file = output_file
         self.video_processor = video_processor
+        self.method = None
+        self._cancel_requested = False
+        
+    def cancel(self):
+        """请求取消转换，ffmpeg 会在下一次进度回报时被终止"""
+        self._cancel_requested = True
         
     def run(self):
         try:
-            # 实际的转换操作
-            output_file = self.video_file.rsplit('.', 1)[0] + '.wav'
-            # 模拟转换进度
-            for i in range(101):
-                if i < 90:  # 前90%用于显示转换进度
-                    self.progress.emit(i)
-                    self.msleep(20)  # 稍微延迟一下，让进度条显示更平滑
-            
-            # 执行实际转换
-            self.video_processor.convert_to_wav(self.video_file, output_file)
-            
-            # 完成最后的进度
-            self.progress.emit(100)
-            self.finished.emit(output_file)
+            # 实际的转换操作，ffmpeg 直接写到用户选择的位置
+            # 进度由 ffmpeg 的 -progress 输出驱动
+            self.method = self.video_processor.convert_to_wav(
+                self.video_file,
+                self.output_file,
+                progress_callback=self.progress.emit,
+                is_cancelled=lambda: self._cancel_requested
+            )
+            self.finished.emit(self.output_file)
+        except ConversionCancelled:
+            # 只能由进度对话框的取消按钮触发，对话框已关闭，不再另行提示
+            pass
         except Exception as e:
             print(f"转换失败: {str(e)}")
             self.finished.emit("")
@@ -98,7 +106,17 @@ class MainWindow(QMainWindow):
         self.video_btn.clicked.connect(self.open_video_file)
         self.video_editor_btn.clicked.connect(self.open_video_editor)
         
+        # 输出格式预设，与批量转换的 --profile 相同
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("输出格式:"))
+        self.profile_combo = QComboBox()
+        for name, profile in PROFILES.items():
+            self.profile_combo.addItem(profile['label'], name)
+        self.profile_combo.setCurrentIndex(self.profile_combo.findData(DEFAULT_PROFILE))
+        profile_layout.addWidget(self.profile_combo, 1)
+        
         video_layout.addWidget(self.video_btn)
+        video_layout.addLayout(profile_layout)
         video_layout.addWidget(self.video_editor_btn)
         video_group.setLayout(video_layout)
         layout.addWidget(video_group)
@@ -147,18 +165,31 @@ class MainWindow(QMainWindow):
         layout.addStretch()  # 添加弹性空间
         main_widget.setLayout(layout)
         
-        self.video_processor = VideoProcessor()
+        self.video_processor = VideoProcessor(cache=ConversionCache())
         self.audio_editor = None
         self.video_editor = None
 
     def open_video_file(self):
-        file_name, _ = QFileDialog.getOpenFileName(
-            self,
-            "视频转音频",
-            "",
-            "视频文件 (*.mp4 *.avi *.mkv *.mov)"
-        )
-        if file_name:
+        with tracing.span('file_dialog', title="视频转音频"):
+            file_name, _ = QFileDialog.getOpenFileName(
+                self,
+                "视频转音频",
+                "",
+                "视频文件 (*.mp4 *.avi *.mkv *.mov)"
+            )
+        if not file_name:
+            return
+        self.video_processor.set_profile(self.profile_combo.currentData())
+        extension = self.video_processor.output_extension
+        # 先选择保存位置，转换结果直接写入，无需再移动或复制
+        with tracing.span('file_dialog', title="保存音频文件"):
+            save_file, _ = QFileDialog.getSaveFileName(
+                self,
+                "保存音频文件",
+                file_name.rsplit('.', 1)[0] + extension,
+                f"{extension[1:].upper()}文件 (*{extension})"
+            )
+        if save_file:
             # 创建进度对话框
             progress = QProgressDialog("正在转换视频...", "取消", 0, 100, self)
             progress.setWindowTitle("转换进度")
@@ -167,26 +198,18 @@ class MainWindow(QMainWindow):
             progress.setAutoReset(True)
             
             # 创建转换线程
-            self.converter = VideoConverterThread(file_name, self.video_processor)
+            self.converter = VideoConverterThread(file_name, save_file, self.video_processor)
             self.converter.progress.connect(progress.setValue)
             self.converter.finished.connect(self.conversion_finished)
+            progress.canceled.connect(self.converter.cancel)
             
             # 开始转换
             self.converter.start()
             
     def conversion_finished(self, output_file):
         if output_file:
-            # 选择保存位置
-            save_file, _ = QFileDialog.getSaveFileName(
-                self,
-                "保存音频文件",
-                output_file,
-                "WAV文件 (*.wav)"
-            )
-            if save_file:
-                import shutil
-                shutil.move(output_file, save_file)
-                QMessageBox.information(self, "成功", "视频已成功转换为音频！")
+            method = METHOD_LABELS.get(self.converter.method, "")
+            QMessageBox.information(self, "成功", f"视频已成功转换为音频！（{method}）\n{output_file}")
         else:
             QMessageBox.critical(self, "错误", "转换失败，请检查视频文件！")
 
@@ -195,6 +218,7 @@ class MainWindow(QMainWindow):
             self.audio_editor = None
             
         if self.audio_editor is None:
+            from audio_editor import AudioEditor
             self.audio_editor = AudioEditor()
             self.audio_editor.destroyed.connect(lambda: setattr(self, 'audio_editor', None))
         self.audio_editor.show()
@@ -205,6 +229,7 @@ class MainWindow(QMainWindow):
             self.video_editor = None
             
         if self.video_editor is None:
+            from video_editor import VideoEditor
             self.video_editor = VideoEditor()
             self.video_editor.destroyed.connect(lambda: setattr(self, 'video_editor', None))
         self.video_editor.show()
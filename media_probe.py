@@ -0,0 +1,231 @@
+"""媒体探测结果的持久缓存
+
+每个文件只运行一次 ffprobe，把时长、容器格式与各路流的编码参数写入本地
+缓存目录下的 SQLite 数据库，以 (路径, 大小, 修改时间) 为键；文件被改动后
+大小或修改时间变化，自动重新探测。关键帧时间需要读取全部视频包，代价较高，
+只在第一次请求（如精确剪切）时探测，之后同样从缓存读取。
+
+编辑器、转换与批量工具都通过本模块获取这些信息，重复打开同一批文件时
+不再启动 ffprobe。多个进程可同时读写同一个数据库。缓存目录不可写、数据库
+被锁或已损坏时只打印一次错误，之后直接运行 ffprobe，与未命中相同。
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+
+import tracing
+from app_cache import cache_dir
+
+DB_NAME = 'probe.sqlite3'
+# 保存的流字段；smart_cut 重编码时需要视频流的 profile、pix_fmt 等
+STREAM_FIELDS = ('index', 'codec_type', 'codec_name', 'profile', 'pix_fmt', 'width', 'height',
+                 'r_frame_rate', 'time_base', 'sample_rate', 'channels', 'channel_layout')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    format TEXT,
+    streams TEXT NOT NULL,
+    keyframes TEXT,
+    probed_at REAL NOT NULL
+)
+"""
+
+
+def file_identity(path):
+    """(绝对路径, 大小, 修改时间纳秒)，文件不存在时抛出 OSError"""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def run_ffprobe(path):
+    """运行一次 ffprobe，返回 {'duration', 'format', 'streams'}；失败时抛出异常"""
+    command = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration,format_name:stream=' + ','.join(STREAM_FIELDS),
+        '-of', 'json',
+        path
+    ]
+    with tracing.run_span(command):
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+    data = json.loads(result.stdout)
+    fmt = data.get('format') or {}
+    try:
+        duration = float(fmt['duration'])
+    except (KeyError, ValueError):
+        duration = None
+    streams = [{key: stream[key] for key in STREAM_FIELDS if key in stream}
+               for stream in data.get('streams') or []]
+    return {'duration': duration, 'format': fmt.get('format_name'), 'streams': streams}
+
+
+def run_keyframe_probe(path):
+    """只解复用不解码，返回第一路视频的关键帧时间（秒，升序）"""
+    command = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags',
+        '-of', 'csv=p=0',
+        path
+    ]
+    with tracing.run_span(command):
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+    keyframes.sort()
+    return keyframes
+
+
+class ProbeCache:
+    """以 (路径, 大小, 修改时间) 为键的 SQLite 探测缓存，线程安全"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(cache_dir('probe'), DB_NAME)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        try:
+            try:
+                # WAL 模式下读写互不阻塞，批量转换的多个工作进程可以同时使用
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.DatabaseError:
+                pass
+            self._conn.execute(SCHEMA)
+            self._conn.commit()
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+
+    @classmethod
+    def instance(cls):
+        """同一进程共用一个连接；多进程时每个进程各自打开
+
+        数据库无法打开时抛出 sqlite3.Error 或 OSError。
+        """
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._pid != os.getpid():
+                cls._instance = cls()
+            return cls._instance
+
+    def _execute(self, sql, params=()):
+        """执行一条语句并返回第一行；数据库出错时只打印，按未命中处理"""
+        with self._lock:
+            try:
+                row = self._conn.execute(sql, params).fetchone()
+                self._conn.commit()
+                return row
+            except sqlite3.Error as e:
+                print(f"探测缓存读写失败: {str(e)}")
+                return None
+
+    def _row(self, identity):
+        return self._execute("SELECT duration, format, streams, keyframes FROM probes "
+                             "WHERE path = ? AND size = ? AND mtime_ns = ?", identity)
+
+    @staticmethod
+    def _info(row):
+        duration, fmt, streams, _ = row
+        return {'duration': duration, 'format': fmt, 'streams': json.loads(streams)}
+
+    def lookup(self, path):
+        """只查缓存，不启动 ffprobe；没有记录或文件已改动时返回 None"""
+        try:
+            row = self._row(file_identity(path))
+        except OSError:
+            return None
+        return self._info(row) if row else None
+
+    def probe(self, path):
+        """返回 {'duration': 秒或 None, 'format': 容器名, 'streams': [流字段, ...]}
+
+        缓存未命中时运行一次 ffprobe 并写入缓存。
+        """
+        identity = file_identity(path)
+        row = self._row(identity)
+        if row:
+            return self._info(row)
+        info = run_ffprobe(path)
+        self._execute("INSERT OR REPLACE INTO probes (path, size, mtime_ns, duration, format, streams, keyframes, probed_at) "
+                      "VALUES (?, ?, ?, ?, ?, ?, NULL, ?)",
+                      identity + (info['duration'], info['format'], json.dumps(info['streams']), time.time()))
+        return info
+
+    def keyframes(self, path):
+        """第一路视频的关键帧时间（秒，升序），第一次请求时探测并缓存"""
+        identity = file_identity(path)
+        row = self._row(identity)
+        if row is None:
+            self.probe(path)
+            row = self._row(identity)
+        if row and row[3] is not None:
+            return json.loads(row[3])
+        keyframes = run_keyframe_probe(path)
+        self._execute("UPDATE probes SET keyframes = ? WHERE path = ? AND size = ? AND mtime_ns = ?",
+                      (json.dumps(keyframes),) + identity)
+        return keyframes
+
+    def forget(self, path):
+        self._execute("DELETE FROM probes WHERE path = ?", (os.path.abspath(path),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 打开数据库失败的进程号，同一进程不再重试
+_unavailable_pid = None
+
+
+def shared_cache():
+    """进程共享的 ProbeCache；数据库无法打开时返回 None"""
+    global _unavailable_pid
+    if _unavailable_pid == os.getpid():
+        return None
+    try:
+        return ProbeCache.instance()
+    except (sqlite3.Error, OSError) as e:
+        print(f"探测缓存不可用，直接运行 ffprobe: {str(e)}")
+        _unavailable_pid = os.getpid()
+        return None
+
+
+def lookup(path):
+    cache = shared_cache()
+    return cache.lookup(path) if cache else None
+
+
+def probe(path):
+    cache = shared_cache()
+    return cache.probe(path) if cache else run_ffprobe(path)
+
+
+def keyframes(path):
+    cache = shared_cache()
+    return cache.keyframes(path) if cache else run_keyframe_probe(path)
+
+
+def cached_duration_ms(path):
+    """缓存中的时长（毫秒），没有记录时返回 None；不启动 ffprobe，可在界面线程中调用"""
+    info = lookup(path)
+    if info is None or not info['duration']:
+        return None
+    return int(info['duration'] * 1000)
+
+
+def first_stream(info, codec_type):
+    """探测结果中第一路指定类型（'audio' / 'video'）的流，没有时返回 None"""
+    for stream in info['streams']:
+        if stream.get('codec_type') == codec_type:
+            return stream
+    return None
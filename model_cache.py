@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import separation
+
+# 默认常驻内存预算，可用环境变量 SEPARATION_MODEL_CACHE_MB 覆盖
+DEFAULT_BUDGET_BYTES = 4 * 1024 ** 3
+
+
+def model_nbytes(model):
+    """模型占用的内存估计：优先使用模型自己的 nbytes，否则按 0 计"""
+    return int(getattr(model, 'nbytes', 0) or 0)
+
+
+class ModelCache:
+    """分离模型的常驻缓存，按 (检查点, 配置文件) 区分，超出内存预算时淘汰最久未用的模型
+
+    normal 与 -fast 两套配置对应不同的 config_paths，会作为两个条目分别缓存。
+    线程安全：同一模型被多个阶段同时请求时只加载一次，其余请求等待加载完成。
+    被淘汰的模型只是不再由缓存持有，正在使用它的推理不受影响。
+    """
+    _instance = None
+
+    def __init__(self, budget_bytes=None, loader=separation.load_model):
+        if budget_bytes is None:
+            try:
+                budget_bytes = int(os.environ['SEPARATION_MODEL_CACHE_MB']) * 1024 ** 2
+            except (KeyError, ValueError):
+                budget_bytes = DEFAULT_BUDGET_BYTES
+        self.budget_bytes = budget_bytes
+        self.loader = loader
+        self._entries = OrderedDict()  # 键 -> (模型, 字节数)，按最近使用排序
+        self._loading = {}  # 键 -> 加载完成时置位的 Event
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    @classmethod
+    def instance(cls):
+        """同一进程中的分离任务共用一个缓存"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def key(spec, **load_options):
+        """缓存键：检查点与配置文件路径，加上影响加载结果的选项（设备、替身模型）"""
+        return (spec['checkpoint'], spec['config_path']) + tuple(sorted(load_options.items()))
+
+    def get(self, spec, **load_options):
+        """返回已加载的模型，未命中时用 loader(spec, **load_options) 加载"""
+        key = self.key(spec, **load_options)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                event = self._loading.get(key)
+                if event is None:
+                    event = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # 其他线程正在加载同一模型，等它完成后重新查找
+            event.wait()
+
+        try:
+            start = time.perf_counter()
+            model = self.loader(spec, **load_options)
+            elapsed = time.perf_counter() - start
+        except BaseException:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+            raise
+
+        with self._lock:
+            nbytes = model_nbytes(model)
+            self._entries[key] = (model, nbytes)
+            self.total_bytes += nbytes
+            self.load_seconds += elapsed
+            self._evict(keep=key)
+            del self._loading[key]
+        event.set()
+        return model
+
+    def _evict(self, keep=None):
+        """淘汰最久未用的模型直到回到预算内；刚加载的模型即使单独超出预算也保留"""
+        for key in list(self._entries):
+            if self.total_bytes <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            _, nbytes = self._entries.pop(key)
+            self.total_bytes -= nbytes
+            self.evictions += 1
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'models': len(self._entries),
+                'bytes': self.total_bytes,
+                'budget': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'load_seconds': self.load_seconds,
+            }
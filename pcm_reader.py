@@ -0,0 +1,166 @@
+import os
+import struct
+import threading
+import weakref
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (格式, 位深) -> 采样在内存映射中的 dtype；24 位没有对应 dtype，单独处理
+SAMPLE_DTYPES = {
+    (WAVE_FORMAT_PCM, 8): np.dtype('u1'),
+    (WAVE_FORMAT_PCM, 16): np.dtype('<i2'),
+    (WAVE_FORMAT_PCM, 32): np.dtype('<i4'),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): np.dtype('<f4'),
+    (WAVE_FORMAT_IEEE_FLOAT, 64): np.dtype('<f8'),
+}
+
+_cache = weakref.WeakValueDictionary()
+_cache_lock = threading.Lock()
+
+
+def parse_wav_header(path):
+    """解析 RIFF/WAVE 头，返回 (fmt 块原始字节, 格式, 声道, 采样率, 位深, 块对齐, 数据偏移, 数据长度)"""
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("不是 WAV 文件")
+        fmt_chunk = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("WAV 文件缺少 data 块")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt_chunk = f.read(chunk_size)
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if fmt_chunk is None:
+                    raise ValueError("WAV 文件缺少 fmt 块")
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+    format_tag, channels, framerate, _, block_align, bits = struct.unpack('<HHIIHH', fmt_chunk[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+        # 扩展头中子格式 GUID 的前两个字节就是实际格式
+        format_tag = struct.unpack('<H', fmt_chunk[24:26])[0]
+    # 流式写出的 WAV 可能没有回填长度，以文件实际大小为准
+    data_size = min(chunk_size, os.path.getsize(path) - data_offset)
+    return fmt_chunk, format_tag, channels, framerate, bits, block_align, data_offset, data_size
+
+
+class PcmReader:
+    """以 NumPy 内存映射方式零拷贝访问 WAV 采样
+
+    支持 8/16/24/32 位整数和 32/64 位浮点 PCM。同一文件通过 open() 共享
+    一个映射，导出、分析和波形绘制都按帧号切片，不各自持有副本。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        (self.fmt_chunk, self.format_tag, self.channels, self.framerate,
+         self.bits, self.block_align, self.data_offset, data_size) = parse_wav_header(path)
+        self.sampwidth = self.bits // 8
+        if self.channels <= 0 or self.block_align != self.sampwidth * self.channels:
+            raise ValueError("不支持的 WAV 格式")
+        if self.format_tag == WAVE_FORMAT_PCM and self.bits == 24:
+            self.dtype = None
+        elif (self.format_tag, self.bits) in SAMPLE_DTYPES:
+            self.dtype = SAMPLE_DTYPES[(self.format_tag, self.bits)]
+        else:
+            raise ValueError(f"不支持的 WAV 格式: format={self.format_tag}, bits={self.bits}")
+
+        self.nframes = data_size // self.block_align
+        if self.nframes:
+            self._raw = np.memmap(path, dtype=np.uint8, mode='r',
+                                  offset=self.data_offset, shape=(self.nframes * self.block_align,))
+        else:
+            self._raw = np.zeros(0, dtype=np.uint8)
+
+        if self.dtype is None:
+            # 24 位：(帧, 声道, 3 字节) 视图
+            self.samples = self._raw.reshape(self.nframes, self.channels, 3)
+        else:
+            self.samples = self._raw.view(self.dtype).reshape(self.nframes, self.channels)
+
+    @classmethod
+    def open(cls, path):
+        """按 (路径, 大小, 修改时间) 共享同一个映射"""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with _cache_lock:
+            reader = _cache.get(key)
+            if reader is None:
+                reader = cls(path)
+                _cache[key] = reader
+        return reader
+
+    @property
+    def duration_ms(self):
+        return int(self.nframes * 1000 / self.framerate) if self.framerate else 0
+
+    def frame_at_ms(self, ms):
+        return max(0, min(int(round(ms * self.framerate / 1000.0)), self.nframes))
+
+    def _clamp(self, start, end):
+        start = max(0, min(int(start), self.nframes))
+        end = max(start, min(int(end), self.nframes))
+        return start, end
+
+    def frames(self, start, end):
+        """[start, end) 帧的原始采样，(帧, 声道)；除 24 位外都是映射上的视图"""
+        start, end = self._clamp(start, end)
+        if self.dtype is not None:
+            return self.samples[start:end]
+        raw = self.samples[start:end]
+        # 24 位小端补成 32 位再算术右移，得到带符号整数
+        wide = (raw[..., 0].astype(np.int32)
+                | (raw[..., 1].astype(np.int32) << 8)
+                | (raw[..., 2].astype(np.int32) << 16))
+        return (wide << 8) >> 8
+
+    def float_frames(self, start, end):
+        """[start, end) 帧归一化到 -1..1 的 float32"""
+        data = self.frames(start, end)
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return data.astype(np.float32, copy=False)
+        if self.bits == 8:
+            return (data.astype(np.float32) - 128.0) / 128.0
+        return data.astype(np.float32) / float(1 << (self.bits - 1))
+
+    def int16_frames(self, start, end):
+        """[start, end) 帧缩放到 int16，供波形绘制使用"""
+        start, end = self._clamp(start, end)
+        if self.dtype == np.dtype('<i2'):
+            return self.samples[start:end]
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            data = self.samples[start:end] * 32767.0
+            return np.clip(data, -32768, 32767).astype(np.int16)
+        if self.bits == 8:
+            return ((self.samples[start:end].astype(np.int16) - 128) << 8).astype(np.int16)
+        if self.bits == 24:
+            # 取每个采样的高两个字节
+            return self.samples[start:end, :, 1:].copy().view('<i2')[..., 0]
+        return (self.samples[start:end] >> 16).astype(np.int16)
+
+    def raw_bytes(self, start, end):
+        """[start, end) 帧的原始字节（映射上的视图）"""
+        start, end = self._clamp(start, end)
+        return self._raw[start * self.block_align:end * self.block_align]
+
+
+def write_wav_header(f, fmt_chunk, data_size):
+    """写出与源文件相同 fmt 块的 WAV 头"""
+    riff_size = 4 + 8 + len(fmt_chunk) + len(fmt_chunk) % 2 + 8 + data_size + data_size % 2
+    f.write(struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE'))
+    f.write(struct.pack('<4sI', b'fmt ', len(fmt_chunk)))
+    f.write(fmt_chunk)
+    if len(fmt_chunk) % 2:
+        f.write(b'\x00')
+    f.write(struct.pack('<4sI', b'data', data_size))
@@ -0,0 +1,102 @@
+"""视频编辑器使用的低分辨率代理文件
+
+代理是每一帧都是关键帧（all-intra）的小尺寸 H.264，任意位置定位都只需解码
+一帧，拖动进度条和前进/后退时不再卡顿。代理与原文件时间轴一致，播放器
+报告的位置可直接作为剪切时间；导出始终使用原文件。
+
+代理按原文件的内容指纹缓存在本地缓存目录的 proxies 子目录中，超出上限时
+按最近使用时间淘汰。
+"""
+import os
+import subprocess
+
+import tracing
+from app_cache import cache_dir
+from conversion_cache import ConversionCache
+from video_processor import ConversionCancelled, probe_duration, watch_progress
+
+# 代理的画面高度（像素），原视频更矮时保持原尺寸
+PROXY_HEIGHT = 360
+# 参与缓存键计算的代理参数，修改后旧代理自动失效
+PROXY_PARAMS = {'height': PROXY_HEIGHT, 'codec': 'libx264', 'gop': 1, 'crf': 30}
+# 默认缓存上限，可用环境变量 AV_PROXY_CACHE_MB 覆盖
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+
+def proxy_cache():
+    try:
+        max_bytes = int(os.environ['AV_PROXY_CACHE_MB']) * 1024 ** 2
+    except (KeyError, ValueError):
+        max_bytes = DEFAULT_MAX_BYTES
+    return ConversionCache(cache_dir('proxies'), max_bytes)
+
+
+def proxy_path(input_file, cache=None):
+    cache = cache or proxy_cache()
+    return cache.entry_path(cache.key(input_file, PROXY_PARAMS), '.mp4')
+
+
+def find_proxy(input_file, cache=None):
+    """已有代理时返回其路径并刷新使用时间，否则返回 None"""
+    path = proxy_path(input_file, cache)
+    if not os.path.exists(path):
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return path
+
+
+def build_proxy_command(input_file, output_file, height=PROXY_HEIGHT):
+    return [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-progress', 'pipe:1', '-nostats',
+        '-i', input_file,
+        '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', f"scale=-2:'min({height},ih)'",
+        # 每帧都是关键帧且没有 B 帧，定位到任意位置只解码一帧
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-tune', 'fastdecode',
+        '-g', '1', '-bf', '0', '-crf', str(PROXY_PARAMS['crf']), '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-b:a', '128k',
+        '-movflags', '+faststart',
+        '-f', 'mp4',
+        '-y', output_file
+    ]
+
+
+def build_proxy(input_file, cache=None, progress_callback=None, is_cancelled=None):
+    """生成代理并放入缓存，返回代理路径；已存在时直接返回
+
+    先写入缓存目录中的临时文件，完成后原子地重命名。is_cancelled() 为 True 时
+    终止 ffmpeg、删除临时文件并抛出 ConversionCancelled。
+    """
+    cache = cache or proxy_cache()
+    path = find_proxy(input_file, cache)
+    if path is not None:
+        return path
+    path = proxy_path(input_file, cache)
+    # 以 .tmp 结尾，淘汰时不会把正在生成的文件算进去
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    # 探测结果会写入 media_probe 缓存，之后打开同一文件时编辑器可以直接得到时长
+    duration = probe_duration(input_file)
+    command = build_proxy_command(input_file, temp_file)
+
+    with tracing.span('build_proxy', path=input_file):
+        with tracing.run_span(command):
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            cancelled, stderr = watch_progress(process, duration, progress_callback, is_cancelled)
+        try:
+            if cancelled or (is_cancelled and is_cancelled()):
+                raise ConversionCancelled("代理生成已取消")
+            if process.returncode != 0:
+                print(f"代理生成失败: {stderr}")
+                raise Exception("代理生成失败")
+            os.replace(temp_file, path)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+    cache.evict()
+    if progress_callback:
+        progress_callback(100)
+    return path
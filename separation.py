@@ -0,0 +1,409 @@
+"""音源分离引擎：读取 presets/*.json，经 model_config_zh.json 解析模型，分块重叠相加推理
+
+模型接口：model(batch) 接受 (批, 声道, 采样) 的 float32 数组，返回
+(批, 音轨, 声道, 采样)，model.instruments 给出音轨名称。
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+from pcm_reader import PcmReader
+from wav_utils import FloatWavWriter
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_CONFIG_FILE = os.path.join(APP_DIR, 'model_config_zh.json')
+PRESETS_DIR = os.path.join(APP_DIR, 'presets')
+
+# 预设中的阶段字段 -> model_config_zh.json 中的模型列表，按处理顺序排列
+STAGE_MODEL_LISTS = {
+    'vocal_model_name': 'vocal_models',
+    'kara_model_name': 'kara_models',
+    'reverb_model_name': 'reverb_models',
+    'other_model_name': 'other_models',
+}
+
+# 配置文件缺失或无法解析时使用的推理参数
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_CHUNK_SIZE = 352800  # 8 秒
+DEFAULT_NUM_OVERLAP = 4
+FAST_NUM_OVERLAP = 2
+# 窗口两端淡入淡出的长度占块长的比例
+FADE_DIVISOR = 10
+
+# 各阶段默认输出的音轨（替身模型，或配置中没有音轨列表时使用），第一个为送往下一阶段的主音轨
+STAND_IN_INSTRUMENTS = {
+    'vocal_model_name': ('vocals', 'other'),
+    'kara_model_name': ('karaoke', 'other'),
+    'reverb_model_name': ('noreverb', 'reverb'),
+    'other_model_name': ('dry', 'other'),
+}
+
+
+def model_root():
+    """模型配置与检查点所在目录（Music-Source-Separation-Training 工程根目录）
+
+    环境变量 SEPARATION_MODEL_ROOT 指定，默认为程序目录。
+    """
+    return os.environ.get('SEPARATION_MODEL_ROOT') or APP_DIR
+
+
+def load_preset(preset):
+    """读取预设，preset 为 JSON 路径或 presets 目录下的名称（如 '11'）"""
+    path = preset
+    if not os.path.exists(path):
+        path = os.path.join(PRESETS_DIR, f"{preset}.json")
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_model_config(path=MODEL_CONFIG_FILE):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_inference_config(config_path, if_fast=False):
+    """从模型的 YAML 配置读取采样率、块长、重叠数与音轨列表
+
+    PyYAML 是可选依赖；没有安装或配置文件不存在时使用默认值。
+    """
+    params = {
+        'sample_rate': DEFAULT_SAMPLE_RATE,
+        'chunk_size': DEFAULT_CHUNK_SIZE,
+        'num_overlap': FAST_NUM_OVERLAP if if_fast else DEFAULT_NUM_OVERLAP,
+        'instruments': None,
+    }
+    try:
+        import yaml
+        with open(config_path, encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    except (ImportError, OSError, ValueError):
+        return params
+    except Exception as e:
+        # yaml.YAMLError 只有在导入成功后才能引用
+        print(f"无法解析模型配置 {config_path}: {str(e)}")
+        return params
+
+    audio = config.get('audio') or {}
+    inference = config.get('inference') or {}
+    training = config.get('training') or {}
+    params['sample_rate'] = int(audio.get('sample_rate', params['sample_rate']))
+    params['chunk_size'] = int(audio.get('chunk_size', params['chunk_size']))
+    params['num_overlap'] = int(inference.get('num_overlap', params['num_overlap']))
+    instruments = training.get('instruments')
+    target = training.get('target_instrument')
+    if target:
+        instruments = [target] + [name for name in instruments or [] if name != target]
+    params['instruments'] = instruments
+    return params
+
+
+def resolve_model(model_config, stage, model_name, if_fast=False):
+    """把预设中某个阶段选中的模型解析为完整的模型描述
+
+    模型类型取自 model_types，配置文件取自 config_paths：下标 0 为普通版，
+    1 为 -fast 版。检查点按 MSST 工程的目录结构放在 pretrain/<模型列表>/ 下。
+    """
+    list_name = STAGE_MODEL_LISTS[stage]
+    if not model_name or model_name == 'None':
+        raise ValueError(f"{stage} 未选择模型")
+    if model_name not in model_config[list_name]:
+        raise ValueError(f"{list_name} 中没有模型: {model_name}")
+    if model_name not in model_config['model_types'] or model_name not in model_config['config_paths']:
+        raise ValueError(f"model_config_zh.json 缺少 {model_name} 的类型或配置路径")
+
+    root = model_root()
+    config_paths = model_config['config_paths'][model_name]
+    config_path = os.path.join(root, config_paths[1 if if_fast and len(config_paths) > 1 else 0])
+    spec = {
+        'stage': stage,
+        'name': model_name,
+        'model_type': model_config['model_types'][model_name],
+        'config_path': config_path,
+        'checkpoint': os.path.join(root, 'pretrain', list_name, model_name),
+        'if_fast': bool(if_fast),
+    }
+    spec.update(read_inference_config(config_path, if_fast))
+    return spec
+
+
+def preset_stages(preset, model_config=None):
+    """按处理顺序返回预设中启用的阶段的模型描述，值为 false/None 的阶段跳过"""
+    model_config = model_config or load_model_config()
+    if_fast = preset.get('if_fast', False)
+    specs = [resolve_model(model_config, stage, preset[stage], if_fast)
+             for stage in STAGE_MODEL_LISTS
+             if preset.get(stage) and preset[stage] != 'None']
+    for spec in specs:
+        spec['use_tta'] = bool(preset.get('use_tta', False))
+    return specs
+
+
+class StandInModel:
+    """不依赖检查点的替身模型，用来在没有真实模型时验证整条流水线
+
+    主音轨取各声道的均值（居中的成分），第二条音轨为原信号减去主音轨，
+    两者相加严格等于输入。逐采样计算，分块重叠相加后的结果与整段
+    直接计算一致，可用于校验分块与拼接。
+    """
+
+    # 没有权重，ModelCache 按 0 字节计
+    nbytes = 0
+
+    def __init__(self, instruments=('vocals', 'other')):
+        self.instruments = list(instruments)
+
+    def __call__(self, batch):
+        center = np.broadcast_to(batch.mean(axis=1, keepdims=True), batch.shape)
+        stems = [center, batch - center]
+        stems += [np.zeros_like(batch)] * (len(self.instruments) - 2)
+        return np.stack(stems[:len(self.instruments)], axis=1)
+
+
+class TorchModel:
+    """包装 MSST 的 PyTorch 模型，使其符合 numpy 进、numpy 出的接口"""
+
+    def __init__(self, model, instruments, device='cpu'):
+        self.model = model
+        self.instruments = list(instruments)
+        self.device = device
+        # 参数与缓冲区的总字节数，供 ModelCache 计算内存预算
+        self.nbytes = sum(tensor.numel() * tensor.element_size()
+                          for tensor in list(model.parameters()) + list(model.buffers()))
+
+    def __call__(self, batch):
+        import torch
+        with torch.inference_mode():
+            output = self.model(torch.from_numpy(np.ascontiguousarray(batch)).to(self.device))
+        return complete_stems(batch, output.float().cpu().numpy(), self.instruments)
+
+
+def complete_stems(batch, output, instruments):
+    """把模型输出整理成 (批, 音轨, 声道, 采样)，音轨数与 instruments 一致
+
+    配置了 target_instrument 的模型只输出目标音轨（可能没有音轨维度），
+    instruments 却是 [目标, 其余]：其余部分取混音减去目标。其他情况下
+    音轨数不一致时抛出 ValueError，而不是让广播把一条音轨复制成多条。
+    """
+    if output.ndim == 3:
+        # 单音轨模型输出 (批, 声道, 采样)
+        output = output[:, np.newaxis]
+    if output.shape[1] == 1 and len(instruments) == 2:
+        output = np.concatenate([output, batch[:, np.newaxis] - output], axis=1)
+    if output.shape[1] != len(instruments):
+        raise ValueError(f"模型输出 {output.shape[1]} 条音轨，配置中为 {len(instruments)} 条: {instruments}")
+    return output
+
+
+# 测试时增强：名称 -> (输入变换, 输出逆变换)；输入为 (批, 声道, 采样)，输出为 (批, 音轨, 声道, 采样)
+TTA_AUGMENTATIONS = {
+    'polarity': (lambda batch: -batch, lambda output: -output),
+    'channel_swap': (lambda batch: batch[:, ::-1], lambda output: output[:, :, ::-1]),
+}
+
+
+class TTAModel:
+    """测试时增强：原始输入与各增强版本的结果逆变换后取平均
+
+    batched=True 时把所有版本沿批维度拼接，每个块只做一次前向推理；
+    False 时逐个版本单独推理，仅用于对比。单声道输入跳过声道交换。
+    """
+
+    def __init__(self, model, augmentations=tuple(TTA_AUGMENTATIONS), batched=True):
+        self.model = model
+        self.augmentations = list(augmentations)
+        self.batched = batched
+        self.instruments = model.instruments
+        self.nbytes = getattr(model, 'nbytes', 0)
+
+    def __call__(self, batch):
+        transforms = [TTA_AUGMENTATIONS[name] for name in self.augmentations
+                      if name != 'channel_swap' or batch.shape[1] > 1]
+        variants = [batch] + [forward(batch) for forward, _ in transforms]
+        if self.batched:
+            outputs = np.split(self.model(np.concatenate(variants)), len(variants))
+        else:
+            outputs = [self.model(np.ascontiguousarray(variant)) for variant in variants]
+        result = np.array(outputs[0], dtype=np.float32)
+        for (_, inverse), output in zip(transforms, outputs[1:]):
+            result += inverse(output)
+        result /= len(variants)
+        return result
+
+
+def load_torch_model(spec, force_cpu=True):
+    """通过 MSST 工程的 get_model_from_config 构建模型并加载检查点
+
+    PyTorch 与 MSST 代码都是可选依赖，缺失时给出明确的错误。
+    """
+    root = model_root()
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    try:
+        import torch
+        from utils import get_model_from_config
+    except ImportError as e:
+        raise RuntimeError(f"加载 {spec['name']} 需要 PyTorch 和 Music-Source-Separation-Training 代码"
+                           f"（SEPARATION_MODEL_ROOT={root}）: {str(e)}")
+    device = 'cpu' if force_cpu or not torch.cuda.is_available() else 'cuda'
+    model, _ = get_model_from_config(spec['model_type'], spec['config_path'])
+    state = torch.load(spec['checkpoint'], map_location='cpu')
+    model.load_state_dict(state.get('state_dict', state) if isinstance(state, dict) else state)
+    model.to(device).eval()
+    instruments = spec.get('instruments') or STAND_IN_INSTRUMENTS[spec['stage']]
+    return TorchModel(model, instruments, device)
+
+
+# model_types 中的类型 -> 加载函数
+MODEL_LOADERS = {
+    'bs_roformer': load_torch_model,
+    'mel_band_roformer': load_torch_model,
+    'apollo': load_torch_model,
+}
+
+
+def load_model(spec, force_cpu=True, stand_in=False):
+    """按模型类型加载模型；stand_in=True 时返回替身模型"""
+    if stand_in:
+        return StandInModel(spec.get('instruments') or STAND_IN_INSTRUMENTS[spec['stage']])
+    loader = MODEL_LOADERS.get(spec['model_type'])
+    if loader is None:
+        raise ValueError(f"不支持的模型类型: {spec['model_type']}")
+    return loader(spec, force_cpu)
+
+
+def make_window(chunk_size, fade_size, fade_in=True, fade_out=True):
+    """中间为 1、两端线性淡入淡出的窗口；首块不淡入，末块不淡出"""
+    window = np.ones(chunk_size, dtype=np.float32)
+    if fade_size > 0:
+        ramp = np.linspace(0.0, 1.0, fade_size, dtype=np.float32)
+        if fade_in:
+            window[:fade_size] = ramp
+        if fade_out:
+            window[-fade_size:] = ramp[::-1]
+    return window
+
+
+def separate_stream(model, read_frames, nframes, channels, write_block,
+                    chunk_size=DEFAULT_CHUNK_SIZE, num_overlap=DEFAULT_NUM_OVERLAP, batch_size=1,
+                    progress_callback=None, is_cancelled=None):
+    """固定长度、相互重叠的块逐批送入模型，加窗后重叠相加
+
+    read_frames(start, end) 返回 (帧, 声道) 的 float32 采样；每当一段输出
+    不再受后续块影响，就以 write_block(start, {音轨: (帧, 声道)}) 交出。
+    累加缓冲只有一个块长，内存占用只取决于 chunk_size 与 batch_size，
+    与输入长度无关。返回 False 表示被取消。
+    """
+    if nframes <= 0:
+        return True
+    chunk_size = max(1, min(chunk_size, nframes))
+    hop = max(1, chunk_size // max(1, num_overlap))
+    # 没有重叠时不能淡入淡出，否则块边界处权重为零
+    fade_size = min(chunk_size // FADE_DIVISOR, chunk_size - hop)
+    positions = []
+    position = 0
+    while True:
+        positions.append(position)
+        if position + chunk_size >= nframes:
+            break
+        position += hop
+
+    instruments = model.instruments
+    acc = np.zeros((len(instruments), channels, chunk_size), dtype=np.float32)
+    weight = np.zeros(chunk_size, dtype=np.float32)
+    base = 0
+
+    for group_start in range(0, len(positions), batch_size):
+        if is_cancelled and is_cancelled():
+            return False
+        group = positions[group_start:group_start + batch_size]
+        batch = np.zeros((len(group), channels, chunk_size), dtype=np.float32)
+        for i, start in enumerate(group):
+            frames = read_frames(start, min(start + chunk_size, nframes))
+            batch[i, :, :len(frames)] = frames.T
+        output = model(batch)
+
+        for i, start in enumerate(group):
+            last = start == positions[-1]
+            window = make_window(chunk_size, fade_size, fade_in=start > 0, fade_out=not last)
+            acc += output[i] * window
+            weight += window
+            # start 即 base：[base, base + hop) 之后不会再有块覆盖，可以交出
+            emit = min(nframes, base + chunk_size) - base if last else hop
+            stems = acc[..., :emit] / np.maximum(weight[:emit], 1e-8)
+            write_block(base, {name: stems[j].T for j, name in enumerate(instruments)})
+            if not last:
+                acc[..., :-hop] = acc[..., hop:]
+                acc[..., -hop:] = 0.0
+                weight[:-hop] = weight[hop:]
+                weight[-hop:] = 0.0
+                base += hop
+        if progress_callback:
+            done = min(nframes, group[-1] + chunk_size)
+            progress_callback(int(done * 100 / nframes))
+    return True
+
+
+def separate_array(model, audio, **options):
+    """对内存中的 (帧, 声道) 数组做分离，返回 {音轨: (帧, 声道) 数组}"""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim == 1:
+        audio = audio[:, np.newaxis]
+    nframes, channels = audio.shape
+    stems = {name: np.empty_like(audio) for name in model.instruments}
+
+    def write_block(start, block):
+        for name, frames in block.items():
+            stems[name][start:start + len(frames)] = frames
+
+    if not separate_stream(model, lambda start, end: audio[start:end], nframes, channels,
+                           write_block, **options):
+        return None
+    return stems
+
+
+def separate_file(model, input_file, output_dir, sample_rate=DEFAULT_SAMPLE_RATE, **options):
+    """对 WAV 文件做分离，每条音轨流式写成 <文件名>_<音轨>.wav（32 位浮点）
+
+    输入通过 PcmReader 内存映射按块读取。返回 {音轨: 输出路径}，取消时返回 None。
+    """
+    reader = input_file if isinstance(input_file, PcmReader) else PcmReader.open(input_file)
+    if reader.framerate != sample_rate:
+        raise ValueError(f"模型需要 {sample_rate} Hz 的输入，{reader.path} 为 {reader.framerate} Hz，"
+                         f"请先用 batch_convert.py -p cd 转换")
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(reader.path))[0]
+    paths = {name: os.path.join(output_dir, f"{base}_{name}.wav") for name in model.instruments}
+    if not separate_to_files(model, reader, paths, **options):
+        return None
+    return paths
+
+
+def separate_to_files(model, reader, paths, **options):
+    """从 PcmReader 按块读取，每条音轨流式写到 paths[音轨]（32 位浮点 WAV）
+
+    输入与输出都不会整段进入内存。返回 False 表示被取消，此时删除已写的部分文件。
+    """
+    writers = {name: FloatWavWriter(paths[name], reader.channels, reader.framerate)
+               for name in model.instruments}
+
+    def write_block(start, block):
+        for name, frames in block.items():
+            writers[name].write(frames)
+
+    try:
+        completed = separate_stream(model, reader.float_frames, reader.nframes, reader.channels,
+                                    write_block, **options)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    if not completed:
+        for name in writers:
+            os.remove(paths[name])
+    return completed
+
+
+def stage_options(spec, batch_size=1):
+    """separate_* 的分块参数"""
+    return {'chunk_size': spec['chunk_size'], 'num_overlap': spec['num_overlap'], 'batch_size': batch_size}
@@ -0,0 +1,330 @@
+"""多阶段分离的阶段图执行器
+
+原始混音通过 PcmReader 内存映射按块读取。中间音轨不落盘：上游阶段每交出
+一段输出，就把它推入下游阶段的有界队列（StemStream），下游阶段按块从队列
+中取输入，各阶段像流水线一样同时推进。只有没有下游阶段使用的最终音轨才用
+FloatWavWriter 写到磁盘。整段音频与中间音轨都不进入内存，占用只取决于各
+阶段的块长与批大小。每个阶段记录耗时与期间的进程内存峰值。
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from pcm_reader import PcmReader
+from wav_utils import FloatWavWriter
+import separation
+
+# 预设中的阶段字段 -> 阶段名
+STAGE_NAMES = {stage: stage.replace('_model_name', '') for stage in separation.STAGE_MODEL_LISTS}
+# 内存采样间隔（秒）
+SAMPLE_INTERVAL = 0.02
+
+
+class Stage:
+    """阶段图中的一个节点
+
+    source 为 None 表示输入是原始混音，否则为 (上游阶段名, 音轨序号)：
+    序号 0 是上游的主音轨，1 是余下的部分（如伴奏）。
+    """
+
+    def __init__(self, name, spec, source=None):
+        self.name = name
+        self.spec = spec
+        self.source = source
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, {self.spec['name']!r}, source={self.source!r})"
+
+
+def preset_graph(preset, model_config=None):
+    """按预设构建阶段图，值为 false/None 的阶段不出现在图中
+
+    人声链 vocal -> kara -> reverb 依次处理上一阶段的主音轨；other 阶段
+    默认接在人声链末尾，预设中 "other_model_input": "instrumental" 时改为
+    处理 vocal 阶段分出的伴奏，此时它与 kara/reverb 是并行的两条分支。
+    这是图中唯一的分支：没有这个字段的预设（包括 presets 目录下的全部
+    预设）是一条链。
+    """
+    stages = []
+    chain = None
+    vocal_stage = None
+    for spec in separation.preset_stages(preset, model_config):
+        name = STAGE_NAMES[spec['stage']]
+        if name == 'other' and preset.get('other_model_input') == 'instrumental':
+            source = (vocal_stage, 1) if vocal_stage else None
+        else:
+            source = (chain, 0) if chain else None
+            chain = name
+        if name == 'vocal':
+            vocal_stage = name
+        stages.append(Stage(name, spec, source))
+    return stages
+
+
+def current_rss():
+    """当前进程的私有常驻内存（字节），无法获取时返回 None
+
+    不计文件映射的页：输入与中间音轨通过内存映射按块读取，读过的页可随时
+    回收，计入后峰值会随音频长度增长，反映不出分块推理真正占用的内存。
+    """
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.rss - getattr(info, 'shared', 0)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            fields = f.read().split()
+        return (int(fields[1]) - int(fields[2])) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class MemorySampler:
+    """后台线程定期采样进程内存，为每个正在运行的阶段记录期间的峰值
+
+    进程内存无法按线程区分：阶段并发运行时，各自记录的峰值是同时运行的
+    所有阶段的合计，overlapped 给出这些阶段的名称。
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            for record in self._active.values():
+                record['peak_rss'] = max(record['peak_rss'], rss)
+
+    def begin(self, name):
+        rss = current_rss() or 0
+        with self._lock:
+            for record in self._active.values():
+                record['overlapped'].add(name)
+            self._active[name] = {'start_rss': rss, 'peak_rss': rss, 'overlapped': set(self._active)}
+
+    def end(self, name):
+        self._sample()
+        with self._lock:
+            record = self._active.pop(name)
+        record['overlapped'] = sorted(record['overlapped'])
+        return record
+
+
+class StreamAborted(Exception):
+    """另一端的阶段已失败或被取消，流中不会再有数据"""
+
+
+class StemStream:
+    """从上游阶段流向下游阶段的一条音轨，只缓冲下游下一个块所需的帧
+
+    上游 push() 依次追加帧，下游 read(start, end) 取 [start, end) 帧并丢弃
+    start 之前的部分（分块推理的读取起点单调不减）。缓冲达到 capacity 帧
+    （下游的块长）时 push() 阻塞，直到下游取走数据；缓冲不足 capacity 时
+    push() 总能继续，因此下游等待的块最终都会到齐。
+    """
+
+    def __init__(self, channels, capacity):
+        self.capacity = capacity
+        self.wait_seconds = 0.0
+        self._data = np.zeros((0, channels), dtype=np.float32)
+        self._offset = 0  # _data[0] 对应的帧号
+        self._finished = False
+        self._aborted = False
+        self._condition = threading.Condition()
+
+    def push(self, frames):
+        with self._condition:
+            while len(self._data) >= self.capacity and not self._aborted:
+                self._condition.wait()
+            if self._aborted:
+                raise StreamAborted()
+            self._data = np.concatenate([self._data, frames])
+            self._condition.notify_all()
+
+    def finish(self):
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def abort(self):
+        with self._condition:
+            self._aborted = True
+            self._condition.notify_all()
+
+    def read(self, start, end):
+        """(帧, 声道) 的 float32 采样；上游没有更多数据时返回已有的部分"""
+        with self._condition:
+            # 先丢弃不再需要的帧，腾出的空间让上游继续推入
+            drop = min(len(self._data), max(0, start - self._offset))
+            if drop:
+                self._data = self._data[drop:]
+                self._offset += drop
+                self._condition.notify_all()
+            begin = time.perf_counter()
+            while self._offset + len(self._data) < end and not self._finished and not self._aborted:
+                self._condition.wait()
+            self.wait_seconds += time.perf_counter() - begin
+            if self._aborted:
+                raise StreamAborted()
+            return self._data[start - self._offset:end - self._offset].copy()
+
+
+class GatedModel:
+    """前向推理前先取得 gate，限制同时推理的阶段数；等待上游数据时不占用"""
+
+    def __init__(self, model, gate):
+        self.model = model
+        self.gate = gate
+        self.instruments = model.instruments
+
+    def __call__(self, batch):
+        with self.gate:
+            return self.model(batch)
+
+
+def run_graph(stages, source, stem_path, load_model=separation.load_model, max_workers=None, batch_size=1,
+              progress_callback=None, is_cancelled=None):
+    """执行阶段图
+
+    source 为原始混音的 WAV 路径或 PcmReader。load_model(spec) 返回模型。
+    全部阶段同时启动：下游阶段的输入来自上游音轨的 StemStream，中间音轨
+    只在内存中流过。没有下游阶段使用的音轨写到 stem_path(阶段名, 音轨名)
+    给出的路径。max_workers 限制同时做前向推理的阶段数，默认不限制。
+    返回 ({(阶段名, 音轨名): 路径}, 报告列表)，取消时路径表为 None。报告按
+    阶段完成顺序给出模型名、加载/推理/总耗时（秒）、推理期间等待上游数据
+    的时间、期间的进程内存峰值（字节）以及同时运行的阶段（overlapped，
+    非空时峰值为合计）。
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        if stage.source is not None and stage.source[0] not in names:
+            raise ValueError(f"阶段 {stage.name} 的上游 {stage.source[0]} 不存在")
+
+    reader = source if isinstance(source, PcmReader) else PcmReader.open(source)
+    # 下游阶段名 -> 它的输入流；(上游阶段名, 音轨序号) -> 该音轨流向的输入流
+    streams = {stage.name: StemStream(reader.channels, stage.spec['chunk_size'])
+               for stage in stages if stage.source is not None}
+    consumers = {}
+    for stage in stages:
+        if stage.source is not None:
+            consumers.setdefault(stage.source, []).append(streams[stage.name])
+    gate = threading.BoundedSemaphore(max_workers) if max_workers else None
+
+    def run_stage(stage, sampler):
+        sampler.begin(stage.name)
+        start = time.perf_counter()
+        model = load_model(stage.spec)
+        if stage.spec.get('use_tta'):
+            # 增强版本与原始输入拼成一批，一次前向推理
+            model = separation.TTAModel(model)
+        if gate is not None:
+            model = GatedModel(model, gate)
+        loaded = time.perf_counter()
+
+        outgoing = {name: consumers.get((stage.name, index), []) for index, name in enumerate(model.instruments)}
+        paths = {name: stem_path(stage.name, name) for name, targets in outgoing.items() if not targets}
+        writers = {}
+        completed = False
+        try:
+            for name, path in paths.items():
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                writers[name] = FloatWavWriter(path, reader.channels, reader.framerate)
+
+            def write_block(offset, block):
+                for name, frames in block.items():
+                    if name in writers:
+                        writers[name].write(frames)
+                    for stream in outgoing[name]:
+                        stream.push(frames)
+
+            stream = streams.get(stage.name)
+            read_frames = stream.read if stream is not None else reader.float_frames
+            try:
+                completed = separation.separate_stream(
+                    model, read_frames, reader.nframes, reader.channels, write_block,
+                    is_cancelled=is_cancelled, **separation.stage_options(stage.spec, batch_size))
+            except StreamAborted:
+                completed = False
+        finally:
+            for writer in writers.values():
+                writer.close()
+            for targets in outgoing.values():
+                for target in targets:
+                    if completed:
+                        target.finish()
+                    else:
+                        target.abort()
+            if not completed:
+                for name in writers:
+                    os.remove(paths[name])
+        finished = time.perf_counter()
+        memory = sampler.end(stage.name)
+        return stage, paths if completed else None, {
+            'stage': stage.name,
+            'model': stage.spec['name'],
+            'load_seconds': loaded - start,
+            'infer_seconds': finished - loaded,
+            'wait_seconds': stream.wait_seconds if stream is not None else 0.0,
+            'seconds': finished - start,
+            'peak_rss': memory['peak_rss'],
+            'rss_increase': memory['peak_rss'] - memory['start_rss'],
+            'overlapped': memory['overlapped'],
+        }
+
+    def abort_all():
+        for stream in streams.values():
+            stream.abort()
+
+    outputs = {}
+    report = []
+    cancelled = False
+    error = None
+    # 流水线上的阶段互相等待数据，必须各占一个线程同时运行
+    with MemorySampler() as sampler, ThreadPoolExecutor(max_workers=max(1, len(stages))) as pool:
+        running = {pool.submit(run_stage, stage, sampler) for stage in stages}
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    stage, paths, stats = future.result()
+                except Exception as e:
+                    error = error or e
+                    abort_all()
+                    continue
+                report.append(stats)
+                if paths is None:
+                    cancelled = True
+                    abort_all()
+                    continue
+                for name, path in paths.items():
+                    outputs[(stage.name, name)] = path
+                if progress_callback:
+                    progress_callback(int(len(report) * 100 / len(stages)))
+    if error is not None:
+        raise error
+    if cancelled:
+        return None, report
+    return outputs, report
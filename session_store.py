@@ -0,0 +1,204 @@
+"""剪切会话的持久存储
+
+每个源文件的剪切区间保存在本地数据目录下的 SQLite 数据库中，编辑器窗口
+在保存片段之前关闭也不会丢失，重新打开同一文件时立即恢复。
+
+files 表每个源文件一行，记录类型（audio / video）、时长与状态：
+    pending   有尚未导出的剪切区间
+    exported  区间已全部交给导出
+    empty     没有区间
+文件路径、时长与状态上都有索引，"所有有未导出片段的文件"之类的查询只走索引。
+cuts 表保存每个文件当前的区间。
+
+导出任务成功后才把对应区间从文件中移除，区间全部导出后状态记为 exported；
+导出失败、被取消或用户跳过的区间保留为 pending。
+
+编辑器每次修改只更新内存中的待写表，由后台定时器合并成一个事务写入，
+不会每次点击都写一次磁盘；关闭窗口或退出进程时立即写入剩余部分。
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from app_cache import data_root
+
+DB_NAME = 'sessions.sqlite3'
+# 修改后延迟多久合并写入（秒）
+FLUSH_DELAY = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    duration_ms INTEGER,
+    status TEXT NOT NULL,
+    cut_count INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    exported_at REAL
+);
+CREATE INDEX IF NOT EXISTS files_status ON files (status, updated_at);
+CREATE INDEX IF NOT EXISTS files_duration ON files (duration_ms);
+CREATE TABLE IF NOT EXISTS cuts (
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    PRIMARY KEY (file_id, start_ms)
+) WITHOUT ROWID;
+"""
+
+STATUSES = ('pending', 'exported', 'empty')
+
+
+def default_db_path():
+    """环境变量 AV_SESSION_DB，否则为本地数据目录下的 sessions.sqlite3"""
+    path = os.environ.get('AV_SESSION_DB')
+    if path:
+        return path
+    root = data_root()
+    os.makedirs(root, exist_ok=True)
+    return os.path.join(root, DB_NAME)
+
+
+class SessionStore:
+    """按源文件保存剪切区间，写入在后台合并为事务，线程安全"""
+    _instance = None
+
+    def __init__(self, db_path=None, flush_delay=FLUSH_DELAY):
+        self.db_path = db_path or default_db_path()
+        self.flush_delay = flush_delay
+        self._lock = threading.Lock()
+        self._pending = {}  # 绝对路径 -> 待写入的 (类型, 时长, 区间列表, 状态)
+        self._timer = None
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:
+            pass
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        atexit.register(self.flush)
+
+    @classmethod
+    def instance(cls):
+        """同一进程的编辑器共用一个存储"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def _schedule(self):
+        # 调用方已持有 _lock
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def save_cuts(self, path, cuts, kind, duration_ms=None):
+        """记录 path 当前的剪切区间（可迭代的 (start_ms, end_ms)），稍后合并写入"""
+        cuts = [(int(start), int(end)) for start, end in cuts]
+        with self._lock:
+            self._pending[os.path.abspath(path)] = (kind, duration_ms, cuts, 'pending' if cuts else 'empty')
+            self._schedule()
+
+    def mark_exported(self, path, cuts, kind, duration_ms=None):
+        """从 path 的区间中移除已成功导出的 cuts，全部导出后状态记为 exported"""
+        path = os.path.abspath(path)
+        exported = {(int(start), int(end)) for start, end in cuts}
+        with self._lock:
+            if path in self._pending:
+                current = self._pending[path][2]
+            else:
+                current = self._stored_cuts(path)
+            remaining = [cut for cut in current if cut not in exported]
+            self._pending[path] = (kind, duration_ms, remaining, 'pending' if remaining else 'exported')
+            self._schedule()
+
+    def flush(self):
+        """把所有待写的修改写入数据库，一次事务"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            now = time.time()
+            try:
+                with self._conn:
+                    for path, (kind, duration_ms, cuts, status) in pending.items():
+                        self._conn.execute(
+                            "INSERT INTO files (path, kind, duration_ms, status, cut_count, updated_at, exported_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT (path) DO UPDATE SET kind = excluded.kind, "
+                            "duration_ms = COALESCE(excluded.duration_ms, files.duration_ms), "
+                            "status = excluded.status, cut_count = excluded.cut_count, "
+                            "updated_at = excluded.updated_at, "
+                            "exported_at = COALESCE(excluded.exported_at, files.exported_at)",
+                            (path, kind, duration_ms, status, len(cuts), now, now if status == 'exported' else None))
+                        file_id, = self._conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+                        self._conn.execute("DELETE FROM cuts WHERE file_id = ?", (file_id,))
+                        self._conn.executemany(
+                            "INSERT OR REPLACE INTO cuts (file_id, start_ms, end_ms) VALUES (?, ?, ?)",
+                            [(file_id, start, end) for start, end in cuts])
+            except sqlite3.Error as e:
+                print(f"保存剪切会话失败: {str(e)}")
+                # 保留未写入的修改，下次写入时重试
+                self._pending = pending
+
+    def load_cuts(self, path):
+        """path 保存的剪切区间，按起点排序；尚未写入的修改优先"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._pending:
+                return list(self._pending[path][2])
+            return self._stored_cuts(path)
+
+    def _stored_cuts(self, path):
+        # 调用方已持有 _lock
+        return self._conn.execute(
+            "SELECT start_ms, end_ms FROM cuts JOIN files ON files.id = cuts.file_id "
+            "WHERE files.path = ? ORDER BY start_ms", (path,)).fetchall()
+
+    def files(self, status=None, kind=None, min_duration_ms=None, max_duration_ms=None, limit=None):
+        """按条件列出文件，返回 [{'path', 'kind', 'duration_ms', 'status', 'cut_count', 'updated_at'}, ...]"""
+        self.flush()
+        conditions = []
+        params = []
+        for column, value in (('status', status), ('kind', kind)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_duration_ms is not None:
+            conditions.append("duration_ms >= ?")
+            params.append(min_duration_ms)
+        if max_duration_ms is not None:
+            conditions.append("duration_ms <= ?")
+            params.append(max_duration_ms)
+        sql = "SELECT path, kind, duration_ms, status, cut_count, updated_at FROM files"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY updated_at"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = ('path', 'kind', 'duration_ms', 'status', 'cut_count', 'updated_at')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def unexported_files(self, **filters):
+        """所有有未导出剪切区间的文件，最早修改的在前"""
+        return self.files(status='pending', **filters)
+
+    def counts(self):
+        """各状态的文件数"""
+        self.flush()
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall())
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
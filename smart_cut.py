@@ -0,0 +1,228 @@
+import bisect
+import os
+import tempfile
+
+import media_probe
+from video_cut import STREAM_MAPS
+from video_processor import run_command
+
+# 起点与关键帧相差不超过该值（秒）时视为落在关键帧上
+KEYFRAME_TOLERANCE = 0.001
+
+# 源编码 -> 重编码首尾部分 GOP 时使用的编码器
+ENCODERS = {
+    'h264': 'libx264',
+    'hevc': 'libx265',
+    'mpeg4': 'mpeg4',
+    'mpeg2video': 'mpeg2video',
+    'vp9': 'libvpx-vp9',
+}
+# 可以部分流复制的编码：(转 Annex B 的过滤器, 输出格式, NAL 类型, 参数集类型)
+# 只有 H.264：x264 等编码器默认使用封闭 GOP。HEVC（x265 默认开放 GOP）、MPEG-2
+# 等关键帧之后的帧常依赖上一个 GOP，从关键帧开始流复制会丢帧或花屏
+PARAMETER_SETS = {
+    'h264': ('h264_mp4toannexb', 'h264', lambda byte: byte & 0x1f, (7, 8)),
+}
+H264_PROFILES = {
+    'constrained baseline': 'baseline',
+    'baseline': 'baseline',
+    'main': 'main',
+    'high': 'high',
+}
+
+
+def keyframe_index(input_file):
+    """第一路视频的关键帧时间（秒，升序），由 media_probe 只解复用不解码地探测并缓存"""
+    return media_probe.keyframes(input_file)
+
+
+def probe_video_stream(input_file):
+    """读取第一路视频的编码参数，用于让重编码部分与原流保持一致"""
+    return media_probe.first_stream(media_probe.probe(input_file), 'video') or {}
+
+
+def frame_duration(stream):
+    """根据 r_frame_rate 计算一帧的时长（秒）"""
+    try:
+        num, den = stream.get('r_frame_rate', '25/1').split('/')
+        return float(den) / float(num)
+    except (ValueError, ZeroDivisionError):
+        return 0.04
+
+
+def _encoder_args(stream):
+    codec = stream.get('codec_name')
+    encoder = ENCODERS.get(codec, 'libx264')
+    args = ['-c:v', encoder]
+    if encoder in ('libx264', 'libx265'):
+        args += ['-preset', 'veryfast', '-crf', '18']
+    else:
+        args += ['-q:v', '2']
+    if stream.get('pix_fmt'):
+        args += ['-pix_fmt', stream['pix_fmt']]
+    if codec == 'h264' and str(stream.get('profile', '')).lower() in H264_PROFILES:
+        args += ['-profile:v', H264_PROFILES[str(stream['profile']).lower()]]
+    return args
+
+
+def _run(command, is_cancelled=None):
+    return run_command(command, is_cancelled)
+
+
+def parameter_sets(input_file, codec, is_cancelled=None):
+    """第一路视频的参数集 NAL 单元（H.264 的 SPS/PPS）
+
+    转成 Annex B 时比特流过滤器会把容器中的参数集放到首个数据包前面，
+    只取这一个包。编码不在 PARAMETER_SETS 中时返回 None。
+    """
+    if codec not in PARAMETER_SETS:
+        return None
+    bsf, fmt, nal_type, types = PARAMETER_SETS[codec]
+    data = _run([
+        'ffmpeg', '-nostdin', '-v', 'error', '-i', input_file,
+        '-map', '0:v:0', '-c:v', 'copy', '-bsf:v', bsf, '-frames:v', '1', '-f', fmt, 'pipe:1'
+    ], is_cancelled)
+    units = [unit.rstrip(b'\x00') for unit in data.split(b'\x00\x00\x01')]
+    return sorted(unit for unit in units if unit and nal_type(unit[0]) in types)
+
+
+def can_join(piece, input_file, stream, is_cancelled=None):
+    """重编码的片段能否与原文件流复制的部分直接拼接
+
+    concat 解复用器只保留第一个片段的编码参数（extradata），SPS/PPS 不一致
+    时拼出的流无法正确解码，因此逐字节比较；其余编码一律视为不能。
+    """
+    codec = stream.get('codec_name')
+    if codec not in PARAMETER_SETS:
+        return False
+    return parameter_sets(piece, codec, is_cancelled) == parameter_sets(input_file, codec, is_cancelled)
+
+
+def plan_cut(start, end, keyframes):
+    """返回 (方式, 起点后的首个关键帧, 终点前的最后一个关键帧)
+
+    'copy' 起止都在关键帧上，整段流复制；'smart' 两个关键帧之间流复制，
+    不在关键帧上的起点、终点所在的部分 GOP 重编码；'encode' 区间内没有
+    完整的 GOP 可以复制，只能整段重编码。
+    """
+    index = bisect.bisect_left(keyframes, start - KEYFRAME_TOLERANCE)
+    first = keyframes[index] if index < len(keyframes) else None
+    if first is None or first >= end - KEYFRAME_TOLERANCE:
+        return 'encode', None, None
+    last = keyframes[bisect.bisect_right(keyframes, end + KEYFRAME_TOLERANCE) - 1]
+    head = first - start > KEYFRAME_TOLERANCE
+    tail = end - last > KEYFRAME_TOLERANCE
+    if not head and not tail:
+        return 'copy', first, last
+    if last <= first:
+        return 'encode', None, None
+    return 'smart', first, last
+
+
+def _encode(input_file, start, end, output_file, stream, half_frame, is_cancelled, extra_args):
+    """精确定位到 start 后重编码到 end 之前（输出端 -t 按显示时间截断，精确到帧）"""
+    _run([
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-ss', f"{start:.6f}", '-i', input_file,
+        '-t', f"{end - start - half_frame:.6f}",
+    ] + extra_args + _encoder_args(stream) + ['-y', output_file], is_cancelled)
+
+
+def smart_cut(input_file, start_ms, end_ms, output_file, keyframes, stream, work_dir=None, is_cancelled=None):
+    """帧精确剪切：只重编码起点、终点所在的部分 GOP，中间完整的 GOP 流复制
+
+    视频由重编码的头部、流复制的中间部分和重编码的尾部经 concat 拼接，
+    起止都精确到帧；音频从原文件流复制（精度为一个音频帧）。中间部分按
+    帧数截断，假定帧率恒定、GOP 封闭。只有 H.264 会流复制（见
+    PARAMETER_SETS），重编码部分的参数集与原流不一致、无法直接拼接时同样
+    改为整段重编码。返回实际使用的方式。
+    """
+    if end_ms < start_ms:
+        start_ms, end_ms = end_ms, start_ms
+    start = start_ms / 1000.0
+    end = end_ms / 1000.0
+    # 输出端 -t 会包含恰好落在终点上的那一帧，统一少算半帧
+    frame = frame_duration(stream)
+    half_frame = frame / 2
+    mode, first, last = plan_cut(start, end, keyframes)
+    if stream.get('codec_name') not in PARAMETER_SETS:
+        mode = 'encode'
+
+    if mode == 'copy':
+        # 起止都在关键帧上，流复制按帧数截断，不会多出终点关键帧
+        _run([
+            'ffmpeg', '-nostdin', '-v', 'error',
+            '-ss', f"{start:.3f}", '-i', input_file, '-t', f"{end - start:.3f}",
+        ] + STREAM_MAPS + [
+            '-frames:v', str(round((last - first) / frame)),
+            '-c', 'copy', '-avoid_negative_ts', 'make_zero',
+            '-y', output_file
+        ], is_cancelled)
+        return mode
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        # 中间文件用 Matroska：保留编码参数与时间戳，concat 解复用器可以直接流复制拼接
+        pieces = []
+        if mode == 'smart':
+            video_only = ['-map', '0:v:0', '-an', '-f', 'matroska']
+            head = os.path.join(tmp, 'head.mkv')
+            middle = os.path.join(tmp, 'middle.mkv')
+            tail = os.path.join(tmp, 'tail.mkv')
+            has_tail = end - last > KEYFRAME_TOLERANCE
+            if first - start > KEYFRAME_TOLERANCE:
+                _encode(input_file, start, first, head, stream, half_frame, is_cancelled, video_only)
+                pieces.append(head)
+                encoded = head
+            else:
+                _encode(input_file, last, end, tail, stream, half_frame, is_cancelled, video_only)
+                encoded = tail
+            # 首尾用同样的参数重编码，检查先编出的一段即可
+            if not can_join(encoded, input_file, stream, is_cancelled):
+                mode = 'encode'
+
+        if mode == 'encode':
+            _encode(input_file, start, end, output_file, stream, half_frame, is_cancelled,
+                    ['-map', '0:v:0', '-map', '0:a?', '-c:a', 'copy'])
+            return mode
+
+        # 中间部分：从首个关键帧开始流复制。-t 按解码时间截断，有 B 帧时会带上
+        # 下一个关键帧，因此按帧数截断到最后一个关键帧之前
+        _run([
+            'ffmpeg', '-nostdin', '-v', 'error',
+            '-ss', f"{first + KEYFRAME_TOLERANCE:.6f}", '-i', input_file,
+            '-map', '0:v:0', '-an', '-c:v', 'copy', '-frames:v', str(round((last - first) / frame)),
+            '-f', 'matroska', '-y', middle
+        ], is_cancelled)
+        pieces.append(middle)
+        if has_tail:
+            if encoded != tail:
+                _encode(input_file, last, end, tail, stream, half_frame, is_cancelled, video_only)
+            pieces.append(tail)
+
+        concat_list = os.path.join(tmp, 'list.txt')
+        with open(concat_list, 'w', encoding='utf-8') as f:
+            for piece in pieces:
+                f.write("file '{}'\n".format(piece.replace("'", "'\\''")))
+
+        # 拼接视频，并从原文件流复制对应区间的音频
+        _run([
+            'ffmpeg', '-nostdin', '-v', 'error',
+            '-f', 'concat', '-safe', '0', '-i', concat_list,
+            '-ss', f"{start:.3f}", '-t', f"{end - start:.3f}", '-i', input_file,
+            '-map', '0:v:0', '-map', '1:a?',
+            '-c', 'copy',
+            '-y', output_file
+        ], is_cancelled)
+    return mode
+
+
+def smart_export_cuts(input_file, cuts, progress_callback=None, is_cancelled=None):
+    """对多个片段执行帧精确剪切，关键帧索引与流参数只探测一次"""
+    keyframes = keyframe_index(input_file)
+    stream = probe_video_stream(input_file)
+    modes = []
+    for done, (start, end, output_file) in enumerate(cuts, 1):
+        modes.append(smart_cut(input_file, start, end, output_file, keyframes, stream, is_cancelled=is_cancelled))
+        if progress_callback:
+            progress_callback(done, len(cuts))
+    return modes
@@ -0,0 +1,87 @@
+"""剪切区间表的测试
+
+运行: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cut_list import CutList
+
+
+def test_cuts_stay_sorted():
+    cuts = CutList([(5000, 6000), (1000, 2000), (3000, 4000)])
+    assert list(cuts) == [(1000, 2000), (3000, 4000), (5000, 6000)]
+
+
+def test_overlapping_cuts_merge():
+    cuts = CutList([(1000, 2000), (3000, 4000), (5000, 6000)])
+    assert cuts.add(1500, 3500) == (1000, 4000)
+    assert list(cuts) == [(1000, 4000), (5000, 6000)]
+    # 覆盖多个区间时合并为一个
+    assert cuts.add(0, 10000) == (0, 10000)
+    assert list(cuts) == [(0, 10000)]
+
+
+def test_contained_cut_is_absorbed():
+    cuts = CutList([(1000, 5000)])
+    assert cuts.add(2000, 3000) == (1000, 5000)
+    assert list(cuts) == [(1000, 5000)]
+
+
+def test_touching_cuts_stay_separate():
+    cuts = CutList([(1000, 2000)])
+    cuts.add(2000, 3000)
+    cuts.add(500, 1000)
+    assert list(cuts) == [(500, 1000), (1000, 2000), (2000, 3000)]
+
+
+def test_reversed_range_is_swapped():
+    cuts = CutList()
+    assert cuts.add(4000, 1000) == (1000, 4000)
+    assert cuts.remove(4000, 1000)
+    assert len(cuts) == 0
+
+
+def test_empty_range_is_ignored():
+    cuts = CutList()
+    assert cuts.add(1000, 1000) is None
+    assert len(cuts) == 0
+
+
+def test_remove_needs_exact_match():
+    cuts = CutList([(1000, 2000)])
+    assert not cuts.remove(1000, 1900)
+    assert cuts.remove(1000, 2000)
+    assert not cuts.remove(1000, 2000)
+
+
+def test_cut_at_and_remove_at_use_half_open_ranges():
+    cuts = CutList([(1000, 2000), (2000, 3000)])
+    assert cuts.cut_at(999) is None
+    assert cuts.cut_at(1000) == (1000, 2000)
+    assert cuts.cut_at(2000) == (2000, 3000)
+    assert cuts.cut_at(3000) is None
+    assert cuts.remove_at(1999) == (1000, 2000)
+    assert cuts.remove_at(1500) is None
+    assert list(cuts) == [(2000, 3000)]
+
+
+def test_nearest_boundary():
+    cuts = CutList([(1000, 2000), (5000, 9000)])
+    assert cuts.nearest_boundary(0) == 1000
+    assert cuts.nearest_boundary(1400) == 1000
+    assert cuts.nearest_boundary(1600) == 2000
+    assert cuts.nearest_boundary(3400) == 2000
+    assert cuts.nearest_boundary(3600) == 5000
+    assert cuts.nearest_boundary(8000) == 9000
+    assert cuts.nearest_boundary(20000) == 9000
+    assert CutList().nearest_boundary(1000) is None
+
+
+def test_between_returns_visible_cuts():
+    cuts = CutList([(1000, 2000), (3000, 4000), (5000, 6000)])
+    assert cuts.between(2500, 5000) == [(3000, 4000), (5000, 6000)]
+    assert cuts.between(2100, 2900) == []
+    assert cuts.total_ms() == 3000
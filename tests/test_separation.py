@@ -0,0 +1,164 @@
+"""分块重叠相加分离引擎的测试，使用不需要 PyTorch 的替身模型
+
+运行: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import separation
+import separation_graph
+from pcm_reader import PcmReader
+from wav_utils import FloatWavWriter
+
+# 不是块长整数倍的长度、比一个块还短的长度、恰好一个块的长度
+LENGTHS = (10007, 999, 4096)
+# (块长, 重叠数, 批大小)
+CHUNKINGS = ((4096, 4, 1), (4096, 2, 3), (1000, 1, 2), (3000, 3, 4))
+
+
+def make_audio(nframes, channels=2, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal((nframes, channels)) * 0.3).astype(np.float32)
+
+
+def whole_signal(model, audio):
+    """整段一次送入模型的结果，{音轨: (帧, 声道)}"""
+    output = model(audio.T[np.newaxis])[0]
+    return {name: output[i].T for i, name in enumerate(model.instruments)}
+
+
+@pytest.mark.parametrize('nframes', LENGTHS)
+@pytest.mark.parametrize('chunk_size, num_overlap, batch_size', CHUNKINGS)
+def test_chunked_matches_whole_signal(nframes, chunk_size, num_overlap, batch_size):
+    model = separation.StandInModel()
+    audio = make_audio(nframes)
+    stems = separation.separate_array(model, audio, chunk_size=chunk_size, num_overlap=num_overlap,
+                                      batch_size=batch_size)
+    expected = whole_signal(model, audio)
+    for name in model.instruments:
+        np.testing.assert_allclose(stems[name], expected[name], atol=1e-5)
+
+
+@pytest.mark.parametrize('nframes', LENGTHS)
+@pytest.mark.parametrize('channels', (1, 2))
+def test_stems_sum_to_mix(nframes, channels):
+    model = separation.StandInModel()
+    audio = make_audio(nframes, channels)
+    stems = separation.separate_array(model, audio, chunk_size=4096, num_overlap=4)
+    np.testing.assert_allclose(sum(stems.values()), audio, atol=1e-5)
+
+
+@pytest.mark.parametrize('nframes', LENGTHS)
+@pytest.mark.parametrize('chunk_size, num_overlap, batch_size', CHUNKINGS)
+def test_output_length_is_exact(nframes, chunk_size, num_overlap, batch_size):
+    model = separation.StandInModel()
+    stems = separation.separate_array(model, make_audio(nframes), chunk_size=chunk_size,
+                                      num_overlap=num_overlap, batch_size=batch_size)
+    for name in model.instruments:
+        assert stems[name].shape == (nframes, 2)
+
+
+def test_separate_file_streams_exact_length(tmp_path):
+    nframes = 10007
+    audio = make_audio(nframes)
+    source = str(tmp_path / 'mix.wav')
+    with FloatWavWriter(source, 2, separation.DEFAULT_SAMPLE_RATE) as writer:
+        writer.write(audio)
+
+    model = separation.StandInModel()
+    paths = separation.separate_file(model, source, str(tmp_path / 'out'), chunk_size=4096, num_overlap=4)
+    expected = whole_signal(model, audio)
+    for name, path in paths.items():
+        reader = PcmReader(path)
+        assert reader.nframes == nframes
+        np.testing.assert_allclose(reader.float_frames(0, nframes), expected[name], atol=1e-5)
+
+
+def test_cancel_removes_partial_files(tmp_path):
+    source = str(tmp_path / 'mix.wav')
+    with FloatWavWriter(source, 2, separation.DEFAULT_SAMPLE_RATE) as writer:
+        writer.write(make_audio(10007))
+
+    output_dir = tmp_path / 'out'
+    paths = separation.separate_file(separation.StandInModel(), source, str(output_dir),
+                                     chunk_size=1000, is_cancelled=lambda: True)
+    assert paths is None
+    assert os.listdir(output_dir) == []
+
+
+class SoftClipModel:
+    """逐采样的非线性替身模型：主音轨为软削波，第二条音轨为余下部分"""
+
+    nbytes = 0
+    instruments = ['main', 'rest']
+
+    def __call__(self, batch):
+        main = np.tanh(batch * 1.5) * 0.6
+        return np.stack([main, batch - main], axis=1)
+
+
+def graph_spec(name, chunk_size, num_overlap):
+    return {'name': name, 'stage': name, 'chunk_size': chunk_size, 'num_overlap': num_overlap}
+
+
+@pytest.mark.parametrize('max_workers', (None, 1))
+def test_graph_streams_stages_in_memory(tmp_path, max_workers):
+    nframes = 20011
+    audio = make_audio(nframes)
+    source = str(tmp_path / 'mix.wav')
+    with FloatWavWriter(source, 2, separation.DEFAULT_SAMPLE_RATE) as writer:
+        writer.write(audio)
+
+    Stage = separation_graph.Stage
+    stages = [Stage('vocal', graph_spec('v', 4096, 4)),
+              Stage('kara', graph_spec('k', 3000, 2), ('vocal', 0)),
+              Stage('other', graph_spec('o', 5000, 1), ('vocal', 1))]
+    paths, report = separation_graph.run_graph(
+        stages, source, lambda stage, name: str(tmp_path / stage / f'{name}.wav'),
+        lambda spec: SoftClipModel(), max_workers=max_workers, batch_size=2)
+
+    model = SoftClipModel()
+    vocal = separation.separate_array(model, audio, chunk_size=4096, num_overlap=4, batch_size=2)
+    expected = {}
+    for stage, chunk_size, num_overlap, stem in (('kara', 3000, 2, 'main'), ('other', 5000, 1, 'rest')):
+        stems = separation.separate_array(model, vocal[stem], chunk_size=chunk_size, num_overlap=num_overlap,
+                                          batch_size=2)
+        expected.update({(stage, name): frames for name, frames in stems.items()})
+    # 被下游使用的 vocal 音轨只在内存中流过，不写盘
+    assert set(paths) == set(expected)
+    assert not (tmp_path / 'vocal').exists()
+    for key, path in paths.items():
+        reader = PcmReader(path)
+        assert reader.nframes == nframes
+        np.testing.assert_allclose(reader.float_frames(0, nframes), expected[key], atol=1e-5)
+    assert sorted(stats['stage'] for stats in report) == ['kara', 'other', 'vocal']
+
+
+class TargetOnlyModel:
+    """配置了 target_instrument 的模型：只输出目标音轨 (批, 声道, 采样)"""
+
+    def __init__(self, instruments=('vocals', 'other')):
+        self.instruments = list(instruments)
+
+    def __call__(self, batch):
+        center = np.broadcast_to(batch.mean(axis=1, keepdims=True), batch.shape)
+        return separation.complete_stems(batch, np.array(center), self.instruments)
+
+
+def test_target_only_model_gets_residual_stem():
+    audio = make_audio(10007)
+    stems = separation.separate_array(TargetOnlyModel(), audio, chunk_size=4096, num_overlap=4)
+    expected = whole_signal(separation.StandInModel(), audio)
+    np.testing.assert_allclose(stems['vocals'], expected['vocals'], atol=1e-5)
+    np.testing.assert_allclose(stems['other'], audio - stems['vocals'], atol=1e-5)
+    assert not np.allclose(stems['other'], stems['vocals'])
+
+
+def test_stem_count_mismatch_raises():
+    with pytest.raises(ValueError):
+        separation.separate_array(TargetOnlyModel(('vocals', 'drums', 'other')), make_audio(999))
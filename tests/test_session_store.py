@@ -0,0 +1,69 @@
+"""剪切会话存储的测试
+
+运行: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # 定时写入的延迟设得很长，测试中只由 flush 显式写入
+    store = SessionStore(str(tmp_path / 'sessions.sqlite3'), flush_delay=3600)
+    yield store
+    store.close()
+
+
+def test_cuts_round_trip_through_the_database(store, tmp_path):
+    store.save_cuts('a.wav', [(3000, 4000), (1000, 2000)], 'audio', 10000)
+    # 写入前读取的是待写的修改
+    assert store.load_cuts('a.wav') == [(3000, 4000), (1000, 2000)]
+    store.close()
+
+    reopened = SessionStore(store.db_path, flush_delay=3600)
+    try:
+        assert reopened.load_cuts('a.wav') == [(1000, 2000), (3000, 4000)]
+        assert reopened.counts() == {'pending': 1}
+    finally:
+        reopened.close()
+
+
+def test_mark_exported_removes_only_exported_cuts(store):
+    store.save_cuts('a.mp4', [(1000, 2000), (3000, 4000)], 'video', 10000)
+    store.flush()
+    store.mark_exported('a.mp4', [(1000, 2000)], 'video', 10000)
+    assert store.load_cuts('a.mp4') == [(3000, 4000)]
+    assert store.files()[0]['status'] == 'pending'
+
+    store.mark_exported('a.mp4', [(3000, 4000)], 'video', 10000)
+    assert store.load_cuts('a.mp4') == []
+    assert store.files()[0]['status'] == 'exported'
+    assert store.unexported_files() == []
+
+
+def test_cuts_added_during_export_stay_pending(store):
+    store.save_cuts('a.wav', [(1000, 2000)], 'audio')
+    store.flush()
+    store.save_cuts('a.wav', [(1000, 2000), (5000, 6000)], 'audio')
+    store.mark_exported('a.wav', [(1000, 2000)], 'audio')
+    assert store.load_cuts('a.wav') == [(5000, 6000)]
+    assert [entry['path'] for entry in store.unexported_files()] == [os.path.abspath('a.wav')]
+
+
+def test_filters(store):
+    store.save_cuts('short.wav', [(0, 1000)], 'audio', 30000)
+    store.save_cuts('long.mp4', [(0, 1000)], 'video', 600000)
+    store.save_cuts('cleared.wav', [], 'audio', 60000)
+    paths = lambda entries: sorted(os.path.basename(entry['path']) for entry in entries)
+    assert paths(store.unexported_files()) == ['long.mp4', 'short.wav']
+    assert paths(store.unexported_files(kind='video')) == ['long.mp4']
+    assert paths(store.unexported_files(min_duration_ms=60000)) == ['long.mp4']
+    assert paths(store.unexported_files(max_duration_ms=60000)) == ['short.wav']
+    assert paths(store.files(status='empty')) == ['cleared.wav']
+    assert len(store.unexported_files(limit=1)) == 1
@@ -0,0 +1,79 @@
+"""帧精确剪切的测试，需要 ffmpeg（不需要 ffprobe：关键帧与流参数由测试给出）
+
+运行: python -m pytest tests
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import smart_cut
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="需要 ffmpeg")
+
+WIDTH, HEIGHT, FPS = 160, 120, 25
+GOP_SECONDS = 1
+STREAM = {'codec_name': 'h264', 'pix_fmt': 'yuv420p', 'profile': 'High', 'r_frame_rate': f'{FPS}/1'}
+KEYFRAMES = [float(i) for i in range(8)]
+# 与 smart_cut 重编码时的参数一致，SPS/PPS 相同，可以拼接
+MATCHING_ARGS = ['-preset', 'veryfast', '-crf', '18', '-profile:v', 'high']
+# 其他编码参数（参考帧数、B 帧、profile 不同）的源，只能整段重编码
+OTHER_ARGS = ['-preset', 'slow', '-profile:v', 'main', '-x264-params', 'ref=5:bframes=3']
+
+
+def make_source(path, x264_args):
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc2=s={WIDTH}x{HEIGHT}:r={FPS}:d=8',
+        '-f', 'lavfi', '-i', 'sine=d=8',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', str(GOP_SECONDS * FPS), '-keyint_min', str(GOP_SECONDS * FPS),
+        '-sc_threshold', '0'] + x264_args + ['-c:a', 'aac', '-shortest', path], check=True)
+
+
+def decode(path):
+    raw = subprocess.run(['ffmpeg', '-nostdin', '-v', 'error', '-i', path, '-fps_mode', 'passthrough',
+                          '-f', 'rawvideo', '-pix_fmt', 'gray', 'pipe:1'], capture_output=True, check=True).stdout
+    return np.frombuffer(raw, np.uint8).reshape(-1, HEIGHT, WIDTH).astype(np.int16)
+
+
+def source_indices(frames, source, first):
+    """每个输出帧在源中最接近的帧号，只在预期位置附近查找"""
+    indices = []
+    for k, frame in enumerate(frames):
+        candidates = range(max(0, first + k - 3), min(len(source), first + k + 4))
+        indices.append(min(candidates, key=lambda j: np.abs(frame - source[j]).mean()))
+    return indices
+
+
+@pytest.fixture(scope='module')
+def sources(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('smart_cut')
+    paths = {}
+    for name, args in (('matching', MATCHING_ARGS), ('other', OTHER_ARGS)):
+        paths[name] = str(directory / f'{name}.mp4')
+        make_source(paths[name], args)
+    return paths
+
+
+@pytest.mark.parametrize('source, start_ms, end_ms, mode', [
+    ('matching', 1240, 4680, 'smart'),   # 首尾都是部分 GOP
+    ('matching', 2000, 5520, 'smart'),   # 起点在关键帧上，只重编码尾部
+    ('matching', 1480, 3000, 'smart'),   # 终点在关键帧上，只重编码头部
+    ('matching', 2000, 5000, 'copy'),
+    ('matching', 3200, 3800, 'encode'),  # 区间内没有关键帧
+    ('other', 1240, 4680, 'encode'),     # 参数集不同，不能拼接
+])
+def test_cut_is_frame_exact(sources, tmp_path, source, start_ms, end_ms, mode):
+    output = str(tmp_path / 'cut.mp4')
+    assert smart_cut.smart_cut(sources[source], start_ms, end_ms, output, KEYFRAMES, STREAM) == mode
+
+    first = round(start_ms * FPS / 1000)
+    count = round((end_ms - start_ms) * FPS / 1000)
+    frames = decode(output)
+    assert len(frames) == count
+    assert source_indices(frames, decode(sources[source]), first) == list(range(first, first + count))
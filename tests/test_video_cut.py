@@ -0,0 +1,44 @@
+"""流复制多片段导出的测试，需要 ffmpeg
+
+运行: python -m pytest tests
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import video_cut
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="需要 ffmpeg")
+
+
+@pytest.fixture(scope='module')
+def phone_mov(tmp_path_factory):
+    """带字幕流与时间码数据流的 MOV，类似手机与相机拍摄的素材"""
+    directory = tmp_path_factory.mktemp('video_cut')
+    subtitles = directory / 'subtitles.srt'
+    subtitles.write_text("1\n00:00:01,000 --> 00:00:03,000\nhello\n", encoding='utf-8')
+    path = str(directory / 'phone.mov')
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', 'testsrc2=s=160x120:r=25:d=6',
+        '-f', 'lavfi', '-i', 'sine=d=6',
+        '-i', str(subtitles),
+        '-map', '0', '-map', '1', '-map', '2',
+        '-c:v', 'libx264', '-g', '25', '-c:a', 'aac', '-c:s', 'mov_text',
+        '-timecode', '01:00:00:00', path], check=True)
+    return path
+
+
+@pytest.mark.parametrize('strategy', ('seek', 'multi', 'segment'))
+def test_mp4_export_skips_data_and_subtitle_streams(phone_mov, tmp_path, strategy):
+    cuts = [(1000, 2000, str(tmp_path / 'a.mp4')), (2000, 4000, str(tmp_path / 'b.mp4'))]
+    assert video_cut.export_cuts(phone_mov, cuts, strategy) == strategy
+    for _, _, output_file in cuts:
+        assert os.path.getsize(output_file) > 0
+    # segment 的临时编号文件已改名或删除
+    assert sorted(os.listdir(tmp_path)) == ['a.mp4', 'b.mp4']
@@ -0,0 +1,53 @@
+"""峰值金字塔查询的测试
+
+运行: python -m pytest tests
+"""
+import os
+import sys
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pcm_reader import PcmReader
+from waveform import PeakPyramid
+
+SAMPLE_RATE = 8000
+
+
+def write_wav(path, samples):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.astype('<i2').tobytes())
+
+
+def test_view_ignores_peaks_after_its_end(tmp_path):
+    # 前 60 秒静音，只有最后一秒很响
+    samples = np.zeros(61 * SAMPLE_RATE, dtype=np.int16)
+    samples[-SAMPLE_RATE:] = 30000
+    path = str(tmp_path / 'quiet_then_loud.wav')
+    write_wav(path, samples)
+
+    pyramid = PeakPyramid.build(path, PcmReader(path))
+    mins, maxs = pyramid.peaks_for_range(0, 10 * SAMPLE_RATE, 200)
+    assert np.all(maxs == 0)
+    assert np.all(mins == 0)
+
+
+def test_view_peaks_match_samples(tmp_path):
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(300000) * 8000).clip(-32768, 32767).astype(np.int16)
+    path = str(tmp_path / 'noise.wav')
+    write_wav(path, samples)
+
+    pyramid = PeakPyramid.build(path, PcmReader(path))
+    start, end, width = 40000, 200000, 100
+    mins, maxs = pyramid.peaks_for_range(start, end, width)
+    # 金字塔按块取值，只能比可见范围略宽，不会超出所在的块
+    block = 256 << int(np.log2((end - start) / width / 256))
+    view = samples[start // block * block:-(-end // block) * block]
+    assert maxs.max() == view.max() / 32768.0
+    assert mins.min() == view.min() / 32768.0
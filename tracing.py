@@ -0,0 +1,149 @@
+"""轻量的耗时追踪，输出 Chrome trace-event JSON
+
+设置环境变量 AV_TRACE=<文件路径> 后，程序退出时把记录的区间写入该文件，
+可在 chrome://tracing 或 https://ui.perfetto.dev 中打开。未设置时 span()
+与 run_span() 直接返回同一个空对象，不计时、不读取文件大小，也不格式化命令行。
+
+    with tracing.span('convert_to_wav', path=input_file) as span:
+        ...
+        span.set(method=method)
+
+每个区间记录起止时间、所在线程，path 指向的文件大小（input_size），
+子进程调用由 run_span() 包住，单独成为一个记录完整命令行的区间。
+"""
+import atexit
+import json
+import os
+import shlex
+import threading
+import time
+
+TRACE_ENV = 'AV_TRACE'
+
+_trace_file = os.environ.get(TRACE_ENV) or None
+_events = []
+_lock = threading.Lock()
+
+
+def enabled():
+    return _trace_file is not None
+
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+
+class _NullSpan:
+    """关闭追踪时使用的空区间，所有操作都不做任何事"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+    def end(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """一个计时区间；用作上下文管理器时自动结束，也可以在之后的回调中调用 end()"""
+
+    def __init__(self, name, path=None, **args):
+        self.name = name
+        self.args = args
+        if path is not None:
+            self.args['input'] = path
+            try:
+                self.args['input_size'] = os.path.getsize(path)
+            except OSError:
+                pass
+        self.tid = threading.get_ident()
+        self.start = _now_us()
+        self._ended = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.end()
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def end(self, **args):
+        """结束区间并记录；重复调用只记录第一次"""
+        if self._ended:
+            return
+        self._ended = True
+        self.args.update(args)
+        event = {
+            'name': self.name,
+            'ph': 'X',
+            'ts': self.start,
+            'dur': _now_us() - self.start,
+            'pid': os.getpid(),
+            'tid': self.tid,
+            'args': self.args,
+        }
+        with _lock:
+            _events.append(event)
+
+
+def span(name, path=None, **args):
+    """开始一个区间；path 为输入文件时记录其大小
+
+    用 with 包住代码块，或保存返回值，在异步操作完成时（如媒体加载完毕的信号）调用 end()。
+    """
+    if _trace_file is None:
+        return NULL_SPAN
+    return Span(name, path, **args)
+
+
+def run_span(args):
+    """包住一次子进程调用的区间，名称取自可执行文件名，并记录完整命令行"""
+    if _trace_file is None:
+        return NULL_SPAN
+    return Span(os.path.basename(str(args[0])), command=shlex.join(str(arg) for arg in args))
+
+
+def events():
+    with _lock:
+        return list(_events)
+
+
+def dump(path=None):
+    """把已记录的区间写成 Chrome trace-event JSON"""
+    path = path or _trace_file
+    if path is None:
+        return None
+    records = events()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    metadata = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': thread_names[tid]}}
+        for tid in sorted({event['tid'] for event in records}) if tid in thread_names
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': metadata + records, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return path
+
+
+def _dump_at_exit():
+    if _events:
+        try:
+            print(f"追踪记录已写入: {dump()}")
+        except OSError as e:
+            print(f"写入追踪记录失败: {str(e)}")
+
+
+if _trace_file is not None:
+    atexit.register(_dump_at_exit)
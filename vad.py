@@ -0,0 +1,113 @@
+import numpy as np
+
+from pcm_reader import PcmReader, WAVE_FORMAT_IEEE_FLOAT
+
+# 能量帧长度（毫秒）
+FRAME_MS = 10
+# 每次从内存映射读取的能量帧数
+READ_FRAMES = 4096
+
+# 自动分段的默认参数，AudioEditor 的参数对话框以此为初值
+DEFAULT_PARAMS = {
+    'threshold_db': -40.0,  # 帧能量高于该值（dBFS）视为有声
+    'min_speech_ms': 250,  # 短于该长度的有声段丢弃
+    'min_silence_ms': 300,  # 短于该长度的静音并入两侧的有声段
+    'padding_ms': 100,  # 每段前后各扩展的长度
+}
+
+
+def frame_energy_db(reader, frame_ms=FRAME_MS, is_cancelled=None):
+    """按帧计算所有声道的均方能量（dBFS），在内存映射上分块向量化计算
+
+    返回 (每帧能量数组, 每帧采样帧数)，末尾不足一帧的采样单独算一帧；
+    取消时返回 None。
+    """
+    frame_len = max(1, int(reader.framerate * frame_ms / 1000))
+    nframes = reader.nframes
+    count = -(-nframes // frame_len)
+    energy = np.empty(count, dtype=np.float32)
+    # 8 位无符号需要减去偏移，交给 float_frames；其余直接在原始采样上计算再统一缩放
+    if reader.bits == 8 or reader.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        scale = 1.0
+    else:
+        scale = float(1 << (reader.bits - 1))
+
+    chunk = frame_len * READ_FRAMES
+    for offset in range(0, nframes, chunk):
+        if is_cancelled and is_cancelled():
+            return None
+        if reader.bits == 8:
+            samples = reader.float_frames(offset, offset + chunk)
+        else:
+            samples = reader.frames(offset, offset + chunk)
+        position = offset // frame_len
+        full = len(samples) // frame_len
+        if full:
+            # 每帧的所有声道采样排成一行，einsum 逐行求平方和，不生成平方后的中间数组
+            blocks = samples[:full * frame_len].reshape(full, -1).astype(np.float32)
+            energy[position:position + full] = np.einsum('ij,ij->i', blocks, blocks) / blocks.shape[1]
+        tail = samples[full * frame_len:]
+        if len(tail):
+            tail = tail.astype(np.float32)
+            energy[position + full] = np.mean(tail * tail)
+
+    energy /= scale * scale
+    # 加一个极小值避免 log10(0)
+    return 10.0 * np.log10(energy + 1e-12), frame_len
+
+
+def _runs(mask):
+    """布尔数组中连续 True 的区间，返回 (起始下标, 结束下标) 两个数组，结束下标不含"""
+    edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _merge_gaps(starts, ends, min_gap):
+    """相邻区间的间隔小于 min_gap 时合并"""
+    if len(starts) < 2:
+        return starts, ends
+    keep = (starts[1:] - ends[:-1]) >= min_gap
+    return starts[np.concatenate([[True], keep])], ends[np.concatenate([keep, [True]])]
+
+
+def detect_speech(reader, threshold_db=DEFAULT_PARAMS['threshold_db'],
+                  min_speech_ms=DEFAULT_PARAMS['min_speech_ms'],
+                  min_silence_ms=DEFAULT_PARAMS['min_silence_ms'],
+                  padding_ms=DEFAULT_PARAMS['padding_ms'],
+                  frame_ms=FRAME_MS, is_cancelled=None):
+    """基于帧能量的语音活动检测，返回 [(start_ms, end_ms), ...]
+
+    reader 可以是 PcmReader 或 WAV 路径。先按阈值得到有声帧，把短于
+    min_silence_ms 的静音并入两侧，丢弃短于 min_speech_ms 的段，最后
+    前后各扩展 padding_ms 并合并因此重叠的段。
+    """
+    if not isinstance(reader, PcmReader):
+        reader = PcmReader.open(reader)
+    if reader.nframes == 0:
+        return []
+    result = frame_energy_db(reader, frame_ms, is_cancelled)
+    if result is None:
+        return None
+    energy, frame_len = result
+
+    starts, ends = _runs(energy > threshold_db)
+    if not len(starts):
+        return []
+
+    # 以下全部以采样帧为单位，避免能量帧与毫秒之间的舍入误差累积
+    to_frames = reader.framerate / 1000.0
+    starts = starts * frame_len
+    ends = np.minimum(ends * frame_len, reader.nframes)
+
+    starts, ends = _merge_gaps(starts, ends, min_silence_ms * to_frames)
+    long_enough = (ends - starts) >= min_speech_ms * to_frames
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    padding = int(round(padding_ms * to_frames))
+    starts = np.maximum(starts - padding, 0)
+    ends = np.minimum(ends + padding, reader.nframes)
+    starts, ends = _merge_gaps(starts, ends, 1)
+
+    starts_ms = (starts * 1000 // reader.framerate).astype(np.int64)
+    ends_ms = (ends * 1000 // reader.framerate).astype(np.int64)
+    return list(zip(starts_ms.tolist(), ends_ms.tolist()))
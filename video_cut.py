@@ -0,0 +1,211 @@
+import os
+import uuid
+
+from video_processor import ConversionCancelled, run_command
+
+# 单次 ffmpeg 调用中最多打开的输入数，避免命令行过长
+MAX_INPUTS_PER_RUN = 32
+# 判断两个片段首尾相接的容差（毫秒）
+CONTIGUOUS_TOLERANCE_MS = 1
+
+STRATEGIES = ('seek', 'multi', 'segment', 'smart')
+# 只复制视频与音频：MOV 和手机视频常带的数据、时间码、字幕流写不进 MP4
+STREAM_MAPS = ['-map', '0:v?', '-map', '0:a?']
+
+
+def _seconds(ms):
+    return f"{ms / 1000.0:.3f}"
+
+
+def normalize_cuts(cuts):
+    """统一为 (start_ms, end_ms, output_file)，起点大于终点时交换"""
+    normalized = []
+    for start, end, output_file in cuts:
+        if end < start:
+            start, end = end, start
+        normalized.append((start, end, output_file))
+    return normalized
+
+
+def partition_cuts(cuts, groups):
+    """按起点排序后切成至多 groups 个连续分组，分组内仍可一次调用导出"""
+    cuts = sorted(normalize_cuts(cuts))
+    groups = max(1, min(groups, len(cuts)))
+    size = -(-len(cuts) // groups) if cuts else 0
+    return [cuts[i:i + size] for i in range(0, len(cuts), size)] if size else []
+
+
+def is_contiguous(cuts):
+    """片段按顺序首尾相接且扩展名相同时，可以交给 segment 复用器一次切完"""
+    if len(cuts) < 2:
+        return False
+    ext = os.path.splitext(cuts[0][2])[1].lower()
+    for (_, prev_end, _), (start, _, output_file) in zip(cuts, cuts[1:]):
+        if abs(start - prev_end) > CONTIGUOUS_TOLERANCE_MS:
+            return False
+        if os.path.splitext(output_file)[1].lower() != ext:
+            return False
+    return True
+
+
+def choose_strategy(cuts):
+    """根据片段分布选择代价最小的导出方式
+
+    不自动选择 segment：它的切点落到边界之后的关键帧上，与 seek、multi
+    落到之前的关键帧不一致，片段短于一个 GOP 时还会少写出文件。
+    """
+    if len(cuts) <= 1:
+        return 'seek'
+    return 'multi'
+
+
+def build_seek_command(input_file, start, end, output_file):
+    """单个片段：-ss 放在 -i 之前，直接定位而不是从头解复用"""
+    return [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-ss', _seconds(start),
+        '-t', _seconds(end - start),
+        '-i', input_file,
+    ] + STREAM_MAPS + [
+        '-c', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        '-y', output_file
+    ]
+
+
+def build_multi_command(input_file, cuts):
+    """多个片段：每个片段作为一个独立定位的输入，一次调用写出全部输出"""
+    command = ['ffmpeg', '-nostdin', '-v', 'error']
+    for start, end, _ in cuts:
+        command += ['-ss', _seconds(start), '-t', _seconds(end - start), '-i', input_file]
+    for index, (_, _, output_file) in enumerate(cuts):
+        command += [
+            '-map', f'{index}:v?', '-map', f'{index}:a?',
+            '-c', 'copy',
+            '-avoid_negative_ts', 'make_zero',
+            '-y', output_file
+        ]
+    return command
+
+
+def build_segment_command(input_file, cuts, pattern):
+    """首尾相接的片段：从文件开头顺序解复用一次，用 segment 复用器按边界切分
+
+    segment 复用器的切点相对第一个输出包计时，输入端定位后第一个包落在
+    起点之前的关键帧上，切点会整体偏移，因此这里不做输入端定位。
+    第一个片段之前的部分会作为编号 0 的段写出，由调用方丢弃。
+    流复制只能在关键帧处切分，切点落到边界之后的第一个关键帧；片段短于
+    一个 GOP 或两个边界落在同一个 GOP 内时，写出的段数会少于片段数。
+    """
+    first_start = cuts[0][0]
+    last_end = cuts[-1][1]
+    starts = [start for start, _, _ in cuts]
+    if first_start <= 0:
+        starts = starts[1:]
+    return [
+        'ffmpeg', '-nostdin', '-v', 'error',
+        '-t', _seconds(last_end),
+        '-i', input_file,
+    ] + STREAM_MAPS + [
+        '-c', 'copy',
+        '-f', 'segment',
+        '-segment_times', ','.join(_seconds(start) for start in starts),
+        '-segment_time_delta', '0.05',  # 吸收时间戳取整误差
+        '-reset_timestamps', '1',
+        '-y', pattern
+    ]
+
+
+def _run(command, is_cancelled=None):
+    run_command(command, is_cancelled)
+
+
+def _remove_outputs(cuts):
+    """删除取消时未写完的输出"""
+    for _, _, output_file in cuts:
+        try:
+            os.remove(output_file)
+        except OSError:
+            pass
+
+
+def _export_segment(input_file, cuts, is_cancelled=None):
+    """segment 复用器输出到临时编号文件，再改名为目标文件
+
+    写出的段数与片段数不符时不改名，返回 False，由调用方改用其他方式。
+    """
+    out_dir = os.path.dirname(os.path.abspath(cuts[0][2]))
+    ext = os.path.splitext(cuts[0][2])[1]
+    # 导出队列中的多个任务可能同时写同一目录，前缀各不相同
+    prefix = os.path.join(out_dir, f".segment_{uuid.uuid4().hex}_")
+    pattern = prefix + "%05d" + ext
+    # 起点不为 0 时，编号 0 的段是第一个片段之前的内容
+    first = 1 if cuts[0][0] > 0 else 0
+    try:
+        _run(build_segment_command(input_file, cuts, pattern), is_cancelled)
+        produced = [index for index in range(len(cuts) + first + 1)
+                    if os.path.exists(f"{prefix}{index:05d}{ext}")]
+        if produced != list(range(len(cuts) + first)):
+            return False
+        for index, (_, _, output_file) in enumerate(cuts, first):
+            os.replace(f"{prefix}{index:05d}{ext}", output_file)
+        return True
+    finally:
+        for index in range(len(cuts) + first + 1):
+            leftover = f"{prefix}{index:05d}{ext}"
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def export_cuts(input_file, cuts, strategy='auto', progress_callback=None, is_cancelled=None):
+    """导出多个视频片段（流复制）
+
+    cuts 为 [(start_ms, end_ms, output_file), ...]，strategy 可为
+    'auto'、'seek'（每段一次定位调用）、'multi'（一次调用多路输出）
+    、'segment'（首尾相接时用 segment 复用器顺序切分）或 'smart'
+    （帧精确，只重编码起点、终点所在的不完整 GOP）。前三种为流复制，seek 与
+    multi 的起点落到之前的关键帧上，segment 的切点落到之后的关键帧上，
+    auto 不会选择 segment。segment 写出的段数与片段数不符时改用 multi。
+    is_cancelled() 为 True 时终止正在运行的 ffmpeg，删除尚未写完的输出并
+    抛出 ConversionCancelled。返回实际使用的策略。
+    """
+    cuts = normalize_cuts(cuts)
+    if not cuts:
+        return None
+    if strategy == 'auto':
+        strategy = choose_strategy(cuts)
+    if strategy == 'segment' and not is_contiguous(cuts):
+        strategy = 'multi'
+    if strategy not in STRATEGIES:
+        raise ValueError(f"未知的导出策略: {strategy}")
+
+    completed = 0
+
+    def report(done, total):
+        nonlocal completed
+        completed = done
+        if progress_callback:
+            progress_callback(done, total)
+
+    try:
+        if strategy == 'smart':
+            # 延迟导入，普通流复制导出不需要关键帧索引
+            from smart_cut import smart_export_cuts
+            smart_export_cuts(input_file, cuts, report, is_cancelled)
+        elif strategy == 'segment' and _export_segment(input_file, cuts, is_cancelled):
+            report(len(cuts), len(cuts))
+        elif strategy in ('segment', 'multi'):
+            # 片段短于 GOP 时 segment 复用器少写出文件，改用多路输出
+            strategy = 'multi'
+            for offset in range(0, len(cuts), MAX_INPUTS_PER_RUN):
+                batch = cuts[offset:offset + MAX_INPUTS_PER_RUN]
+                _run(build_multi_command(input_file, batch), is_cancelled)
+                report(offset + len(batch), len(cuts))
+        else:
+            for done, (start, end, output_file) in enumerate(cuts, 1):
+                _run(build_seek_command(input_file, start, end, output_file), is_cancelled)
+                report(done, len(cuts))
+    except ConversionCancelled:
+        _remove_outputs(cuts[completed:])
+        raise
+    return strategy
@@ -1,11 +1,56 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
-                           QSlider, QLabel, QFileDialog, QStyle, QMessageBox, QSizePolicy)
-from PyQt6.QtCore import Qt, QTimer, QSize, QSizeF
+                           QSlider, QLabel, QFileDialog, QStyle, QMessageBox, QSizePolicy, QCheckBox)
+from PyQt6.QtCore import Qt, QTimer, QSize, QSizeF, QThread, QEvent, pyqtSignal
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput, QVideoSink, QVideoFrame
 from PyQt6.QtMultimediaWidgets import QVideoWidget
 from PyQt6.QtCore import QUrl
 import os
-import subprocess
+from video_cut import export_cuts, partition_cuts
+from export_queue import ExportTracker
+from cut_list import CutList
+from session_store import SessionStore
+from filmstrip_view import FilmstripThread, FilmstripView, ThumbnailPopup
+from proxy import build_proxy, find_proxy
+from video_processor import ConversionCancelled
+import media_probe
+import tracing
+
+
+def video_cut_job(input_file, cuts, strategy):
+    """生成在后台导出队列中执行的一组片段导出任务"""
+    def run(report_progress, is_cancelled):
+        with tracing.span('save_cut_segments', path=input_file, cuts=len(cuts), strategy=strategy) as span:
+            # 每写完一批回报一次进度，取消时终止正在运行的 ffmpeg
+            used = export_cuts(input_file, cuts, strategy,
+                               progress_callback=lambda done, total: report_progress(done * 100 // total),
+                               is_cancelled=is_cancelled)
+            span.set(used_strategy=used)
+    return run
+
+
+class ProxyBuildThread(QThread):
+    """后台生成代理文件，完成后发出代理路径，失败或取消时发出空字符串"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str)
+
+    def __init__(self, source_file):
+        super().__init__()
+        self.source_file = source_file
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            path = build_proxy(self.source_file, progress_callback=self.progress.emit,
+                               is_cancelled=lambda: self._cancel_requested)
+        except ConversionCancelled:
+            path = ""
+        except Exception as e:
+            print(f"代理生成失败: {str(e)}")
+            path = ""
+        self.finished.emit(path)
 
 class VideoEditor(QWidget):
     def __init__(self):
@@ -22,18 +67,34 @@ class VideoEditor(QWidget):
         self.video_widget = QVideoWidget()
         self.player.setVideoOutput(self.video_widget)
         
+        # 后台导出任务
+        self.export_tracker = ExportTracker(parent=self)
+        
         self.setup_ui()
         self.setup_connections()
         
         # 播放控制变量
         self.current_file = None
+        self.load_span = tracing.NULL_SPAN
+        
+        # 代理播放：proxy_thread 为正在生成的代理，切换到代理后回到 pending_position
+        self.proxy_thread = None
+        self.pending_position = None
+        
+        # 缩略图条：filmstrip_file 为已开始抽取缩略图的文件，切换到代理时不重复抽取
+        self.filmstrip_thread = None
+        self.filmstrip_file = None
         self.is_playing = False
         self.playback_speed = 1.0
         
         # 剪切点
         self.cut_start = None
         self.cut_end = None
-        self.cut_points = []
+        self.cut_points = CutList()  # 按起点排序、重叠自动合并的剪切区间
+        
+        # 剪切区间按文件持久保存，重新打开时恢复
+        self.session_store = SessionStore.instance()
+        self.exporting = {}  # 任务编号 -> (源文件, [(start_ms, end_ms), ...])，成功后才从存储中移除
         
         # 添加实时计时器
         self.timer = QTimer()
@@ -64,8 +125,21 @@ class VideoEditor(QWidget):
             }
         """)
         top_layout.addWidget(self.open_btn)
+        
+        # 后台导出状态
+        self.export_status_label = QLabel("后台导出: 空闲")
+        self.export_status_label.setStyleSheet("font-size: 14px; color: #666; margin-left: 20px;")
+        top_layout.addWidget(self.export_status_label)
+        self.cancel_export_btn = QPushButton("取消导出")
+        self.cancel_export_btn.setEnabled(False)
+        top_layout.addWidget(self.cancel_export_btn)
         top_layout.addStretch()
         
+        # 代理状态
+        self.proxy_label = QLabel("")
+        self.proxy_label.setStyleSheet("font-size: 14px; color: #666; margin-right: 20px;")
+        top_layout.addWidget(self.proxy_label)
+        
         # 当前文件显示
         self.file_label = QLabel("当前文件: 未选择")
         self.file_label.setStyleSheet("font-size: 14px; color: #666;")
@@ -151,6 +225,11 @@ class VideoEditor(QWidget):
         
         progress_layout.addLayout(time_layout)
         
+        # 缩略图条，悬停进度条时显示最近的缩略图
+        self.filmstrip_view = FilmstripView()
+        progress_layout.addWidget(self.filmstrip_view)
+        self.thumbnail_popup = ThumbnailPopup(self)
+        
         # 进度条
         self.progress_slider = QSlider(Qt.Orientation.Horizontal)
         self.progress_slider.setMinimumHeight(50)
@@ -180,6 +259,8 @@ class VideoEditor(QWidget):
             }
         """)
         self.progress_slider.mousePressEvent = self.slider_click
+        self.progress_slider.setMouseTracking(True)
+        self.progress_slider.installEventFilter(self)
         progress_layout.addWidget(self.progress_slider)
         
         main_layout.addLayout(progress_layout)
@@ -218,6 +299,12 @@ class VideoEditor(QWidget):
             """)
             cut_layout.addWidget(btn)
         
+        # 精确剪切：起点、终点所在的不完整 GOP 重编码，其余流复制
+        self.smart_cut_check = QCheckBox("精确剪切")
+        self.smart_cut_check.setStyleSheet("font-size: 14px;")
+        self.smart_cut_check.setToolTip("流复制会把起点对齐到前一个关键帧；勾选后只重编码起点、终点附近的部分，保证帧精确")
+        cut_layout.addWidget(self.smart_cut_check)
+        
         # 剪切信息显示
         self.cut_info_label = QLabel("剪切时长: 0秒")
         self.cut_info_label.setStyleSheet("""
@@ -252,17 +339,43 @@ class VideoEditor(QWidget):
         self.progress_slider.sliderPressed.connect(self.on_slider_pressed)
         self.progress_slider.sliderReleased.connect(self.on_slider_released)
         
+        self.cancel_export_btn.clicked.connect(self.export_tracker.cancel_all)
+        self.export_tracker.status_changed.connect(self.on_export_status_changed)
+        self.export_tracker.job_done.connect(self.on_export_job_done)
+        self.export_tracker.all_finished.connect(self.on_exports_finished)
+        
     def open_file(self):
-        file_name, _ = QFileDialog.getOpenFileName(
-            self,
-            "选择视频文件",
-            "",
-            "视频文件 (*.mp4 *.avi *.mkv *.mov)"
-        )
+        with tracing.span('file_dialog', title="选择视频文件"):
+            file_name, _ = QFileDialog.getOpenFileName(
+                self,
+                "选择视频文件",
+                "",
+                "视频文件 (*.mp4 *.avi *.mkv *.mov)"
+            )
         if file_name:
+            # 播放器异步加载，区间在 on_media_status_changed 中结束
+            self.load_span.end(cancelled=True)
+            self.stop_proxy_build()
+            self.stop_filmstrip()
+            self.filmstrip_view.clear()
+            self.filmstrip_file = None
+            self.pending_position = None
+            # 播放与定位使用代理，它与原文件时间轴一致；剪切时间与导出仍对应 current_file
             self.current_file = file_name
             self.file_label.setText(f"当前文件: {os.path.basename(file_name)}")
-            self.player.setSource(QUrl.fromLocalFile(file_name))
+            proxy_file = find_proxy(file_name)
+            if proxy_file:
+                self.proxy_label.setText("代理播放")
+            else:
+                self.start_proxy_build(file_name)
+            self.load_span = tracing.span('media_load', path=proxy_file or file_name)
+            self.player.setSource(QUrl.fromLocalFile(proxy_file or file_name))
+            # 探测缓存中已有时长时立即设置进度条并抽取缩略图，不等播放器加载
+            duration = media_probe.cached_duration_ms(file_name)
+            if duration:
+                self.progress_slider.setRange(0, duration)
+                self.update_time_label(0, duration)
+                self.start_filmstrip(duration)
             
             # 设置视频窗口大小
             self.video_widget.setMinimumHeight(400)
@@ -278,10 +391,106 @@ class VideoEditor(QWidget):
             self.play()
             self.cut_start = None
             self.cut_end = None
-            self.cut_points = []
-            self.cut_info_label.setText("剪切时长: 0秒")
+            # 恢复该文件上次未导出的剪切区间；仍在后台导出的区间失败时再放回
+            exporting = set(self.exporting_cuts(file_name))
+            self.cut_points = CutList(cut for cut in self.session_store.load_cuts(file_name) if cut not in exporting)
+            if self.cut_points:
+                self.cut_info_label.setText(f"已恢复 {len(self.cut_points)} 个剪切片段")
+            else:
+                self.cut_info_label.setText("剪切时长: 0秒")
             self.real_time_duration_label.setText("实时时长: 0.0秒")
         
+    def exporting_cuts(self, file_name):
+        """file_name 已交给后台导出、尚未完成的区间"""
+        return [cut for path, cuts in self.exporting.values() if path == file_name for cut in cuts]
+        
+    def remember_cuts(self):
+        """把当前剪切区间交给会话存储，后台合并写入；正在导出的区间成功前仍算未导出"""
+        if self.current_file:
+            cuts = CutList(self.cut_points)
+            for start, end in self.exporting_cuts(self.current_file):
+                cuts.add(start, end)
+            self.session_store.save_cuts(self.current_file, cuts, 'video', self.source_duration_ms())
+        
+    def source_duration_ms(self):
+        return self.player.duration() or media_probe.cached_duration_ms(self.current_file)
+        
+    def start_proxy_build(self, file_name):
+        self.proxy_label.setText("正在生成代理...")
+        self.proxy_thread = ProxyBuildThread(file_name)
+        self.proxy_thread.progress.connect(
+            lambda value: self.proxy_label.setText(f"正在生成代理... {value}%"))
+        self.proxy_thread.finished.connect(self.on_proxy_ready)
+        self.proxy_thread.start()
+    
+    def stop_proxy_build(self):
+        if self.proxy_thread is not None:
+            self.proxy_thread.cancel()
+            self.proxy_thread.finished.disconnect()
+            self.proxy_thread.wait()
+            self.proxy_thread = None
+    
+    def on_proxy_ready(self, proxy_file):
+        """代理生成完成后切换播放源，保持当前位置与播放状态"""
+        if self.sender() is not self.proxy_thread:
+            return
+        # finished 在 run() 返回前发出，等线程真正退出后再释放唯一的引用
+        self.proxy_thread.wait()
+        self.proxy_thread = None
+        if not proxy_file:
+            self.proxy_label.setText("代理不可用，播放原文件")
+            return
+        self.proxy_label.setText("代理播放")
+        self.pending_position = self.player.position()
+        # 原文件可能还没加载完，它的区间随切换结束；已结束时不会重复记录
+        self.load_span.end(cancelled=True)
+        self.load_span = tracing.span('media_load', path=proxy_file)
+        self.player.setSource(QUrl.fromLocalFile(proxy_file))
+    
+    def start_filmstrip(self, duration):
+        """从原文件抽取缩略图（已缓存时直接读取），逐张填入缩略图条"""
+        self.filmstrip_file = self.current_file
+        self.filmstrip_view.start(duration)
+        self.filmstrip_thread = FilmstripThread(self.current_file, duration)
+        self.filmstrip_thread.thumbnail.connect(self.filmstrip_view.set_thumbnail)
+        self.filmstrip_thread.finished.connect(self.on_filmstrip_ready)
+        self.filmstrip_thread.start()
+    
+    def stop_filmstrip(self):
+        if self.filmstrip_thread is not None:
+            self.filmstrip_thread.cancel()
+            self.filmstrip_thread.thumbnail.disconnect()
+            self.filmstrip_thread.finished.disconnect()
+            self.filmstrip_thread.wait()
+            self.filmstrip_thread = None
+    
+    def on_filmstrip_ready(self, strip):
+        if self.sender() is not self.filmstrip_thread:
+            return
+        # finished 在 run() 返回前发出，等线程真正退出后再释放唯一的引用
+        self.filmstrip_thread.wait()
+        self.filmstrip_thread = None
+    
+    def eventFilter(self, obj, event):
+        """悬停在进度条上时显示离鼠标位置最近的缩略图，不触发播放器定位"""
+        if obj is self.progress_slider:
+            if event.type() == QEvent.Type.MouseMove:
+                ms = QStyle.sliderValueFromPosition(
+                    self.progress_slider.minimum(),
+                    self.progress_slider.maximum(),
+                    int(event.position().x()),
+                    self.progress_slider.width()
+                )
+                pixmap, time_ms = self.filmstrip_view.thumbnail_at(ms)
+                if pixmap is not None:
+                    self.thumbnail_popup.show_thumbnail(
+                        pixmap, self.format_time(time_ms), event.globalPosition().toPoint())
+                else:
+                    self.thumbnail_popup.hide()
+            elif event.type() == QEvent.Type.Leave:
+                self.thumbnail_popup.hide()
+        return super().eventFilter(obj, event)
+    
     def video_click(self, event):
         """处理视频点击事件"""
         if event.button() == Qt.MouseButton.LeftButton:
@@ -344,7 +553,8 @@ class VideoEditor(QWidget):
             end_str = self.format_time(self.cut_end)
             duration = (self.cut_end - self.cut_start) / 1000.0
             self.cut_info_label.setText(f"剪切: {start_str} - {end_str} (时长: {duration:.1f}秒)")
-            self.cut_points.append((self.cut_start, self.cut_end))
+            self.cut_points.add(self.cut_start, self.cut_end)
+            self.remember_cuts()
             self.cut_start = None
             self.cut_end = None
             self.timer.stop()
@@ -367,14 +577,15 @@ class VideoEditor(QWidget):
         self.pause()
             
         if self.cut_start is not None and self.cut_end is not None:
-            self.cut_points.append((self.cut_start, self.cut_end))
+            self.cut_points.add(self.cut_start, self.cut_end)
             
         if not self.cut_points:
             if was_playing:
                 self.play()
             return
             
-        save_dir = QFileDialog.getExistingDirectory(self, "选择保存目录")
+        with tracing.span('file_dialog', title="选择保存目录"):
+            save_dir = QFileDialog.getExistingDirectory(self, "选择保存目录")
         if not save_dir:
             if was_playing:
                 self.play()
@@ -382,43 +593,64 @@ class VideoEditor(QWidget):
             
         default_name = os.path.splitext(os.path.basename(self.current_file))[0]
         
+        cuts = []
         for i, (start, end) in enumerate(self.cut_points, 1):
-            file_name, _ = QFileDialog.getSaveFileName(
-                self,
-                f"保存第 {i} 个片段",
-                os.path.join(save_dir, f"{default_name}_cut_{i}.mp4"),
-                "视频文件 (*.mp4)"
-            )
+            with tracing.span('file_dialog', title=f"保存第 {i} 个片段"):
+                file_name, _ = QFileDialog.getSaveFileName(
+                    self,
+                    f"保存第 {i} 个片段",
+                    os.path.join(save_dir, f"{default_name}_cut_{i}.mp4"),
+                    "视频文件 (*.mp4)"
+                )
             
             if file_name:
-                # 使用ffmpeg进行视频剪切
-                start_time = start / 1000.0  # 转换为秒
-                duration = (end - start) / 1000.0
-                
-                try:
-                    subprocess.run([
-                        'ffmpeg', '-i', self.current_file,
-                        '-ss', str(start_time),
-                        '-t', str(duration),
-                        '-c', 'copy',  # 使用复制模式，速度更快
-                        file_name
-                    ], check=True)
-                except subprocess.CalledProcessError as e:
-                    QMessageBox.critical(self, "错误", f"保存视频片段时出错：{str(e)}")
-                    continue
-        
-        QMessageBox.information(self, "成功", f"已保存 {len(self.cut_points)} 个视频片段")
-        self.cut_points = []
+                cuts.append((start, end, file_name))
+        
+        # 按并发上限分组交给后台队列，每组内部仍自动选择逐段或多路输出
+        strategy = 'smart' if self.smart_cut_check.isChecked() else 'auto'
+        for group in partition_cuts(cuts, self.export_tracker.queue.max_workers()):
+            label = os.path.basename(group[0][2]) if len(group) == 1 else f"{os.path.basename(group[0][2])} 等 {len(group)} 个片段"
+            job_id = self.export_tracker.submit(video_cut_job(self.current_file, group, strategy), label)
+            self.exporting[job_id] = (self.current_file, [(start, end) for start, end, _ in group])
+        
+        # 已交给导出的区间移出列表，没有选择文件名的区间保留
+        for start, end, _ in cuts:
+            self.cut_points.remove(start, end)
+        self.remember_cuts()
         self.cut_start = None
         self.cut_end = None
         self.timer.stop()
-        self.cut_info_label.setText("剪切时长: 0秒")
+        if self.cut_points:
+            self.cut_info_label.setText(f"还有 {len(self.cut_points)} 个剪切片段未保存")
+        else:
+            self.cut_info_label.setText("剪切时长: 0秒")
         self.real_time_duration_label.setText("实时时长: 0.0秒")
         
         # 如果之前在播放，则恢复播放
         if was_playing:
             self.play()
         
+    def on_export_status_changed(self, text):
+        self.export_status_label.setText(text)
+        self.cancel_export_btn.setEnabled(self.export_tracker.pending() > 0)
+        
+    def on_export_job_done(self, job_id, success):
+        """导出成功的区间从会话存储中移除；失败或取消的区间放回剪切列表"""
+        entry = self.exporting.pop(job_id, None)
+        if entry is None:
+            return
+        file_name, cuts = entry
+        if success:
+            self.session_store.mark_exported(file_name, cuts, 'video')
+        elif file_name == self.current_file:
+            for start, end in cuts:
+                self.cut_points.add(start, end)
+            self.cut_info_label.setText(f"还有 {len(self.cut_points)} 个剪切片段未保存")
+        
+    def on_exports_finished(self, errors):
+        if errors:
+            QMessageBox.critical(self, "错误", "保存视频片段时出错：\n" + "\n".join(errors))
+        
     def update_real_time_duration(self):
         """更新实时剪切时长"""
         if self.cut_start is not None and self.cut_end is None:
@@ -445,10 +677,23 @@ class VideoEditor(QWidget):
             self.player.setPosition(value)
             
     def on_media_status_changed(self, status):
+        if status == QMediaPlayer.MediaStatus.InvalidMedia:
+            self.load_span.end(error="InvalidMedia")
         if status == QMediaPlayer.MediaStatus.LoadedMedia:
+            self.load_span.end(duration_ms=self.player.duration())
             # 媒体加载完成后设置初始状态
             self.progress_slider.setRange(0, self.player.duration())
-            self.update_time_label(0, self.player.duration())
+            if self.filmstrip_file != self.current_file and self.player.duration() > 0:
+                self.start_filmstrip(self.player.duration())
+            if self.pending_position is not None:
+                # 从原文件切换到代理：回到切换前的位置，暂停中的保持暂停
+                self.player.setPosition(self.pending_position)
+                self.update_time_label(self.pending_position, self.player.duration())
+                self.pending_position = None
+                if not self.is_playing:
+                    return
+            else:
+                self.update_time_label(0, self.player.duration())
             self.player.play()
             self.is_playing = True
             
@@ -482,7 +727,14 @@ class VideoEditor(QWidget):
     
     def closeEvent(self, event):
         """窗口关闭事件"""
+        self.stop_proxy_build()
+        self.stop_filmstrip()
+        self.thumbnail_popup.hide()
         self.player.stop()
+        # 加载途中关闭窗口时 media_load 区间不会再由媒体状态结束
+        self.load_span.end(cancelled=True)
+        self.export_tracker.cancel_all()
+        self.session_store.flush()
         self.deleteLater()
         event.accept()
     
\ No newline at end of file
@@ -1,32 +1,374 @@
 import os
-from pydub import AudioSegment
-from PyQt6.QtWidgets import QMessageBox
 import subprocess
+import threading
+
+import media_probe
+import tracing
+
+# 管道模式下每次产出的帧数
+PIPE_BLOCK_FRAMES = 65536
+
+# 输出格式预设：编码、采样率、声道数、容器格式与扩展名
+# 采样率/声道为 None 时沿用源音轨；copy_codecs 列出可以不转码、直接重新封装的源编码
+PROFILES = {
+    'cd': {'label': 'WAV 44.1kHz 立体声', 'codec': 'pcm_s16le', 'sample_rate': 44100,
+           'channels': 2, 'format': 'wav', 'extension': '.wav', 'copy_codecs': ('pcm_s16le',)},
+    'speech': {'label': 'WAV 16kHz 单声道（语音）', 'codec': 'pcm_s16le', 'sample_rate': 16000,
+               'channels': 1, 'format': 'wav', 'extension': '.wav', 'copy_codecs': ('pcm_s16le',)},
+    'studio': {'label': 'WAV 48kHz 24位 立体声', 'codec': 'pcm_s24le', 'sample_rate': 48000,
+               'channels': 2, 'format': 'wav', 'extension': '.wav', 'copy_codecs': ('pcm_s24le',)},
+    'flac': {'label': 'FLAC 44.1kHz 立体声', 'codec': 'flac', 'sample_rate': 44100,
+             'channels': 2, 'format': 'flac', 'extension': '.flac', 'copy_codecs': ('flac',)},
+    'speech_flac': {'label': 'FLAC 16kHz 单声道（语音）', 'codec': 'flac', 'sample_rate': 16000,
+                    'channels': 1, 'format': 'flac', 'extension': '.flac', 'copy_codecs': ('flac',)},
+    'lossless': {'label': 'FLAC 原始采样率（FLAC 音轨直接封装）', 'codec': 'flac', 'sample_rate': None,
+                 'channels': None, 'format': 'flac', 'extension': '.flac', 'copy_codecs': ('flac',)},
+    'm4a': {'label': 'AAC/M4A（AAC 音轨直接封装）', 'codec': 'aac', 'sample_rate': None,
+            'channels': None, 'format': 'ipod', 'extension': '.m4a', 'copy_codecs': ('aac',)},
+    'opus': {'label': 'Opus（Opus 音轨直接封装）', 'codec': 'libopus', 'sample_rate': None,
+             'channels': None, 'format': 'opus', 'extension': '.opus', 'copy_codecs': ('opus',)},
+}
+DEFAULT_PROFILE = 'cd'
+
+# convert_to_wav 的返回值：本次输出是怎么得到的
+METHOD_LABELS = {
+    'decode': '解码转换',
+    'copy': '直接封装（未转码）',
+    'cache': '命中缓存',
+}
+
+
+def resolve_profile(profile):
+    """接受预设名或完整的参数字典，返回参数字典的副本"""
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"未知的输出格式: {profile}")
+        profile = PROFILES[profile]
+    return dict(profile)
+
+
+# 等待子进程时检查取消请求的间隔（秒）
+CANCEL_POLL_SECONDS = 0.1
+
+
+class ConversionCancelled(Exception):
+    """转换被用户取消"""
+
+
+def run_command(command, is_cancelled=None):
+    """运行 ffmpeg 等命令并返回标准输出（bytes），失败时抛出 CalledProcessError
+
+    is_cancelled() 为 True 时终止进程并抛出 ConversionCancelled。
+    """
+    with tracing.run_span(command):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            while True:
+                try:
+                    # 超时后重新调用 communicate 不会丢失输出
+                    stdout, stderr = process.communicate(timeout=CANCEL_POLL_SECONDS)
+                    break
+                except subprocess.TimeoutExpired:
+                    if is_cancelled and is_cancelled():
+                        raise ConversionCancelled("已取消")
+        except BaseException:
+            process.kill()
+            process.communicate()
+            raise
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    return stdout
+
+
+def probe_duration(input_file):
+    """媒体时长（秒），结果由 media_probe 缓存，失败时返回 None"""
+    try:
+        return media_probe.probe(input_file)['duration']
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def probe_audio_stream(input_file):
+    """第一条音轨的编码、采样率与声道数，结果由 media_probe 缓存，没有音轨或失败时返回 None"""
+    try:
+        stream = media_probe.first_stream(media_probe.probe(input_file), 'audio')
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+    if stream is None:
+        return None
+    try:
+        return {
+            'codec': stream['codec_name'],
+            'sample_rate': int(stream.get('sample_rate') or 0),
+            'channels': int(stream.get('channels') or 0),
+        }
+    except (KeyError, ValueError):
+        return None
+
+
+def collect_stderr(process):
+    """在后台线程中读完 process.stderr，返回一个等待读取结束并取回内容的函数
+
+    只读 stdout 时，输出较多的 stderr 会写满管道使 ffmpeg 阻塞，因此两者需要同时读取。
+    """
+    chunks = []
+    thread = threading.Thread(target=lambda: chunks.append(process.stderr.read()), daemon=True)
+    thread.start()
+
+    def result():
+        thread.join()
+        if chunks:
+            return chunks[0]
+        return '' if hasattr(process.stderr, 'encoding') else b''
+    return result
+
+
+def watch_progress(process, duration, progress_callback, is_cancelled):
+    """读取 ffmpeg -progress pipe:1 的输出回报进度（duration 为总时长，秒），返回 (是否被取消, stderr 内容)
+
+    is_cancelled() 为 True 时终止进程。
+    """
+    cancelled = False
+    read_stderr = collect_stderr(process)
+    try:
+        for line in process.stdout:
+            if is_cancelled and is_cancelled():
+                cancelled = True
+                process.terminate()
+                break
+            key, _, value = line.strip().partition('=')
+            if key == 'out_time_us' and duration and progress_callback:
+                try:
+                    seconds = int(value) / 1000000.0
+                except ValueError:
+                    continue
+                progress_callback(min(99, int(seconds * 100 / duration)))
+        process.wait()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        # 进程已退出，stderr 读取线程随之结束
+        stderr = read_stderr()
+        process.stdout.close()
+        process.stderr.close()
+    return cancelled, stderr
+
 
 class VideoProcessor:
-    def __init__(self):
+    def __init__(self, cache=None, profile=DEFAULT_PROFILE, allow_copy=True):
         self.current_video = None
+        # 可选的 ConversionCache，重复转换同一视频时直接复用结果
+        self.cache = cache
+        # 源音轨已符合输出格式时只重新封装，不解码
+        self.allow_copy = allow_copy
+        self.set_profile(profile)
+    
+    def set_profile(self, profile):
+        """切换输出格式，profile 为 PROFILES 中的名称或参数字典"""
+        params = resolve_profile(profile)
+        self.output_extension = params.pop('extension', '.wav')
+        params.pop('label', None)
+        self.copy_codecs = tuple(params.pop('copy_codecs', ()))
+        self.output_params = params
+    
+    def extraction_method(self, stream):
+        """根据 probe_audio_stream 的结果判断走 'copy' 还是 'decode'"""
+        if not self.allow_copy or not stream or stream['codec'] not in self.copy_codecs:
+            return 'decode'
+        for key in ('sample_rate', 'channels'):
+            wanted = self.output_params.get(key)
+            if wanted and stream[key] != wanted:
+                return 'decode'
+        return 'copy'
+    
+    def convert_to_wav(self, input_file, output_file=None, progress_callback=None, is_cancelled=None):
+        """将视频文件转换为当前输出格式的音频文件（默认 WAV）
+
+        progress_callback(percent) 根据 ffmpeg 的 -progress 输出回报进度；
+        is_cancelled() 返回 True 时终止 ffmpeg 并删除未完成的输出文件。
+        ffmpeg 先写入目标目录下的临时文件，成功后再原子地重命名为 output_file。
+        output_file 为 None 时不写文件，返回逐块产出 PCM 数据的生成器（见 stream_pcm）。
+        
+        返回本次使用的方式：'cache'、'copy'（源音轨直接重新封装）或 'decode'。
+        """
+        if output_file is None:
+            return self.stream_pcm(input_file, progress_callback=progress_callback,
+                                   is_cancelled=is_cancelled)
+        
+        with tracing.span('convert_to_wav', path=input_file, output=output_file,
+                          format=self.output_params['format']) as span:
+            method = self._convert_file(input_file, output_file, progress_callback, is_cancelled)
+            span.set(method=method)
+        return method
+    
+    def _cache_key(self, input_file, method):
+        """缓存键包含 allow_copy 与实际使用的方式，重新封装的结果不会提供给要求解码的调用方"""
+        return self.cache.key(input_file, dict(self.output_params, allow_copy=self.allow_copy, method=method))
     
-    def convert_to_wav(self, input_file, output_file):
-        """将视频文件转换为WAV音频文件"""
+    def _convert_file(self, input_file, output_file, progress_callback, is_cancelled):
+        method = 'decode'
+        if self.allow_copy and self.copy_codecs:
+            method = self.extraction_method(probe_audio_stream(input_file))
+        
+        if self.cache is not None:
+            # 计划重新封装时，之前封装失败、退回解码的结果同样可用
+            for candidate in (('copy', 'decode') if method == 'copy' else ('decode',)):
+                if self.cache.fetch(self._cache_key(input_file, candidate), output_file, self.output_extension):
+                    if progress_callback:
+                        progress_callback(100)
+                    return 'cache'
+        
+        temp_file = self._temp_path(output_file)
+        if method == 'copy':
+            try:
+                self._run_ffmpeg(input_file, temp_file, progress_callback, is_cancelled, copy=True)
+            except ConversionCancelled:
+                raise
+            except Exception:
+                # 个别容器里的音轨无法直接封装到目标格式，退回完整解码
+                method = 'decode'
+        if method == 'decode':
+            self._run_ffmpeg(input_file, temp_file, progress_callback, is_cancelled)
         try:
-            # 使用 ffmpeg 进行转换
-            subprocess.run([
-                'ffmpeg',
-                '-i', input_file,  # 输入文件
-                '-vn',  # 不处理视频
-                '-acodec', 'pcm_s16le',  # 设置音频编码
-                '-ar', '44100',  # 设置采样率
-                '-ac', '2',  # 设置声道数
-                '-y',  # 覆盖已存在的文件
-                output_file
-            ], check=True, capture_output=True)
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"转换失败: {e.stderr.decode()}")
+            os.replace(temp_file, output_file)
+        except OSError:
+            self._remove_partial(temp_file)
+            raise
+        
+        if self.cache is not None:
+            self.cache.store(self._cache_key(input_file, method), output_file, self.output_extension)
+        if progress_callback:
+            progress_callback(100)
+        return method
+    
+    def _codec_args(self, copy=False):
+        """编码相关的 ffmpeg 参数；采样率/声道为 None 时不指定，沿用源音轨"""
+        if copy:
+            return ['-acodec', 'copy']
+        args = ['-acodec', self.output_params['codec']]  # 设置音频编码
+        if self.output_params.get('sample_rate'):
+            args += ['-ar', str(self.output_params['sample_rate'])]  # 设置采样率
+        if self.output_params.get('channels'):
+            args += ['-ac', str(self.output_params['channels'])]  # 设置声道数
+        return args
+    
+    def _run_ffmpeg(self, input_file, output_file, progress_callback, is_cancelled, copy=False):
+        duration = probe_duration(input_file) if progress_callback else None
+        
+        # 使用 ffmpeg 进行转换
+        command = [
+            'ffmpeg',
+            '-nostdin',
+            '-v', 'error',
+            '-progress', 'pipe:1',  # 机器可读的进度输出
+            '-nostats',
+            '-i', input_file,  # 输入文件
+            '-map', '0:a:0',  # 与 probe_audio_stream 一致，取第一条音轨
+            '-vn',  # 不处理视频
+            *self._codec_args(copy),
+            '-f', self.output_params['format'],  # 临时文件没有扩展名，显式指定格式
+            '-y',  # 覆盖已存在的文件
+            output_file
+        ]
+        with tracing.run_span(command):
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            cancelled, stderr = watch_progress(process, duration, progress_callback, is_cancelled)
+        
+        if cancelled or (is_cancelled and is_cancelled()):
+            self._remove_partial(output_file)
+            raise ConversionCancelled("转换已取消")
+        if process.returncode != 0:
+            print(f"转换失败: {stderr}")
+            self._remove_partial(output_file)
+            raise Exception("视频转换失败")
+    
+    def stream_pcm(self, input_file, block_frames=PIPE_BLOCK_FRAMES, progress_callback=None, is_cancelled=None):
+        """从 ffmpeg 标准输出逐块读取解码后的 PCM，不落盘
+
+        每块是交错排列的 16 位有符号小端 bytes，采样率与声道数取自 output_params
+        （未指定时为 44.1kHz 立体声），最后一块可能不足 block_frames 帧。提前关闭生成器会终止 ffmpeg。
+        """
+        channels = self.output_params.get('channels') or 2
+        sample_rate = self.output_params.get('sample_rate') or 44100
+        block_bytes = block_frames * channels * 2
+        duration = probe_duration(input_file) if progress_callback else None
+        total_bytes = duration * sample_rate * channels * 2 if duration else None
+        
+        command = [
+            'ffmpeg',
+            '-nostdin',
+            '-v', 'error',
+            '-i', input_file,
+            '-vn',
+            '-acodec', 'pcm_s16le',
+            '-ar', str(sample_rate),
+            '-ac', str(channels),
+            '-f', 's16le',
+            'pipe:1'
+        ]
+        span = tracing.run_span(command)
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        read_stderr = collect_stderr(process)
+        
+        read_bytes = 0
+        try:
+            while True:
+                if is_cancelled and is_cancelled():
+                    process.terminate()
+                    raise ConversionCancelled("转换已取消")
+                block = self._read_exact(process.stdout, block_bytes)
+                if not block:
+                    break
+                read_bytes += len(block)
+                if total_bytes and progress_callback:
+                    progress_callback(min(99, int(read_bytes * 100 / total_bytes)))
+                yield block
+            process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            stderr = read_stderr().decode(errors='replace')
+            process.stdout.close()
+            process.stderr.close()
+            # 区间覆盖整个读取过程，包括调用方处理每一块的时间
+            span.end(output_bytes=read_bytes)
+        
+        if process.returncode != 0:
+            print(f"转换失败: {stderr}")
             raise Exception("视频转换失败")
+        if progress_callback:
+            progress_callback(100)
+
+    def _read_exact(self, stream, size):
+        """读满 size 字节，流结束时返回剩余部分"""
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = stream.read(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b''.join(chunks)
+
+    def _temp_path(self, output_file):
+        """与目标同目录的临时文件，保证最后的重命名不跨卷"""
+        return f"{output_file}.{os.getpid()}.part"
+
+    def _remove_partial(self, output_file):
+        """删除未完成的输出文件"""
+        try:
+            os.remove(output_file)
+        except OSError:
+            pass
 
     def convert_to_wav_pydub(self, video_path):
+        # 延迟导入，保证无界面的批量模式不依赖 Qt，主窗口启动时也不加载 pydub
+        from PyQt6.QtWidgets import QMessageBox
+        from pydub import AudioSegment
         try:
             # 生成输出文件名
             output_path = os.path.splitext(video_path)[0] + ".wav"
@@ -38,4 +380,4 @@ class VideoProcessor:
             QMessageBox.information(None, "成功", f"音频已保存至：{output_path}")
             
         except Exception as e:
-            QMessageBox.critical(None, "错误", f"处理视频时出错：{str(e)}") 
\ No newline at end of file
+            QMessageBox.critical(None, "错误", f"处理视频时出错：{str(e)}")
@@ -0,0 +1,100 @@
+import os
+import struct
+
+import numpy as np
+
+from pcm_reader import PcmReader, WAVE_FORMAT_IEEE_FLOAT, write_wav_header
+
+# 每次写出的帧数，决定导出时的内存占用上限
+BLOCK_FRAMES = 65536
+
+
+def export_segments(source, segments, block_frames=BLOCK_FRAMES, is_cancelled=None, progress_callback=None):
+    """从 WAV 文件中流式导出多个片段
+
+    source 为文件路径或 PcmReader，segments 为 [(start_ms, end_ms, output_file), ...]。
+    每个片段直接在内存映射上按帧区间切片，按固定大小的块写出，
+    内存占用与源文件长度无关。输出沿用源文件的 fmt 块，支持所有
+    PcmReader 能读取的位深。is_cancelled() 为 True 时删除当前
+    未写完的文件并返回 False；只在还有数据未写出时检查，已写完的片段
+    不会删除，尚未开始的片段也不会创建或覆盖。
+    每写完一块调用 progress_callback(已写帧数, 总帧数)，总数为全部片段之和；
+    回调抛出异常（如导出队列的取消）时同样删除未写完的文件。
+    """
+    reader = source if isinstance(source, PcmReader) else PcmReader.open(source)
+    ranges = []
+    for start_ms, end_ms, output_file in segments:
+        if end_ms < start_ms:
+            start_ms, end_ms = end_ms, start_ms
+        ranges.append((reader.frame_at_ms(start_ms), reader.frame_at_ms(end_ms), output_file))
+    total = sum(end - start for start, end, _ in ranges)
+    written = 0
+
+    for start, end, output_file in ranges:
+        if is_cancelled and is_cancelled():
+            return False
+        data_size = (end - start) * reader.block_align
+        cancelled = False
+        try:
+            with open(output_file, 'wb') as output:
+                write_wav_header(output, reader.fmt_chunk, data_size)
+                for offset in range(start, end, block_frames):
+                    if is_cancelled and is_cancelled():
+                        cancelled = True
+                        break
+                    block_end = min(offset + block_frames, end)
+                    output.write(reader.raw_bytes(offset, block_end))
+                    written += block_end - offset
+                    if progress_callback:
+                        progress_callback(written, total)
+                if data_size % 2:
+                    output.write(b'\x00')
+        except BaseException:
+            _remove_partial(output_file)
+            raise
+        if cancelled:
+            os.remove(output_file)
+            return False
+    return True
+
+
+def _remove_partial(output_file):
+    try:
+        os.remove(output_file)
+    except OSError:
+        pass
+
+
+class FloatWavWriter:
+    """逐块写出 32 位浮点 WAV，关闭时回填头部中的长度
+
+    分离结果按块产生、总长度事先未知，写入时内存占用只与块大小有关。
+    """
+
+    def __init__(self, path, channels, framerate):
+        self.path = path
+        self.channels = channels
+        self.fmt_chunk = struct.pack('<HHIIHH', WAVE_FORMAT_IEEE_FLOAT, channels, framerate,
+                                     framerate * channels * 4, channels * 4, 32)
+        self.data_size = 0
+        self._file = open(path, 'wb')
+        write_wav_header(self._file, self.fmt_chunk, 0)
+
+    def write(self, frames):
+        """frames 为 (帧, 声道) 数组"""
+        data = np.ascontiguousarray(frames, dtype='<f4')
+        self._file.write(data.tobytes())
+        self.data_size += data.nbytes
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        write_wav_header(self._file, self.fmt_chunk, self.data_size)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+
+from pcm_reader import PcmReader
+
+# 第 0 层每个峰值块覆盖的帧数，往上每层合并相邻两块
+PEAK_BLOCK = 256
+# 构建时每次读取的块数
+READ_BLOCKS = 4096
+SIDECAR_SUFFIX = '.peaks.npy'
+
+
+def sidecar_path(source_file):
+    return source_file + SIDECAR_SUFFIX
+
+
+def level_lengths(nframes, block=PEAK_BLOCK):
+    """各层的峰值块数量，逐层减半直到只剩一块"""
+    lengths = [max(1, -(-nframes // block))]
+    while lengths[-1] > 1:
+        lengths.append(-(-lengths[-1] // 2))
+    return lengths
+
+
+def _reduce_level(peaks):
+    """相邻两块合并为上一层"""
+    if len(peaks) % 2:
+        peaks = np.concatenate([peaks, peaks[-1:]])
+    pairs = peaks.reshape(-1, 2, 2)
+    return np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+
+
+class PeakPyramid:
+    """多分辨率最小/最大值峰值金字塔
+
+    所有层按顺序存放在一个 (N, 2) 的 int16 数组中，保存为源文件旁的
+    .peaks.npy 并以内存映射方式打开，查询代价只与像素数有关。
+    """
+
+    def __init__(self, reader, peaks):
+        self.reader = reader
+        self.source_file = reader.path
+        self.peaks = peaks
+        self.nframes = reader.nframes
+        self.framerate = reader.framerate
+        self.lengths = level_lengths(self.nframes)
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).tolist()
+
+    @classmethod
+    def load(cls, source_file, reader=None):
+        """旁路文件存在且不早于源文件时直接内存映射，否则返回 None"""
+        path = sidecar_path(source_file)
+        try:
+            if os.path.getmtime(path) < os.path.getmtime(source_file):
+                return None
+            reader = reader or PcmReader.open(source_file)
+            peaks = np.load(path, mmap_mode='r')
+        except (OSError, ValueError, EOFError):
+            return None
+        if peaks.shape != (sum(level_lengths(reader.nframes)), 2):
+            return None
+        return cls(reader, peaks)
+
+    @classmethod
+    def build(cls, source_file, reader=None, progress_callback=None, is_cancelled=None):
+        """在内存映射的采样上分块向量化计算各层峰值并写入旁路文件"""
+        reader = reader or PcmReader.open(source_file)
+        nframes = reader.nframes
+        lengths = level_lengths(nframes)
+        base = np.zeros((lengths[0], 2), dtype=np.int16)
+        chunk_frames = PEAK_BLOCK * READ_BLOCKS
+        for offset in range(0, nframes, chunk_frames):
+            if is_cancelled and is_cancelled():
+                return None
+            samples = reader.int16_frames(offset, offset + chunk_frames)
+            position = offset // PEAK_BLOCK
+            full = len(samples) // PEAK_BLOCK
+            # 每块的所有声道采样排成一行，一次求出整块的最小/最大值
+            if full:
+                blocks = samples[:full * PEAK_BLOCK].reshape(full, -1)
+                base[position:position + full, 0] = blocks.min(axis=1)
+                base[position:position + full, 1] = blocks.max(axis=1)
+            tail = samples[full * PEAK_BLOCK:]
+            if len(tail):
+                base[position + full] = (tail.min(), tail.max())
+            if progress_callback:
+                progress_callback(int(min(offset + chunk_frames, nframes) * 100 / max(1, nframes)))
+
+        levels = [base]
+        while len(levels[-1]) > 1:
+            levels.append(_reduce_level(levels[-1]))
+        pyramid = np.concatenate(levels)
+
+        path = sidecar_path(source_file)
+        try:
+            tmp_path = path + '.tmp'
+            stored = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.int16, shape=pyramid.shape)
+            stored[:] = pyramid
+            stored.flush()
+            del stored
+            os.replace(tmp_path, path)
+            return cls.load(source_file, reader) or cls(reader, pyramid)
+        except OSError:
+            # 源目录不可写时只保留在内存中
+            return cls(reader, pyramid)
+
+    def level(self, index):
+        return self.peaks[self.offsets[index]:self.offsets[index + 1]]
+
+    def frame_at_ms(self, ms):
+        return int(ms * self.framerate / 1000)
+
+    def peaks_for_range(self, start_frame, end_frame, width):
+        """返回 width 个像素的 (mins, maxs)，取值范围 -1..1"""
+        start_frame = max(0, min(start_frame, self.nframes))
+        end_frame = max(start_frame + 1, min(end_frame, self.nframes))
+        width = max(1, int(width))
+        frames_per_pixel = (end_frame - start_frame) / width
+        edges = start_frame + (np.arange(width + 1) * frames_per_pixel).astype(np.int64)
+
+        if frames_per_pixel < PEAK_BLOCK:
+            # 放大到采样级别时直接读取这一小段原始采样
+            samples = self.reader.int16_frames(start_frame, end_frame)
+            if len(samples) == 0:
+                return np.zeros(width), np.zeros(width)
+            lo = samples.min(axis=1)
+            hi = samples.max(axis=1)
+            index = np.minimum(edges[:-1] - start_frame, len(lo) - 1)
+        else:
+            # 选择块大小不超过每像素帧数的最粗一层
+            level_index = min(int(np.log2(frames_per_pixel / PEAK_BLOCK)), len(self.lengths) - 1)
+            block = PEAK_BLOCK << level_index
+            peaks = self.level(level_index)
+            index = np.minimum(edges[:-1] // block, len(peaks) - 1)
+            # 只取覆盖可见范围的块，否则最后一个像素会一直归约到文件末尾
+            stop = min(len(peaks), -(-edges[-1] // block))
+            lo = peaks[:stop, 0]
+            hi = peaks[:stop, 1]
+
+        mins = np.minimum.reduceat(lo, index)
+        maxs = np.maximum.reduceat(hi, index)
+        return mins / 32768.0, maxs / 32768.0
@@ -0,0 +1,153 @@
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QThread, QRectF, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen
+
+from cut_list import CutList
+from waveform import PeakPyramid
+
+
+class PeakBuildThread(QThread):
+    """后台构建峰值金字塔，完成后把结果交回界面线程"""
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+
+    def __init__(self, source_file, reader=None):
+        super().__init__()
+        self.source_file = source_file
+        self.reader = reader
+        self._cancel_requested = False
+
+    def cancel(self):
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            pyramid = PeakPyramid.build(
+                self.source_file,
+                reader=self.reader,
+                progress_callback=self.progress.emit,
+                is_cancelled=lambda: self._cancel_requested
+            )
+        except (OSError, ValueError) as e:
+            print(f"波形生成失败: {str(e)}")
+            pyramid = None
+        self.finished.emit(pyramid)
+
+
+class WaveformView(QWidget):
+    """波形总览：滚轮缩放，点击跳转，并在波形上叠加剪切区间"""
+    seek_requested = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(120)
+        self.pyramid = None
+        self.duration = 0
+        self.position = 0
+        self.view_start = 0
+        self.view_end = 0
+        self.cut_points = CutList()
+        self.cut_start = None
+        self.cut_end = None
+        self.status_text = "未加载音频"
+
+    def set_pyramid(self, pyramid):
+        self.pyramid = pyramid
+        if pyramid is not None:
+            self.duration = int(pyramid.nframes * 1000 / pyramid.framerate)
+            self.view_start = 0
+            self.view_end = self.duration
+        self.status_text = "波形不可用" if pyramid is None else ""
+        self.update()
+
+    def clear(self, status_text=""):
+        self.pyramid = None
+        self.status_text = status_text
+        self.update()
+
+    def set_position(self, position):
+        self.position = position
+        # 播放头移出可视范围时平移视图
+        if self.view_end > self.view_start and not (self.view_start <= position <= self.view_end):
+            span = self.view_end - self.view_start
+            self.view_start = max(0, min(position - span // 10, self.duration - span))
+            self.view_end = self.view_start + span
+        self.update()
+
+    def set_cut_points(self, cut_points, cut_start=None, cut_end=None):
+        # 编辑器每次修改后都会调用这里，直接引用同一个区间表
+        self.cut_points = cut_points if isinstance(cut_points, CutList) else CutList(cut_points)
+        self.cut_start = cut_start
+        self.cut_end = cut_end
+        self.update()
+
+    def x_to_ms(self, x):
+        span = self.view_end - self.view_start
+        return int(self.view_start + max(0.0, min(1.0, x / max(1, self.width()))) * span)
+
+    def ms_to_x(self, ms):
+        span = max(1, self.view_end - self.view_start)
+        return (ms - self.view_start) * self.width() / span
+
+    def wheelEvent(self, event):
+        """以鼠标位置为中心缩放，最小可放大到单个采样"""
+        if self.pyramid is None or self.duration <= 0:
+            return
+        anchor = self.x_to_ms(event.position().x())
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        min_span = max(1, int(self.width() * 1000 / self.pyramid.framerate))
+        span = self.view_end - self.view_start
+        new_span = int(max(min_span, min(self.duration, span * factor)))
+        ratio = (anchor - self.view_start) / max(1, span)
+        self.view_start = int(max(0, min(anchor - ratio * new_span, self.duration - new_span)))
+        self.view_end = self.view_start + new_span
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton and self.pyramid is not None:
+            self.seek_requested.emit(self.x_to_ms(event.position().x()))
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#FAFAFA"))
+        width = self.width()
+        height = self.height()
+        middle = height / 2.0
+
+        if self.pyramid is None:
+            painter.setPen(QColor("#999999"))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, self.status_text)
+            return
+
+        # 剪切区间：只取与可见范围相交的部分
+        visible_cuts = self.cut_points.between(self.view_start, self.view_end)
+        for start, end in visible_cuts:
+            left, right = self.ms_to_x(start), self.ms_to_x(end)
+            if right >= 0 and left <= width:
+                painter.fillRect(QRectF(left, 0, max(1.0, right - left), height), QColor(255, 152, 0, 70))
+        if self.cut_start is not None and self.cut_end is None:
+            left, right = sorted((self.ms_to_x(self.cut_start), self.ms_to_x(self.position)))
+            painter.fillRect(QRectF(left, 0, max(1.0, right - left), height), QColor(255, 87, 34, 50))
+
+        # 波形：每个像素一条从最小值到最大值的竖线
+        start_frame = self.pyramid.frame_at_ms(self.view_start)
+        end_frame = self.pyramid.frame_at_ms(self.view_end)
+        mins, maxs = self.pyramid.peaks_for_range(start_frame, end_frame, width)
+        painter.setPen(QPen(QColor("#2196F3"), 1))
+        for x in range(len(mins)):
+            painter.drawLine(x, int(middle - maxs[x] * middle), x, int(middle - mins[x] * middle))
+
+        # 剪切点与播放头
+        painter.setPen(QPen(QColor("#F57C00"), 1))
+        for start, end in visible_cuts:
+            for ms in (start, end):
+                x = self.ms_to_x(ms)
+                if 0 <= x <= width:
+                    painter.drawLine(int(x), 0, int(x), height)
+        if self.cut_start is not None:
+            x = self.ms_to_x(self.cut_start)
+            painter.setPen(QPen(QColor("#4CAF50"), 2))
+            painter.drawLine(int(x), 0, int(x), height)
+        x = self.ms_to_x(self.position)
+        painter.setPen(QPen(QColor("#FF5722"), 2))
+        painter.drawLine(int(x), 0, int(x), height)